@@ -1,6 +1,6 @@
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import config, Csv
 import os
 import ssl
 
@@ -33,6 +33,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'alerts.middleware.RequestMetricsMiddleware',
+    'alerts.middleware.ThresholdGZipMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -41,6 +43,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'alerts.middleware.ShardMiddleware',
+    'alerts.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'alerting_platform.urls'
@@ -80,6 +84,101 @@ DATABASES = {
     }
 }
 
+# Read replicas - comma separated hosts that mirror the default database.
+# Analytics and inbox reads are routed to them by alerts.routers.ReplicaRouter.
+# A settings module extending this one may instead define complete DATABASES
+# entries and list their aliases in REPLICA_DATABASES (see test_settings.py)
+DB_REPLICA_HOSTS = config('DB_REPLICA_HOSTS', default='', cast=Csv())
+REPLICA_DATABASES = []
+for index, replica_host in enumerate(DB_REPLICA_HOSTS, start=1):
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+# Organization sharding - comma separated "alias=host" pairs. Tenants are
+# spread across default plus these aliases by alerts.routers.ShardRouter
+DB_SHARD_HOSTS = config('DB_SHARD_HOSTS', default='', cast=Csv())
+SHARD_DATABASES = ['default']
+for shard_entry in DB_SHARD_HOSTS:
+    alias, _, shard_host = shard_entry.partition('=')
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': shard_host,
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+    }
+    SHARD_DATABASES.append(alias)
+SHARDING_ENABLED = len(SHARD_DATABASES) > 1
+
+if SHARDING_ENABLED:
+    # Interleave auto-increment ids so rows created from now on keep their primary
+    # keys when an organization is moved between shards. Rows that existed before
+    # sharding have contiguous ids on default and may collide (move_organization refuses)
+    base_init_command = DATABASES['default']['OPTIONS']['init_command']
+    for offset, alias in enumerate(SHARD_DATABASES, start=1):
+        DATABASES[alias]['OPTIONS']['init_command'] = (
+            f"{base_init_command}, "
+            f"auto_increment_increment={len(SHARD_DATABASES)}, "
+            f"auto_increment_offset={offset}"
+        )
+
+DATABASE_ROUTERS = ['alerts.routers.ShardRouter', 'alerts.routers.ReplicaRouter']
+
+# Seconds a user's reads stay on the primary after their own write
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Seconds an authenticated user's id, role, team and organization are cached
+# (0 disables the cache and loads the user on every request)
+AUTH_USER_CACHE_SECONDS = config('AUTH_USER_CACHE_SECONDS', default=60, cast=int)
+
+# Cache - shared Redis cache when CACHE_URL is set, per-process memory otherwise
+CACHE_URL = config('CACHE_URL', default='')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'alerts.cache.InstrumentedRedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'alerts.cache.InstrumentedLocMemCache',
+        }
+    }
+
+# Logging - one structured record per task run at INFO; per-recipient detail only at DEBUG
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'alerts': {
+            'handlers': ['console'],
+            'level': config('LOG_LEVEL', default='INFO'),
+        },
+    },
+}
+
+# Per-endpoint latency, query and cache metrics, served at /api/metrics/;
+# each process publishes its totals to the cache every METRICS_FLUSH_SECONDS
+REQUEST_METRICS_ENABLED = config('REQUEST_METRICS_ENABLED', default=True, cast=bool)
+METRICS_FLUSH_SECONDS = config('METRICS_FLUSH_SECONDS', default=15, cast=int)
+
+# Responses of at least this many bytes are gzipped for clients that accept it
+GZIP_MIN_BYTES = config('GZIP_MIN_BYTES', default=1024, cast=int)
+
+# On-demand profiling: admins send X-Profile: 1 (or ?_profile=1) to profile one request;
+# the newest PROFILE_HISTORY profiles are kept in the cache
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=True, cast=bool)
+PROFILE_HISTORY = config('PROFILE_HISTORY', default=20, cast=int)
+PROFILE_SQL_LIMIT = config('PROFILE_SQL_LIMIT', default=500, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -106,7 +205,7 @@ AUTH_USER_MODEL = 'alerts.User'
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'alerts.authentication.OrganizationJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -114,6 +213,17 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
     ),
+    # orjson-backed when installed, byte-for-byte the same output as DRF's JSON renderer;
+    # payloads holding floats or Decimals are rendered by DRF's renderer itself
+    'DEFAULT_RENDERER_CLASSES': (
+        'alerts.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'alerts.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
@@ -161,18 +271,92 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
 
+# Queues - fan-out is routed by alert severity (see alerts.tasks.dispatch_alerts) and
+# periodic reminder work runs on its own low-priority queue. Workers take one task
+# at a time so a long task never holds a backlog of prefetched messages.
+CELERY_TASK_DEFAULT_QUEUE = 'alerts'
+ALERT_SEVERITY_QUEUES = {
+    'Critical': 'critical',
+    'Warning': 'alerts',
+    'Info': 'bulk',
+}
+CELERY_TASK_ROUTES = {
+    'alerts.tasks.process_reminders': {'queue': 'reminders'},
+    'alerts.tasks.process_due_reminders': {'queue': 'reminders'},
+    'alerts.tasks.flush_digests': {'queue': 'reminders'},
+    'alerts.tasks.reset_expired_snoozes': {'queue': 'reminders'},
+    'alerts.tasks.deliver_webhook': {'queue': 'webhooks'},
+}
+ALERT_QUEUES = ['critical', 'alerts', 'bulk', 'reminders', 'webhooks']
+# Periodic tasks hold a lease (Redis when CACHE_URL is set, a database row otherwise)
+# so overlapping runs skip; it outlives the hard time limit in case a worker dies
+TASK_LEASE_SECONDS = config('TASK_LEASE_SECONDS', default=CELERY_TASK_TIME_LIMIT + 60, cast=int)
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_TASK_ACKS_LATE = True
+
 # Celery Beat Schedule for Reminders
 CELERY_BEAT_SCHEDULE = {
-    'send-reminders-every-2-hours': {
+    'schedule-reminders-every-2-hours': {
         'task': 'alerts.tasks.process_reminders',
         'schedule': timedelta(hours=2),
     },
-    'reset-snoozes-at-midnight': {
+    'send-due-reminders-every-minute': {
+        'task': 'alerts.tasks.process_due_reminders',
+        'schedule': timedelta(minutes=1),
+    },
+    'clear-expired-snoozes': {
         'task': 'alerts.tasks.reset_expired_snoozes',
-        'schedule': timedelta(days=1),
+        'schedule': timedelta(minutes=10),
+    },
+    'flush-digests-every-minute': {
+        'task': 'alerts.tasks.flush_digests',
+        'schedule': timedelta(minutes=1),
     },
 }
 
+# Digest mode: "channel=Severity|Severity" pairs, e.g. "Email=Info|Warning,SMS=Info|Warning".
+# Matching deliveries to a user are buffered and sent as one notification per
+# DIGEST_WINDOW_SECONDS; Critical alerts are always sent immediately
+DIGEST_RULES = {}
+for digest_entry in config('DIGEST_RULES', default='', cast=Csv()):
+    channel, _, severities = digest_entry.partition('=')
+    DIGEST_RULES[channel] = [
+        severity for severity in severities.split('|') if severity and severity != 'Critical'
+    ]
+DIGEST_WINDOW_SECONDS = config('DIGEST_WINDOW_SECONDS', default=300, cast=int)
+DIGEST_FLUSH_BATCH_SIZE = config('DIGEST_FLUSH_BATCH_SIZE', default=5000, cast=int)
+
+# Ingested events with the same dedup key fold into the open alert when they
+# repeat within this window; events without an expiry keep their alert open this long
+EVENT_DEDUP_WINDOW_SECONDS = config('EVENT_DEDUP_WINDOW_SECONDS', default=900, cast=int)
+EVENT_ALERT_TTL_HOURS = config('EVENT_ALERT_TTL_HOURS', default=24, cast=int)
+
+# Webhook posts: per-request timeout, retries with exponential backoff (10s, 20s, ...)
+# re-queued on the webhooks queue, and idle keep-alive connections kept per host
+WEBHOOK_TIMEOUT_SECONDS = config('WEBHOOK_TIMEOUT_SECONDS', default=5, cast=float)
+WEBHOOK_MAX_RETRIES = config('WEBHOOK_MAX_RETRIES', default=5, cast=int)
+WEBHOOK_RETRY_BACKOFF_SECONDS = config('WEBHOOK_RETRY_BACKOFF_SECONDS', default=10, cast=int)
+WEBHOOK_POOL_SIZE = config('WEBHOOK_POOL_SIZE', default=10, cast=int)
+
+# Alert details show target counts and only this many team/user ids and names; the full
+# lists are paged at /api/admin/alerts/<id>/targets/teams/ and .../targets/users/
+ALERT_TARGET_PREVIEW = config('ALERT_TARGET_PREVIEW', default=10, cast=int)
+
+# Due reminders (including snooze wake-ups) are sent in batches of DUE_REMINDER_BATCH_SIZE;
+# a larger backlog is drained with up to DUE_REMINDER_MAX_BATCHES batches per minute,
+# which caps the reminder send rate
+DUE_REMINDER_BATCH_SIZE = config('DUE_REMINDER_BATCH_SIZE', default=500, cast=int)
+DUE_REMINDER_MAX_BATCHES = config('DUE_REMINDER_MAX_BATCHES', default=10, cast=int)
+
+# Give each user/alert pair a fixed slot within the reminder period so reminders
+# trickle out evenly instead of arriving for everyone at once
+REMINDER_SPREAD = config('REMINDER_SPREAD', default=True, cast=bool)
+
+# Snooze state is derived from snooze_until; cleanup of stale values is
+# incremental housekeeping done in small batches
+SNOOZE_CLEANUP_BATCH_SIZE = config('SNOOZE_CLEANUP_BATCH_SIZE', default=500, cast=int)
+SNOOZE_CLEANUP_MAX_BATCHES = config('SNOOZE_CLEANUP_MAX_BATCHES', default=10, cast=int)
+
 # Render deployment settings
 ALLOWED_HOSTS = ['*']  # Or specific domain
 
@@ -181,4 +365,4 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Middleware - add WhiteNoise (after SecurityMiddleware)
-MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+MIDDLEWARE.insert(MIDDLEWARE.index('corsheaders.middleware.CorsMiddleware') + 1, 'whitenoise.middleware.WhiteNoiseMiddleware')
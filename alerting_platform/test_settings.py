@@ -0,0 +1,48 @@
+"""
+Settings for the test suite:
+
+    python manage.py test --settings=alerting_platform.test_settings
+
+Two SQLite databases stand in for MySQL: `default` and a read replica
+`replica1` that mirrors it. Celery runs tasks inline on an in-memory broker.
+"""
+import os
+
+# The MySQL connection settings are required by settings.py but unused here
+for name in ('DB_NAME', 'DB_USER', 'DB_PASSWORD', 'DB_HOST', 'DB_PORT'):
+    os.environ.setdefault(name, '')
+os.environ.setdefault('REDIS_URL', 'memory://')
+
+from .settings import *  # noqa: E402,F401,F403
+
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test-default.sqlite3',
+    },
+    'replica1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test-replica1.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+REPLICA_DATABASES = ['replica1']
+SHARD_DATABASES = ['default']
+SHARDING_ENABLED = False
+
+CACHES = {
+    'default': {
+        'BACKEND': 'alerts.cache.InstrumentedLocMemCache',
+    }
+}
+
+CELERY_BROKER_URL = 'memory://'
+CELERY_RESULT_BACKEND = 'cache+memory://'
+CELERY_TASK_ALWAYS_EAGER = True
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+MIDDLEWARE = [name for name in MIDDLEWARE if not name.startswith('whitenoise.')]
+
+LOGGING['loggers']['alerts']['level'] = 'WARNING'
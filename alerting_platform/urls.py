@@ -10,6 +10,7 @@ router = DefaultRouter()
 router.register(r'admin/alerts', views.AdminAlertViewSet, basename='admin-alerts')
 router.register(r'user/alerts', views.UserAlertViewSet, basename='user-alerts')
 router.register(r'teams', views.TeamViewSet, basename='teams')
+router.register(r'webhooks', views.WebhookEndpointViewSet, basename='webhooks')
 
 urlpatterns = [
     # Django Admin
@@ -25,12 +26,28 @@ urlpatterns = [
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
     path('api/auth/refresh', TokenRefreshView.as_view(), name='token-refresh-no-slash'),
     
+    # Event ingestion
+    path('api/events/', views.ingest_events, name='ingest-events'),
+    path('api/events', views.ingest_events, name='ingest-events-no-slash'),
+    
     # Analytics
     path('api/analytics/', views.system_analytics, name='system-analytics'),
     path('api/analytics', views.system_analytics, name='system-analytics-no-slash'),
+    path('api/analytics/queues/', views.queue_analytics, name='queue-analytics'),
+    path('api/analytics/queues', views.queue_analytics, name='queue-analytics-no-slash'),
     path('api/analytics/alerts/<int:alert_id>/', views.alert_analytics, name='alert-analytics'),
     path('api/analytics/alerts/<int:alert_id>', views.alert_analytics, name='alert-analytics-no-slash'),
     
+    # Prometheus metrics
+    path('api/metrics/', views.prometheus_metrics, name='prometheus-metrics'),
+    path('api/metrics', views.prometheus_metrics, name='prometheus-metrics-no-slash'),
+    
+    # Request profiles
+    path('api/profiles/', views.request_profiles, name='request-profiles'),
+    path('api/profiles', views.request_profiles, name='request-profiles-no-slash'),
+    path('api/profiles/<str:profile_id>/', views.request_profile, name='request-profile'),
+    path('api/profiles/<str:profile_id>', views.request_profile, name='request-profile-no-slash'),
+    
     # Router URLs (includes all viewsets)
     path('api/', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,6 +1,16 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Team, Alert, NotificationDelivery, UserAlertPreference
+from django.utils import timezone
+from .models import (
+    User, Team, Alert, NotificationDelivery, NotificationDigest, NotificationFailure,
+    UserAlertPreference, Organization, OrganizationShard
+)
+
+
+@admin.register(Organization)
+class OrganizationAdmin(admin.ModelAdmin):
+    list_display = ['name', 'created_at']
+    search_fields = ['name']
 
 
 @admin.register(User)
@@ -34,20 +44,61 @@ class AlertAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('created_by')
 
 
+class NotificationFailureInline(admin.StackedInline):
+    model = NotificationFailure
+    extra = 0
+
+
 @admin.register(NotificationDelivery)
 class NotificationDeliveryAdmin(admin.ModelAdmin):
     list_display = ['alert', 'user', 'delivery_type', 'status', 'is_reminder', 'sent_at']
     list_filter = ['status', 'delivery_type', 'is_reminder']
     search_fields = ['alert__title', 'user__username']
-    date_hierarchy = 'created_at'
+    date_hierarchy = 'sent_at'
     
-    readonly_fields = ['created_at', 'updated_at']
+    inlines = [NotificationFailureInline]
+
+
+@admin.register(NotificationDigest)
+class NotificationDigestAdmin(admin.ModelAdmin):
+    list_display = ['user', 'delivery_type', 'status', 'alert_count', 'sent_at']
+    list_filter = ['status', 'delivery_type']
+    search_fields = ['user__username']
+    date_hierarchy = 'sent_at'
+
+
+class SnoozedListFilter(admin.SimpleListFilter):
+    """Filter preferences by whether their snooze is still running"""
+    title = 'snoozed'
+    parameter_name = 'snoozed'
+    
+    def lookups(self, request, model_admin):
+        return [('yes', 'Yes'), ('no', 'No')]
+    
+    def queryset(self, request, queryset):
+        now = timezone.now()
+        if self.value() == 'yes':
+            return queryset.filter(snooze_until__gt=now)
+        if self.value() == 'no':
+            return queryset.exclude(snooze_until__gt=now)
+        return queryset
 
 
 @admin.register(UserAlertPreference)
 class UserAlertPreferenceAdmin(admin.ModelAdmin):
     list_display = ['user', 'alert', 'is_read', 'is_snoozed', 'snooze_until']
-    list_filter = ['is_read', 'is_snoozed']
+    list_filter = ['is_read', SnoozedListFilter]
     search_fields = ['user__username', 'alert__title']
     
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(OrganizationShard)
+class OrganizationShardAdmin(admin.ModelAdmin):
+    # organization_id, not organization: the row lives on its shard, not on default
+    list_display = ['name', 'organization_id', 'database', 'is_moving', 'updated_at']
+    list_filter = ['database', 'is_moving']
+    search_fields = ['name']
+    raw_id_fields = ['organization']
+    
     readonly_fields = ['created_at', 'updated_at']
\ No newline at end of file
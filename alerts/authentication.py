@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .routers import activate_shard, current_shard
+from .sharding import directory_entry, find_organization
+
+
+# Fields needed to authenticate and authorize a request without touching the
+# users table; anything else is loaded lazily as a deferred field
+CACHED_USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'role', 'team_id', 'organization_id', 'is_active', 'is_staff', 'is_superuser',
+)
+
+
+def _user_cache_key(database, user_id):
+    return f'auth-user:{database}:{user_id}'
+
+
+def invalidate_cached_user(user_id, database='default'):
+    """Drop the cached authentication record for a user"""
+    cache.delete(_user_cache_key(database, user_id))
+
+
+def invalidate_cached_users(user_ids, database='default'):
+    """Drop cached authentication records after a bulk update that skips signals"""
+    cache.delete_many([_user_cache_key(database, user_id) for user_id in user_ids])
+
+
+def tokens_for_user(user):
+    """Issue a refresh token carrying the claims used to route the request"""
+    refresh = RefreshToken.for_user(user)
+    refresh['org'] = user.organization_id
+    return refresh
+
+
+class OrganizationJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that activates the organization's shard from the
+    token's org (id) claim (read-only while it is being moved), then resolves
+    the user from a short-lived cache.
+    Cache entries are dropped whenever the user is saved or deleted.
+    """
+    
+    def get_user(self, validated_token):
+        organization = validated_token.get('org')
+        if settings.SHARDING_ENABLED and organization:
+            if isinstance(organization, str):
+                # Tokens issued before the directory was keyed by id carry the name
+                _organization_id, alias, moving = find_organization(organization)
+            else:
+                alias, moving = directory_entry(organization)
+            activate_shard(alias, frozen=moving)
+        
+        # Revocation checks need the password hash, which is never cached
+        if not settings.AUTH_USER_CACHE_SECONDS or api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+        
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+        
+        database = current_shard() or 'default'
+        key = _user_cache_key(database, user_id)
+        values = cache.get(key)
+        
+        if values is None:
+            user = super().get_user(validated_token)
+            cache.set(
+                key,
+                {field: getattr(user, field) for field in CACHED_USER_FIELDS},
+                settings.AUTH_USER_CACHE_SECONDS
+            )
+            return user
+        
+        # Fields that were not cached stay deferred, so saving this instance
+        # only writes the cached columns and never blanks the password
+        fields = [
+            field.attname for field in self.user_model._meta.concrete_fields
+            if field.attname in values
+        ]
+        user = self.user_model.from_db(database, fields, [values[name] for name in fields])
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
@@ -0,0 +1,395 @@
+import contextlib
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .models import Alert, NotificationDelivery, User, UserAlertPreference
+
+
+# Arguments passed to seed_data for each dataset size
+DATASET_SIZES = {
+    'small': {'organizations': 2, 'teams': 5, 'users': 200, 'alerts': 50, 'deliveries': 5000, 'preferences': 2000},
+    'medium': {'organizations': 5, 'teams': 10, 'users': 2000, 'alerts': 300, 'deliveries': 50000, 'preferences': 20000},
+    'large': {'organizations': 20, 'teams': 20, 'users': 20000, 'alerts': 2000, 'deliveries': 500000, 'preferences': 200000},
+}
+
+# name -> function(dataset) that prepares a run and returns the callable to time
+SCENARIOS = {}
+
+# name -> function(dataset) returning (expected, actual) data that must render identically
+PARITY_CHECKS = {}
+
+
+def scenario(name):
+    """Register a benchmark scenario"""
+    def register(func):
+        SCENARIOS[name] = func
+        return func
+    return register
+
+
+def parity_check(name):
+    """Register a check that a fast path produces the same output as the reference"""
+    def register(func):
+        PARITY_CHECKS[name] = func
+        return func
+    return register
+
+
+class Dataset:
+    """Ids of the rows scenarios work on, picked once per seeded dataset"""
+    
+    def __init__(self):
+        now = timezone.now()
+        self.admin = User.objects.filter(role='admin').order_by('id').first()
+        self.user = User.objects.filter(role='user', team__isnull=False).order_by('id').first()
+        
+        # The active organization-wide alert with the largest audience
+        self.fanout_alert_id = (
+            Alert.objects.filter(
+                visibility_type='Organization',
+                is_active=True,
+                is_archived=False,
+                expiry_time__gt=now
+            )
+            .annotate(audience=Count('target_organization__users'))
+            .order_by('-audience', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        
+        # The user with the most preferences, and up to 100 of their alerts
+        self.preference_user = User.objects.get(id=(
+            UserAlertPreference.objects.values('user')
+            .annotate(count=Count('id'))
+            .order_by('-count', 'user')
+            .values_list('user', flat=True)
+            .first()
+        ))
+        self.preference_alert_ids = list(
+            UserAlertPreference.objects.filter(user=self.preference_user)
+            .order_by('alert_id')
+            .values_list('alert_id', flat=True)[:100]
+        )
+        
+        # The alert with the most delivery rows
+        self.busiest_alert_id = (
+            NotificationDelivery.objects.values('alert')
+            .annotate(count=Count('id'))
+            .order_by('-count', 'alert')
+            .values_list('alert', flat=True)
+            .first()
+        )
+    
+    def get(self, user, path):
+        """Callable issuing an authenticated GET; a failing request fails the benchmark"""
+        client = APIClient()
+        client.force_authenticate(user)
+        
+        def request():
+            response = client.get(path)
+            if response.status_code != 200:
+                raise AssertionError(f'GET {path} returned {response.status_code}')
+            return response
+        return request
+
+
+# ==================== Measurement ====================
+
+class QueryCounter:
+    """Execute wrapper counting queries without the cost of recording SQL"""
+    
+    def __init__(self):
+        self.count = 0
+    
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _run_once(func, dataset, trace_memory=False):
+    """Prepare and time one run inside a transaction that is rolled back afterwards"""
+    counter = QueryCounter()
+    with transaction.atomic():
+        run = func(dataset)
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            if trace_memory:
+                tracemalloc.start()
+            started = time.perf_counter()
+            try:
+                run()
+            finally:
+                elapsed = time.perf_counter() - started
+                peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+                if trace_memory:
+                    tracemalloc.stop()
+        transaction.set_rollback(True)
+    return elapsed, counter.count, peak
+
+
+def measure(name, dataset, repeat=5):
+    """
+    Median wall time and query count over `repeat` runs; peak memory comes from
+    one extra run under tracemalloc, which would otherwise distort the timings.
+    """
+    func = SCENARIOS[name]
+    _run_once(func, dataset)  # warm-up
+    
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        elapsed, queries, _peak = _run_once(func, dataset)
+        timings.append(elapsed)
+    _elapsed, _queries, peak = _run_once(func, dataset, trace_memory=True)
+    
+    return {
+        'wall_ms': round(statistics.median(timings) * 1000, 3),
+        'min_ms': round(min(timings) * 1000, 3),
+        'queries': queries,
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def check_parity(dataset):
+    """Names of the parity checks whose two outputs render differently"""
+    renderer = JSONRenderer()
+    failures = []
+    for name, func in PARITY_CHECKS.items():
+        with transaction.atomic():
+            expected, actual = func(dataset)
+            if renderer.render(expected) != renderer.render(actual):
+                failures.append(name)
+            transaction.set_rollback(True)
+    return failures
+
+
+def compare(results, baseline, threshold):
+    """
+    Regressions of `results` against `baseline`: wall time or peak memory more
+    than `threshold` (a fraction) above the baseline, or any extra query.
+    """
+    regressions = []
+    for size, scenarios in results.items():
+        for name, current in scenarios.items():
+            previous = baseline.get(size, {}).get(name)
+            if not previous:
+                continue
+            for metric in ('wall_ms', 'peak_kb'):
+                if previous[metric] and current[metric] > previous[metric] * (1 + threshold):
+                    regressions.append(
+                        f'{size}/{name}: {metric} {previous[metric]} -> {current[metric]} '
+                        f'(+{(current[metric] / previous[metric] - 1) * 100:.0f}%)'
+                    )
+            if current['queries'] > previous['queries']:
+                regressions.append(f'{size}/{name}: queries {previous["queries"]} -> {current["queries"]}')
+    return regressions
+
+
+# ==================== Scenarios ====================
+
+@scenario('send_alert')
+def send_alert_scenario(dataset):
+    from .services import NotificationService
+    
+    return lambda: NotificationService().send_alert(dataset.fanout_alert_id)
+
+
+@scenario('send_alert_templated')
+def send_alert_templated_scenario(dataset):
+    from .services import NotificationService
+    
+    # Per-recipient name plus team and organization, so both joins and most renders are exercised
+    Alert.objects.filter(id=dataset.fanout_alert_id).update(
+        title='{{ user.name }}: {{ fields.service }} degraded',
+        message='Your team {{ team.name }} at {{ organization.name }} owns {{ fields.service }}.',
+        template_fields={'service': 'payments'}
+    )
+    return lambda: NotificationService().send_alert(dataset.fanout_alert_id)
+
+
+@scenario('process_reminders')
+def process_reminders_scenario(dataset):
+    from .tasks import process_reminders
+    
+    # Every recipient needs a schedule, as right after a burst of new alerts
+    UserAlertPreference.objects.update(next_reminder_at=None)
+    return lambda: process_reminders.run()
+
+
+@scenario('reset_expired_snoozes')
+def reset_expired_snoozes_scenario(dataset):
+    from .tasks import reset_expired_snoozes
+    
+    now = timezone.now()
+    UserAlertPreference.objects.filter(id__in=list(
+        UserAlertPreference.objects.order_by('id').values_list('id', flat=True)[::4]
+    )).update(snoozed_at=now - timedelta(hours=2), snooze_until=now - timedelta(hours=1))
+    return lambda: reset_expired_snoozes.run()
+
+
+@scenario('user_inbox')
+def user_inbox_scenario(dataset):
+    return dataset.get(dataset.user, '/api/user/alerts/')
+
+
+@scenario('system_analytics')
+def system_analytics_scenario(dataset):
+    return dataset.get(dataset.admin, '/api/analytics/')
+
+
+@scenario('alert_analytics')
+def alert_analytics_scenario(dataset):
+    return dataset.get(dataset.admin, f'/api/analytics/alerts/{dataset.busiest_alert_id}/')
+
+
+@scenario('admin_alert_list')
+def admin_alert_list_scenario(dataset):
+    return dataset.get(dataset.admin, '/api/admin/alerts/')
+
+
+@scenario('admin_alert_search')
+def admin_alert_search_scenario(dataset):
+    return dataset.get(dataset.admin, '/api/admin/alerts/?search=timeout+replica')
+
+
+@scenario('user_inbox_search')
+def user_inbox_search_scenario(dataset):
+    return dataset.get(dataset.user, '/api/user/alerts/?search=timeout+replica')
+
+
+# ==================== Serializer Fast Paths ====================
+
+def _admin_list_drf():
+    from .serializers import AlertListSerializer
+    
+    return AlertListSerializer(Alert.objects.select_related('created_by').order_by('id')[:100], many=True).data
+
+
+def _admin_list_fast():
+    from .serializers import ALERT_LIST_VALUES, alert_list_rows
+    
+    return alert_list_rows(Alert.objects.order_by('id').values(*ALERT_LIST_VALUES)[:100])
+
+
+def _inbox_drf(dataset):
+    from .serializers import UserAlertSerializer
+    
+    alerts = Alert.objects.filter(id__in=dataset.preference_alert_ids).select_related('created_by').order_by('id')
+    return UserAlertSerializer(alerts, many=True, context={'user': dataset.preference_user}).data
+
+
+def _inbox_fast(dataset):
+    from .serializers import USER_ALERT_VALUES, user_alert_rows
+    
+    rows = Alert.objects.filter(id__in=dataset.preference_alert_ids).order_by('id').values(*USER_ALERT_VALUES)
+    return user_alert_rows(rows, dataset.preference_user)
+
+
+@parity_check('admin_alert_list')
+def admin_alert_list_parity(dataset):
+    return _admin_list_drf(), _admin_list_fast()
+
+
+@parity_check('user_inbox')
+def user_inbox_parity(dataset):
+    # Cover read, snoozed and expired-snooze rows
+    now = timezone.now()
+    preferences = UserAlertPreference.objects.filter(user=dataset.preference_user)
+    preferences.filter(alert_id__in=dataset.preference_alert_ids[::3]).update(is_read=True)
+    preferences.filter(alert_id__in=dataset.preference_alert_ids[1::3]).update(snooze_until=now + timedelta(hours=1))
+    preferences.filter(alert_id__in=dataset.preference_alert_ids[2::3]).update(snooze_until=now - timedelta(hours=1))
+    return _inbox_drf(dataset), _inbox_fast(dataset)
+
+
+@scenario('serialize_admin_list_drf')
+def serialize_admin_list_drf_scenario(dataset):
+    return _admin_list_drf
+
+
+@scenario('serialize_admin_list_fast')
+def serialize_admin_list_fast_scenario(dataset):
+    return _admin_list_fast
+
+
+@scenario('serialize_inbox_drf')
+def serialize_inbox_drf_scenario(dataset):
+    return lambda: _inbox_drf(dataset)
+
+
+@scenario('serialize_inbox_fast')
+def serialize_inbox_fast_scenario(dataset):
+    return lambda: _inbox_fast(dataset)
+
+
+# ==================== JSON Rendering ====================
+
+# Read endpoints whose response size is reported with and without gzip
+WIRE_ENDPOINTS = {
+    'system_analytics': ('admin', '/api/analytics/'),
+    'admin_alert_list': ('admin', '/api/admin/alerts/'),
+    'user_inbox': ('user', '/api/user/alerts/'),
+}
+
+
+def render_payloads(dataset):
+    """Large responses to render: analytics, a 500-row admin list and the busiest inbox"""
+    if not hasattr(dataset, 'payloads'):
+        from .serializers import ALERT_LIST_VALUES, alert_list_rows
+        
+        dataset.payloads = {
+            'system_analytics': dataset.get(dataset.admin, '/api/analytics/')().data,
+            'admin_alert_list': alert_list_rows(Alert.objects.order_by('id').values(*ALERT_LIST_VALUES)[:500]),
+            'user_inbox': _inbox_fast(dataset),
+        }
+    return dataset.payloads
+
+
+def wire_sizes(dataset):
+    """Response bytes of each WIRE_ENDPOINTS entry, plain and gzipped by the middleware"""
+    sizes = {}
+    for name, (role, path) in WIRE_ENDPOINTS.items():
+        client = APIClient()
+        client.force_authenticate(dataset.admin if role == 'admin' else dataset.user)
+        plain = client.get(path)
+        compressed = client.get(path, HTTP_ACCEPT_ENCODING='gzip')
+        sizes[name] = {
+            'bytes': len(plain.content),
+            'gzip_bytes': len(compressed.content),
+            'encoding': compressed.get('Content-Encoding', 'identity'),
+        }
+    return sizes
+
+
+@parity_check('json_renderer')
+def json_renderer_parity(dataset):
+    from .renderers import FastJSONRenderer
+    
+    payloads = render_payloads(dataset)
+    return (
+        [JSONRenderer().render(payload) for payload in payloads.values()],
+        [FastJSONRenderer().render(payload) for payload in payloads.values()],
+    )
+
+
+def _render_scenario(name, renderer_path):
+    def prepare(dataset):
+        from django.utils.module_loading import import_string
+        
+        renderer = import_string(renderer_path)()
+        payload = render_payloads(dataset)[name]
+        return lambda: renderer.render(payload)
+    return prepare
+
+
+for _name in ('system_analytics', 'admin_alert_list', 'user_inbox'):
+    scenario(f'render_{_name}_drf')(_render_scenario(_name, 'rest_framework.renderers.JSONRenderer'))
+    scenario(f'render_{_name}_fast')(_render_scenario(_name, 'alerts.renderers.FastJSONRenderer'))
@@ -0,0 +1,30 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+from .metrics import record_cache_lookups
+
+
+_missing = object()
+
+
+class CacheMetricsMixin:
+    """Count hits and misses against the request being handled"""
+    
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        record_cache_lookups(value is not _missing, value is _missing)
+        return default if value is _missing else value
+
+
+class InstrumentedLocMemCache(CacheMetricsMixin, LocMemCache):
+    """Per-process cache; its get_many goes through get, so lookups are already counted"""
+
+
+class InstrumentedRedisCache(CacheMetricsMixin, RedisCache):
+    """Shared Redis cache"""
+    
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = super().get_many(keys, version)
+        record_cache_lookups(len(values), len(keys) - len(values))
+        return values
@@ -0,0 +1,116 @@
+import functools
+import logging
+import secrets
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .metrics import record_task_overlap
+from .models import TaskLease
+
+
+logger = logging.getLogger(__name__)
+
+
+# Deletes the key only if it still holds our token, so an expired lease that
+# another worker has since taken over is never released by the old holder
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _lease_key(name):
+    return f'task-lease:{name}'
+
+
+def uses_redis_leases():
+    """Redis leases need the shared Redis cache; per-process caches fall back to the database"""
+    # `cache` is a proxy, so check the backend it points at
+    return isinstance(caches['default'], RedisCache)
+
+
+# ==================== Redis Leases ====================
+
+def _acquire_redis(name, token, ttl):
+    # Django's RedisCache.add is SET NX EX; integers are stored unpickled
+    return cache.add(_lease_key(name), token, ttl)
+
+
+def _release_redis(name, token):
+    key = cache.make_and_validate_key(_lease_key(name))
+    client = cache._cache.get_client(key, write=True)
+    client.eval(RELEASE_SCRIPT, 1, key, str(token))
+
+
+# ==================== Database Leases ====================
+
+def _acquire_database(name, token, ttl):
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=ttl)
+    
+    # Take over an expired lease with a conditional update...
+    if TaskLease.objects.filter(name=name, expires_at__lte=now).update(owner=token, expires_at=expires_at):
+        return True
+    
+    # ...or create it; the unique name makes concurrent creators race safely
+    try:
+        with transaction.atomic(using='default'):
+            TaskLease.objects.create(name=name, owner=token, expires_at=expires_at)
+        return True
+    except IntegrityError:
+        return False
+
+
+def _release_database(name, token):
+    TaskLease.objects.filter(name=name, owner=token).delete()
+
+
+# ==================== Public API ====================
+
+@contextmanager
+def task_lease(name, ttl=None):
+    """
+    Hold a lease named `name` for the duration of the block.
+    Yields True if the lease was acquired, False if another holder has it.
+    The lease expires after `ttl` seconds even if the holder dies.
+    """
+    ttl = ttl or settings.TASK_LEASE_SECONDS
+    token = secrets.randbits(62)
+    
+    if uses_redis_leases():
+        acquire, release = _acquire_redis, _release_redis
+    else:
+        acquire, release = _acquire_database, _release_database
+        token = str(token)
+    
+    acquired = acquire(name, token, ttl)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            release(name, token)
+
+
+def single_instance(func):
+    """
+    Decorator for periodic tasks: skip the run (and count an overlap) when a
+    previous run for the same shard still holds the lease.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        name = f"{func.__module__}.{func.__name__}:{kwargs.get('database') or 'all'}"
+        with task_lease(name) as acquired:
+            if not acquired:
+                record_task_overlap(func.__name__)
+                logger.warning("Skipping %s: previous run still in progress", func.__name__)
+                return {'success': False, 'reason': 'overlap'}
+            return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from alerts.models import Organization, OrganizationShard
+from alerts.sharding import shard_databases, assign_organization
+
+
+class Command(BaseCommand):
+    help = 'Record the shard of every existing organization in the shard directory'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be recorded')
+    
+    def handle(self, *args, **options):
+        known = dict(OrganizationShard.objects.values_list('organization_id', 'database'))
+        found = {}
+        
+        for alias in shard_databases():
+            # Organizations that own rows on this shard
+            owners = Organization.objects.using(alias).filter(Q(users__isnull=False) | Q(teams__isnull=False))
+            
+            for organization in owners.distinct():
+                # Names are unique in the directory, e.g. the default organization is on every shard
+                if organization.name in found:
+                    self.stdout.write(self.style.WARNING(
+                        f'! {organization} has rows on {found[organization.name][1]} and {alias}; '
+                        f'keeping {found[organization.name][1]}'
+                    ))
+                    continue
+                found[organization.name] = (organization, alias)
+        
+        recorded = 0
+        for name, (organization, alias) in sorted(found.items()):
+            if known.get(organization.pk) == alias:
+                continue
+            self.stdout.write(f'  - {organization} -> {alias}')
+            if not options['dry_run']:
+                assign_organization(organization, alias)
+            recorded += 1
+        
+        self.stdout.write(self.style.SUCCESS(f'✓ Recorded {recorded} organizations ({len(found)} total)'))
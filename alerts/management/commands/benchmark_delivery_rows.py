@@ -0,0 +1,162 @@
+import time
+from datetime import timedelta
+
+from django.apps.registry import Apps
+from django.core.management.base import BaseCommand
+from django.db import connections, models
+from django.utils import timezone
+
+
+# Throwaway models live in their own registry so they never touch the app registry
+bench_apps = Apps()
+
+
+def build_models():
+    """Legacy and compact NotificationDelivery layouts, without foreign key constraints"""
+    
+    class LegacyDelivery(models.Model):
+        alert_id = models.BigIntegerField()
+        user_id = models.BigIntegerField()
+        delivery_type = models.CharField(max_length=20)
+        status = models.CharField(max_length=20)
+        sent_at = models.DateTimeField(null=True)
+        read_at = models.DateTimeField(null=True)
+        failure_reason = models.TextField(blank=True)
+        is_reminder = models.BooleanField(default=False)
+        reminder_count = models.IntegerField(default=0)
+        created_at = models.DateTimeField()
+        updated_at = models.DateTimeField()
+        
+        class Meta:
+            app_label = 'alerts'
+            apps = bench_apps
+            db_table = 'bench_legacy_deliveries'
+            indexes = [
+                models.Index(fields=['alert_id', 'user_id'], name='bench_legacy_alert_user'),
+                models.Index(fields=['user_id', 'status'], name='bench_legacy_user_status'),
+            ]
+    
+    class CompactDelivery(models.Model):
+        alert_id = models.BigIntegerField()
+        user_id = models.BigIntegerField()
+        delivery_type = models.PositiveSmallIntegerField()
+        status = models.PositiveSmallIntegerField()
+        sent_at = models.DateTimeField(null=True)
+        read_at = models.DateTimeField(null=True)
+        is_reminder = models.BooleanField(default=False)
+        
+        class Meta:
+            app_label = 'alerts'
+            apps = bench_apps
+            db_table = 'bench_compact_deliveries'
+            indexes = [
+                models.Index(fields=['alert_id', 'user_id'], name='bench_compact_alert_user'),
+                models.Index(fields=['user_id', 'status'], name='bench_compact_user_status'),
+            ]
+    
+    return LegacyDelivery, CompactDelivery
+
+
+class Command(BaseCommand):
+    help = 'Compare insert throughput and rows per page of the legacy and compact delivery row formats'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--database', default='default')
+    
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        rows = options['rows']
+        batch_size = options['batch_size']
+        legacy_model, compact_model = build_models()
+        
+        now = timezone.now()
+        
+        def legacy_row(i):
+            return legacy_model(
+                alert_id=i % 500 + 1, user_id=i % 10000 + 1,
+                delivery_type='InApp', status='sent',
+                sent_at=now - timedelta(seconds=i), failure_reason='',
+                is_reminder=i % 3 == 0, reminder_count=1 if i % 3 == 0 else 0,
+                created_at=now, updated_at=now,
+            )
+        
+        def compact_row(i):
+            return compact_model(
+                alert_id=i % 500 + 1, user_id=i % 10000 + 1,
+                delivery_type=1, status=1,
+                sent_at=now - timedelta(seconds=i),
+                is_reminder=i % 3 == 0,
+            )
+        
+        results = {}
+        with connection.schema_editor() as editor:
+            editor.create_model(legacy_model)
+            editor.create_model(compact_model)
+        try:
+            for label, model, factory in (
+                ('legacy', legacy_model, legacy_row),
+                ('compact', compact_model, compact_row),
+            ):
+                pages_before = self.allocated_pages(connection)
+                started = time.perf_counter()
+                for start in range(0, rows, batch_size):
+                    model.objects.using(connection.alias).bulk_create(
+                        [factory(i) for i in range(start, min(start + batch_size, rows))]
+                    )
+                elapsed = time.perf_counter() - started
+                results[label] = {
+                    'rows_per_second': rows / elapsed,
+                    **self.storage(connection, model, rows, pages_before),
+                }
+        finally:
+            with connection.schema_editor() as editor:
+                editor.delete_model(legacy_model)
+                editor.delete_model(compact_model)
+        
+        self.stdout.write(f'{rows} rows on {connection.vendor} ({options["database"]})')
+        for label, metrics in results.items():
+            self.stdout.write(
+                f'  {label:<8} {metrics["rows_per_second"]:>10.0f} rows/s  '
+                f'{metrics["bytes_per_row"]:>7.1f} bytes/row  {metrics["rows_per_page"]:>6.1f} rows/page'
+            )
+        legacy, compact = results['legacy'], results['compact']
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Insert throughput x{compact["rows_per_second"] / legacy["rows_per_second"]:.2f}, '
+            f'rows per page x{compact["rows_per_page"] / legacy["rows_per_page"]:.2f}'
+        ))
+    
+    def allocated_pages(self, connection):
+        if connection.vendor != 'sqlite':
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA page_count')
+            return cursor.fetchone()[0]
+    
+    def storage(self, connection, model, rows, pages_before):
+        """Bytes per row and rows per page, table and indexes included"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('PRAGMA page_size')
+                page_size = cursor.fetchone()[0]
+                pages = self.allocated_pages(connection) - pages_before
+                total_bytes = pages * page_size
+            elif connection.vendor == 'mysql':
+                page_size = 16384  # InnoDB default
+                cursor.execute(f'ANALYZE TABLE {model._meta.db_table}')
+                cursor.fetchall()
+                cursor.execute(
+                    'SELECT data_length + index_length FROM information_schema.tables '
+                    'WHERE table_schema = DATABASE() AND table_name = %s',
+                    [model._meta.db_table]
+                )
+                total_bytes = cursor.fetchone()[0]
+            else:
+                return {'bytes_per_row': 0.0, 'rows_per_page': 0.0}
+        
+        bytes_per_row = total_bytes / rows
+        return {
+            'bytes_per_row': bytes_per_row,
+            'rows_per_page': page_size / bytes_per_row if bytes_per_row else 0.0,
+        }
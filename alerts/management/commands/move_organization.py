@@ -0,0 +1,191 @@
+import time
+from contextlib import ExitStack
+
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from alerts.locks import task_lease
+from alerts.metrics import PERIODIC_TASKS
+from alerts.models import (
+    Organization, User, Team, Alert, AlertDedupKey, DigestItem, NotificationDelivery,
+    NotificationDigest, NotificationFailure, UserAlertPreference, WebhookEndpoint
+)
+from alerts.sharding import (
+    DIRECTORY_CACHE_SECONDS, shard_databases, find_organization, assign_organization,
+    set_organization_moving
+)
+
+
+class Command(BaseCommand):
+    help = 'Move an organization and all of its data to another shard'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('organization')
+        parser.add_argument('target', help='Database alias of the destination shard')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--keep-source', action='store_true',
+                            help='Leave the copied rows on the source shard')
+        parser.add_argument('--freeze-wait', type=int,
+                            help='Seconds to wait after freezing writes before copying (default: a few '
+                                 'seconds with a shared Redis cache, the directory cache lifetime otherwise)')
+        parser.add_argument('--pause-seconds', type=int, default=3600,
+                            help="Longest the source shard's periodic tasks stay paused if the move dies")
+    
+    def handle(self, *args, **options):
+        name = options['organization']
+        target = options['target']
+        batch_size = options['batch_size']
+        
+        if target not in shard_databases():
+            raise CommandError(f'Unknown shard "{target}"; expected one of {shard_databases()}')
+        
+        organization_id, source, _moving = find_organization(name)
+        if organization_id is None:
+            # Not in the directory yet: organizations from before sharding live on default
+            source = 'default'
+        organization = Organization.objects.using(source).filter(name=name).first()
+        if organization is None:
+            raise CommandError(f'Unknown organization "{name}"')
+        if source == target:
+            raise CommandError(f'{organization} already lives on {target}')
+        if organization_id is None:
+            # The freeze below is a flag on the directory entry
+            assign_organization(organization, source)
+        
+        # Migrations create an empty default organization on every shard
+        Organization.objects.using(target).filter(
+            name=name,
+            users__isnull=True,
+            teams__isnull=True,
+            alerts__isnull=True
+        ).delete()
+        
+        querysets = self.get_querysets(organization.pk, source)
+        self.validate(querysets, organization.pk, target)
+        
+        self.stdout.write(f'Moving {organization}: {source} -> {target}')
+        
+        # Freeze first: the tenant's requests turn read-only (writes get 503), its
+        # fan-out tasks are requeued and the source shard's periodic tasks pause,
+        # so no write lands on rows being copied
+        set_organization_moving(organization.pk, True)
+        moved = False
+        try:
+            with ExitStack() as paused:
+                self.pause_periodic_tasks(paused, source, options['pause_seconds'])
+                self.wait_for_freeze(options['freeze_wait'])
+                
+                # Copy parents before children so foreign keys resolve on the target
+                copied = {}
+                with transaction.atomic(using=target):
+                    for label, queryset in querysets:
+                        copied[label] = self.copy(queryset, target, batch_size)
+                        self.stdout.write(f'  - {label}: {copied[label]} rows')
+                
+                # Flip the directory; new requests now route to the target shard
+                assign_organization(organization, target)
+                moved = True
+                self.stdout.write(self.style.SUCCESS(f'✓ {organization} now routes to {target}'))
+                
+                if not options['keep_source']:
+                    self.remove_source(querysets, copied, organization, source)
+        finally:
+            if not moved:
+                set_organization_moving(organization.pk, False)
+    
+    def pause_periodic_tasks(self, stack, source, ttl, timeout=60):
+        """Hold the source shard's periodic task leases, waiting for running ones to finish"""
+        for name in PERIODIC_TASKS:
+            lease = f'alerts.tasks.{name}:{source}'
+            deadline = time.monotonic() + timeout
+            while not stack.enter_context(task_lease(lease, ttl)):
+                if time.monotonic() > deadline:
+                    raise CommandError(f'{name} is still running on {source}; try again later')
+                time.sleep(1)
+    
+    def wait_for_freeze(self, seconds):
+        """Give in-flight requests, and processes with a stale directory cache, time to see the freeze"""
+        if seconds is None:
+            shared = isinstance(caches['default'], RedisCache)
+            seconds = 5 if shared else DIRECTORY_CACHE_SECONDS
+        if seconds:
+            self.stdout.write(f'  Writes frozen; waiting {seconds}s for them to drain')
+            time.sleep(seconds)
+    
+    def remove_source(self, querysets, copied, organization, source):
+        """Delete the source rows, unless any appeared after they were copied"""
+        changed = [label for label, queryset in querysets if queryset.count() != copied[label]]
+        if changed:
+            self.stdout.write(self.style.WARNING(
+                f'! {", ".join(changed)} changed on {source} during the copy; source rows kept for review'
+            ))
+            return
+        
+        with transaction.atomic(using=source):
+            for label, queryset in reversed(querysets):
+                queryset.delete()
+        self.stdout.write(self.style.SUCCESS(f'✓ Removed {organization} rows from {source}'))
+    
+    def get_querysets(self, organization_id, source):
+        """Rows owned by the organization on the source shard, parents first"""
+        alerts = Alert.objects.using(source).filter(created_by__organization_id=organization_id)
+        return [
+            ('organization', Organization.objects.using(source).filter(id=organization_id)),
+            ('webhook endpoints', WebhookEndpoint.objects.using(source).filter(organization_id=organization_id)),
+            ('teams', Team.objects.using(source).filter(organization_id=organization_id)),
+            ('users', User.objects.using(source).filter(organization_id=organization_id)),
+            ('alerts', alerts),
+            ('alert target teams', Alert.target_teams.through.objects.using(source).filter(alert__in=alerts)),
+            ('alert target users', Alert.target_users.through.objects.using(source).filter(alert__in=alerts)),
+            ('alert dedup keys', AlertDedupKey.objects.using(source).filter(alert__in=alerts)),
+            ('preferences', UserAlertPreference.objects.using(source).filter(alert__in=alerts)),
+            ('deliveries', NotificationDelivery.objects.using(source).filter(alert__in=alerts)),
+            ('delivery failures', NotificationFailure.objects.using(source).filter(delivery__alert__in=alerts)),
+            ('digest items', DigestItem.objects.using(source).filter(alert__in=alerts)),
+            ('digests', NotificationDigest.objects.using(source).filter(user__organization_id=organization_id)),
+        ]
+    
+    def validate(self, querysets, organization_id, target):
+        """Refuse to move tenants that reference other tenants or collide on the target"""
+        rows = dict(querysets)
+        
+        foreign_checks = [
+            ('alert target teams', 'team__organization_id'),
+            ('alert target users', 'user__organization_id'),
+            ('preferences', 'user__organization_id'),
+            ('deliveries', 'user__organization_id'),
+            ('digest items', 'user__organization_id'),
+        ]
+        for label, lookup in foreign_checks:
+            if rows[label].exclude(**{lookup: organization_id}).exists():
+                raise CommandError(f'{label} reference another organization; cannot move')
+        
+        for label, queryset in querysets:
+            model = queryset.model
+            ids = queryset.values_list('pk', flat=True)
+            for start in range(0, queryset.count(), 1000):
+                chunk = list(ids.order_by('pk')[start:start + 1000])
+                if model.objects.using(target).filter(pk__in=chunk).exists():
+                    # Rows created before sharding was enabled have contiguous ids on
+                    # default; only ids allocated since then are interleaved
+                    raise CommandError(
+                        f'{label} primary keys already exist on {target}; rows are copied with '
+                        f'their ids, so tenants created before sharding cannot move onto a used shard'
+                    )
+    
+    def copy(self, queryset, target, batch_size):
+        """Copy rows with their primary keys in batches"""
+        model = queryset.model
+        copied = 0
+        batch = []
+        for obj in queryset.order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                model.objects.using(target).bulk_create(batch)
+                copied += len(batch)
+                batch = []
+        if batch:
+            model.objects.using(target).bulk_create(batch)
+            copied += len(batch)
+        return copied
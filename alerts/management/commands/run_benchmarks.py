@@ -0,0 +1,106 @@
+import io
+import json
+import platform
+import time
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+)
+from django.utils import timezone
+
+from alerts.benchmarks import DATASET_SIZES, SCENARIOS, Dataset, check_parity, compare, measure, wire_sizes
+
+
+class Command(BaseCommand):
+    help = 'Benchmark fan-out, reminders, inbox and analytics on seeded datasets in a throwaway database'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='small,medium', help=f'Comma-separated: {", ".join(DATASET_SIZES)}')
+        parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help='Run only these scenarios')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--baseline', help='Results file to compare against')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown as a fraction (0.25 = 25%%)')
+        parser.add_argument('--save-baseline', action='store_true', help='Write the results to --baseline instead of comparing')
+    
+    def handle(self, *args, **options):
+        sizes = [size.strip() for size in options['sizes'].split(',') if size.strip()]
+        unknown = set(sizes) - set(DATASET_SIZES)
+        if unknown:
+            raise CommandError(f'Unknown dataset sizes: {", ".join(sorted(unknown))}')
+        names = options['scenario'] or list(SCENARIOS)
+        
+        # Same throwaway database the test runner would use; never the real one
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default'})
+        results = {}
+        wire = {}
+        try:
+            for size in sizes:
+                results[size], wire[size] = self.run_size(size, names, options['repeat'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+        
+        report = {
+            'environment': {
+                'vendor': connection.vendor,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'recorded_at': timezone.now().isoformat(),
+            },
+            'results': results,
+            'wire': wire,
+        }
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'✓ Results written to {options["output"]}'))
+        
+        if not options['baseline']:
+            return
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'✓ Baseline saved to {options["baseline"]}'))
+            return
+        
+        with open(options['baseline']) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], options['threshold'])
+        if regressions:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'✓ No regressions against {options["baseline"]}'))
+    
+    def run_size(self, size, names, repeat):
+        self.stdout.write(f'Seeding {size} dataset...')
+        started = time.perf_counter()
+        call_command('flush', interactive=False, verbosity=0)
+        call_command('seed_data', stdout=io.StringIO(), **DATASET_SIZES[size])
+        dataset = Dataset()
+        self.stdout.write(f'  seeded in {time.perf_counter() - started:.1f}s')
+        
+        # Fast paths are only worth timing if they still match the reference output
+        failures = check_parity(dataset)
+        if failures:
+            raise CommandError(f'Fast path output differs from the reference: {", ".join(failures)}')
+        self.stdout.write('  fast path parity ok')
+        
+        results = {}
+        for name in names:
+            results[name] = measure(name, dataset, repeat)
+            metrics = results[name]
+            self.stdout.write(
+                f'  {name:<32} {metrics["wall_ms"]:>10.2f} ms  {metrics["queries"]:>6} queries  '
+                f'{metrics["peak_kb"]:>9.1f} KB peak'
+            )
+        
+        wire = wire_sizes(dataset)
+        for name, sizes in wire.items():
+            self.stdout.write(
+                f'  {name:<32} {sizes["bytes"]:>10} bytes  {sizes["gzip_bytes"]:>10} bytes ({sizes["encoding"]})'
+            )
+        return results, wire
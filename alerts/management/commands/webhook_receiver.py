@@ -0,0 +1,62 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from alerts.webhooks import ID_HEADER, SIGNATURE_HEADER, TIMESTAMP_HEADER, verify_signature
+
+
+class Command(BaseCommand):
+    help = 'Run a local HTTP server that receives, verifies and prints webhook posts (for testing)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--secret', help="Endpoint secret; signatures are checked when given")
+        parser.add_argument('--fail-first', type=int, default=0,
+                            help='Answer the first N posts with 503 to exercise retries')
+    
+    def handle(self, *args, **options):
+        command = self
+        state = {'received': 0}
+        
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so connection reuse by the sender is visible in the log
+            protocol_version = 'HTTP/1.1'
+            
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                state['received'] += 1
+                
+                if options['secret'] and not verify_signature(
+                    options['secret'], self.headers.get(TIMESTAMP_HEADER), body, self.headers.get(SIGNATURE_HEADER)
+                ):
+                    status = 401
+                elif state['received'] <= options['fail_first']:
+                    status = 503
+                else:
+                    status = 204
+                
+                payload = json.loads(body)
+                command.stdout.write(
+                    f"  {status} {self.headers.get(ID_HEADER)} attempt {payload.get('attempt')}: "
+                    f"{len(payload.get('deliveries', []))} deliveries from port {self.client_address[1]}"
+                )
+                
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            
+            def log_message(self, format, *args):
+                pass
+        
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Receiving webhooks on http://{options['host']}:{options['port']}/ (Ctrl+C to stop)"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
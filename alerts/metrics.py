@@ -0,0 +1,470 @@
+import copy
+import json
+import logging
+import os
+import secrets
+import socket
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from celery import current_app
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== Celery Queue Metrics ====================
+
+def queue_depths(queues=None):
+    """Number of messages waiting in each Celery queue"""
+    depths = {}
+    with current_app.connection_for_read() as connection:
+        for queue in queues or settings.ALERT_QUEUES:
+            # A fresh channel per queue; a failed passive declare closes the channel on AMQP
+            channel = connection.channel()
+            try:
+                depths[queue] = channel.queue_declare(queue=queue, passive=True).message_count
+            except Exception:
+                # Queues are created on first use, so a missing queue is empty
+                depths[queue] = 0
+            finally:
+                channel.close()
+    return depths
+
+
+# ==================== Periodic Task Metrics ====================
+
+PERIODIC_TASKS = ['process_reminders', 'process_due_reminders', 'flush_digests', 'reset_expired_snoozes']
+
+
+def _overlap_key(task_name):
+    return f'metrics:task-overlaps:{task_name}'
+
+
+def record_task_overlap(task_name):
+    """Count a periodic task run skipped because the previous run was still going"""
+    key = _overlap_key(task_name)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr
+        cache.set(key, 1, None)
+
+
+def task_overlaps(task_names=PERIODIC_TASKS):
+    """Skipped-overlap counts per periodic task"""
+    counts = cache.get_many([_overlap_key(name) for name in task_names])
+    return {name: counts.get(_overlap_key(name), 0) for name in task_names}
+
+
+# ==================== Request Metrics ====================
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Layout of the stats list kept per (view, method, status) series; bucket
+# counts are per bucket and only made cumulative when rendered
+COUNT, LATENCY_SUM, DB_QUERIES, DB_SECONDS, CACHE_HITS, CACHE_MISSES = range(6)
+LATENCY_OFFSET = 6
+QUERY_OFFSET = LATENCY_OFFSET + len(LATENCY_BUCKETS) + 1
+SERIES_LENGTH = QUERY_OFFSET + len(QUERY_BUCKETS) + 1
+
+
+class RequestStats:
+    """Database and cache activity of the request being handled; also an execute wrapper"""
+    
+    __slots__ = ('queries', 'db_seconds', 'cache_hits', 'cache_misses')
+    
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+    
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - started
+
+
+current_request_stats = ContextVar('current_request_stats', default=None)
+
+
+def record_cache_lookups(hits, misses):
+    """Count cache hits and misses against the request being handled, if any"""
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+class RequestMetrics:
+    """
+    Request series of this process. Every few seconds the totals are copied to
+    the shared cache so a scrape of any process sees every process.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+        self.flushed_at = time.monotonic()
+    
+    def observe(self, view, method, status, seconds, stats):
+        with self.lock:
+            values = self.series.get((view, method, status))
+            if values is None:
+                values = self.series[(view, method, status)] = [0] * SERIES_LENGTH
+            values[COUNT] += 1
+            values[LATENCY_SUM] += seconds
+            values[DB_QUERIES] += stats.queries
+            values[DB_SECONDS] += stats.db_seconds
+            values[CACHE_HITS] += stats.cache_hits
+            values[CACHE_MISSES] += stats.cache_misses
+            values[LATENCY_OFFSET + bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            values[QUERY_OFFSET + bisect_left(QUERY_BUCKETS, stats.queries)] += 1
+        
+        if time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_SECONDS:
+            self.flush()
+    
+    def flush(self):
+        self.flushed_at = time.monotonic()
+        with self.lock:
+            snapshot = {labels: list(values) for labels, values in self.series.items()}
+        publish_snapshot('requests', snapshot, settings.METRICS_FLUSH_SECONDS * 10)
+
+
+request_metrics = RequestMetrics()
+
+
+def request_series():
+    """
+    Request series of every process that flushed recently, keyed by (process, view,
+    method, status). Not summed: a restarted process starts a new series instead of
+    making a total go backwards.
+    """
+    request_metrics.flush()
+    return {
+        (process, *labels): values
+        for process, snapshot in collect_snapshots('requests').items()
+        for labels, values in snapshot.items()
+    }
+
+
+# ==================== Task Run Metrics ====================
+
+# Runs are infrequent, so worker totals are kept for a day after the last run
+TASK_METRICS_TTL = 24 * 60 * 60
+
+
+class RunStats(RequestStats):
+    """Recipients, sends per channel, skips and time split of one task run"""
+    
+    __slots__ = ('task', 'database', 'started', 'recipients', 'sent', 'skipped', 'counts', 'channel_seconds')
+    
+    def __init__(self, task, database=None):
+        super().__init__()
+        self.task = task
+        self.database = database
+        self.started = time.perf_counter()
+        self.recipients = 0
+        self.sent = defaultdict(int)
+        self.skipped = defaultdict(int)
+        self.counts = defaultdict(int)
+        self.channel_seconds = 0.0
+    
+    def record(self):
+        """Compact run record, logged and kept as the task's last run"""
+        seconds = time.perf_counter() - self.started
+        return {
+            'task': self.task,
+            'database': self.database or 'default',
+            'seconds': round(seconds, 3),
+            'recipients': self.recipients,
+            'sent': dict(self.sent),
+            'sendsPerSecond': {channel: round(count / seconds, 1) for channel, count in self.sent.items()} if seconds else {},
+            'skipped': dict(self.skipped),
+            'counts': dict(self.counts),
+            'queries': self.queries,
+            'dbSeconds': round(self.db_seconds, 3),
+            'channelSeconds': round(self.channel_seconds, 3),
+        }
+
+
+current_run_stats = ContextVar('current_run_stats', default=None)
+
+
+def record_recipients(count):
+    run = current_run_stats.get()
+    if run is not None:
+        run.recipients += count
+
+
+def record_send(channel, seconds, success=True):
+    """Count a channel call; failed calls count as a 'failed' skip"""
+    run = current_run_stats.get()
+    if run is not None:
+        run.channel_seconds += seconds
+        if success:
+            run.sent[channel] += 1
+        else:
+            run.skipped['failed'] += 1
+
+
+def record_skip(reason, count=1):
+    run = current_run_stats.get()
+    if run is not None:
+        run.skipped[reason] += count
+
+
+class TaskMetrics:
+    """Totals of this worker process per task, published after every run"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.totals = {}
+    
+    def observe(self, record):
+        with self.lock:
+            totals = self.totals.setdefault(record['task'], {
+                'runs': 0, 'errors': 0, 'seconds': 0.0, 'dbSeconds': 0.0, 'channelSeconds': 0.0,
+                'recipients': 0, 'sent': {}, 'skipped': {}
+            })
+            totals['runs'] += 1
+            totals['errors'] += record['error'] is not None
+            for key in ('seconds', 'dbSeconds', 'channelSeconds', 'recipients'):
+                totals[key] += record[key]
+            for key in ('sent', 'skipped'):
+                for label, count in record[key].items():
+                    totals[key][label] = totals[key].get(label, 0) + count
+            snapshot = copy.deepcopy(self.totals)
+        publish_snapshot('tasks', snapshot, TASK_METRICS_TTL)
+        cache.set(_last_run_key(record['task']), record, TASK_METRICS_TTL)
+
+
+task_metrics = TaskMetrics()
+
+
+def _last_run_key(task_name):
+    return f'metrics:task-runs:last:{task_name}'
+
+
+@contextmanager
+def track_task_run(task_name, database=None):
+    """
+    Collect RunStats for the block: queries and their time on every connection,
+    plus whatever the fan-out code reports. Emits one record when the run ends,
+    including runs that raise; their record carries the exception as `error`.
+    """
+    run = RunStats(task_name, database)
+    token = current_run_stats.set(run)
+    error = None
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(run))
+            yield run
+    except BaseException as e:
+        error = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        current_run_stats.reset(token)
+        record = run.record()
+        record['error'] = error
+        logger.info('task run %s', json.dumps(record, sort_keys=True))
+        task_metrics.observe(record)
+
+
+def task_totals():
+    """Per-task totals of every worker that ran recently, keyed by (process, task)"""
+    return {
+        (process, task_name): totals
+        for process, snapshot in collect_snapshots('tasks').items()
+        for task_name, totals in snapshot.items()
+    }
+
+
+def last_task_runs(task_names=PERIODIC_TASKS + ['send_alert_task', 'send_alerts_task', 'deliver_webhook']):
+    """Most recent run record of each task"""
+    records = cache.get_many([_last_run_key(name) for name in task_names])
+    return {name: records.get(_last_run_key(name)) for name in task_names}
+
+
+# ==================== Process Snapshots ====================
+
+def _processes_key(kind):
+    return f'metrics:{kind}:processes'
+
+
+def _snapshot_key(kind, process):
+    return f'metrics:{kind}:{process}'
+
+
+# Longest a registry update waits for another process's update to finish
+REGISTRY_LOCK_SECONDS = 5
+
+
+@contextmanager
+def _registry_lock(kind):
+    """
+    Serialize read-modify-write of a process registry across processes. cache.add
+    is atomic on a shared cache; a holder that dies frees the lock when it expires.
+    Yields whether the lock was acquired; only the holder releases it.
+    """
+    key = f'{_processes_key(kind)}:lock'
+    token = secrets.randbits(62)
+    deadline = time.monotonic() + REGISTRY_LOCK_SECONDS
+    acquired = cache.add(key, token, REGISTRY_LOCK_SECONDS)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.01)
+        acquired = cache.add(key, token, REGISTRY_LOCK_SECONDS)
+    try:
+        yield acquired
+    finally:
+        # Our lock may have expired and been taken by another process meanwhile
+        if acquired and cache.get(key) == token:
+            cache.delete(key)
+
+
+def publish_snapshot(kind, snapshot, ttl):
+    """Store this process's totals; processes that stop publishing age out after ttl"""
+    # Worked out per call, not at import, so forked workers are told apart
+    process = f'{socket.gethostname()}:{os.getpid()}'
+    cache.set(_snapshot_key(kind, process), snapshot, ttl)
+    
+    # The registry is only rewritten to add this process or renew it halfway through
+    # its ttl, and then under the lock so concurrent publishers never drop each other
+    now = time.time()
+    if now - (cache.get(_processes_key(kind)) or {}).get(process, 0) < ttl / 2:
+        return
+    with _registry_lock(kind) as acquired:
+        if not acquired:
+            # Still unregistered or due for renewal, so the next publish tries again
+            logger.warning("Timed out waiting to register %s process %s", kind, process)
+            return
+        processes = {
+            name: seen_at for name, seen_at in (cache.get(_processes_key(kind)) or {}).items()
+            if now - seen_at < ttl
+        }
+        processes[process] = now
+        cache.set(_processes_key(kind), processes, None)
+
+
+def collect_snapshots(kind):
+    """Snapshot of every process still publishing, by process"""
+    keys = {name: _snapshot_key(kind, name) for name in cache.get(_processes_key(kind)) or {}}
+    snapshots = cache.get_many(list(keys.values()))
+    return {name: snapshots[key] for name, key in keys.items() if key in snapshots}
+
+
+# ==================== Prometheus Exposition ====================
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def _histogram(lines, name, buckets, counts, total, count, **labels):
+    cumulative = 0
+    for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+        cumulative += bucket_count
+        lines.append(f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}')
+    lines.append(f'{name}_sum{_labels(**labels)} {total}')
+    lines.append(f'{name}_count{_labels(**labels)} {count}')
+
+
+def render_prometheus():
+    """Request, cache, Celery queue and periodic task metrics in Prometheus text format"""
+    series = sorted(request_series().items())
+    lines = []
+    
+    lines.append('# HELP http_request_duration_seconds Request latency by resolved URL name.')
+    lines.append('# TYPE http_request_duration_seconds histogram')
+    for (process, view, method, status), values in series:
+        _histogram(
+            lines, 'http_request_duration_seconds', LATENCY_BUCKETS,
+            values[LATENCY_OFFSET:QUERY_OFFSET], values[LATENCY_SUM], values[COUNT],
+            process=process, view=view, method=method, status=status
+        )
+    
+    lines.append('# HELP http_request_db_queries Database queries per request.')
+    lines.append('# TYPE http_request_db_queries histogram')
+    for (process, view, method, status), values in series:
+        _histogram(
+            lines, 'http_request_db_queries', QUERY_BUCKETS,
+            values[QUERY_OFFSET:], values[DB_QUERIES], values[COUNT],
+            process=process, view=view, method=method, status=status
+        )
+    
+    lines.append('# HELP http_request_db_seconds_total Time spent in database queries.')
+    lines.append('# TYPE http_request_db_seconds_total counter')
+    for (process, view, method, status), values in series:
+        labels = _labels(process=process, view=view, method=method, status=status)
+        lines.append(f'http_request_db_seconds_total{labels} {values[DB_SECONDS]}')
+    
+    lines.append('# HELP http_request_cache_lookups_total Cache lookups made while handling requests.')
+    lines.append('# TYPE http_request_cache_lookups_total counter')
+    for (process, view, method, status), values in series:
+        for result, index in (('hit', CACHE_HITS), ('miss', CACHE_MISSES)):
+            labels = _labels(process=process, view=view, method=method, status=status, result=result)
+            lines.append(f'http_request_cache_lookups_total{labels} {values[index]}')
+    
+    lines.append('# HELP periodic_task_overlaps_total Periodic task runs skipped because the previous run was still going.')
+    lines.append('# TYPE periodic_task_overlaps_total counter')
+    for task_name, count in task_overlaps().items():
+        lines.append(f'periodic_task_overlaps_total{_labels(task=task_name)} {count}')
+    
+    totals = sorted(task_totals().items())
+    for name, kind, key, help_text in (
+        ('task_runs_total', 'counter', 'runs', 'Task runs, including those that raised.'),
+        ('task_errors_total', 'counter', 'errors', 'Task runs that raised.'),
+        ('task_seconds_total', 'counter', 'seconds', 'Wall time of task runs.'),
+        ('task_db_seconds_total', 'counter', 'dbSeconds', 'Time task runs spent in database queries.'),
+        ('task_channel_seconds_total', 'counter', 'channelSeconds', 'Time task runs spent in notification channels.'),
+        ('task_recipients_total', 'counter', 'recipients', 'Recipients resolved by task runs.'),
+    ):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for (process, task_name), task_total in totals:
+            lines.append(f'{name}{_labels(process=process, task=task_name)} {task_total.get(key, 0)}')
+    
+    lines.append('# HELP task_sends_total Notifications sent by task runs, per channel.')
+    lines.append('# TYPE task_sends_total counter')
+    for (process, task_name), task_total in totals:
+        for channel, count in sorted(task_total.get('sent', {}).items()):
+            lines.append(f'task_sends_total{_labels(process=process, task=task_name, channel=channel)} {count}')
+    
+    lines.append('# HELP task_skips_total Recipients skipped by task runs, per reason.')
+    lines.append('# TYPE task_skips_total counter')
+    for (process, task_name), task_total in totals:
+        for reason, count in sorted(task_total.get('skipped', {}).items()):
+            lines.append(f'task_skips_total{_labels(process=process, task=task_name, reason=reason)} {count}')
+    
+    try:
+        depths = queue_depths()
+    except Exception:
+        # The broker being down must not take request metrics down with it
+        logger.warning('Could not read queue depths', exc_info=True)
+        depths = {}
+    lines.append('# HELP celery_queue_messages Messages waiting in each Celery queue.')
+    lines.append('# TYPE celery_queue_messages gauge')
+    for queue, depth in depths.items():
+        lines.append(f'celery_queue_messages{_labels(queue=queue)} {depth}')
+    
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,111 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import JsonResponse
+from django.middleware.gzip import GZipMiddleware
+
+from .metrics import RequestStats, current_request_stats, request_metrics
+from .profiling import profile_request, profiling_requested, profiling_user
+from .routers import OrganizationMoving, use_shard
+
+
+class ShardMiddleware:
+    """
+    Scope any shard activated while handling a request to that request, and
+    answer writes refused during an organization move with 503 Retry-After.
+    """
+    MOVE_RETRY_AFTER_SECONDS = 30
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        with use_shard(None):
+            return self.get_response(request)
+    
+    def process_exception(self, request, exception):
+        if not isinstance(exception, OrganizationMoving):
+            return None
+        response = JsonResponse({
+            'success': False,
+            'message': 'Organization is being moved; try again shortly'
+        }, status=503)
+        response['Retry-After'] = str(self.MOVE_RETRY_AFTER_SECONDS)
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, database queries and time, and cache hits and misses for
+    each request, labelled with the resolved URL name. Goes first in MIDDLEWARE
+    so the other middleware is included in the latency.
+    """
+    
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+        
+        elapsed = time.perf_counter() - started
+        request_metrics.observe(
+            self.view_name(request),
+            request.method,
+            f'{response.status_code // 100}xx',
+            elapsed,
+            stats
+        )
+        return response
+    
+    def view_name(self, request):
+        """URL name of the matched route; unmatched paths share one series to bound cardinality"""
+        match = getattr(request, 'resolver_match', None)
+        if match is None or not match.url_name:
+            return 'unmatched'
+        # Every route also has a no-slash twin; both count as one endpoint
+        return match.view_name.removesuffix('-no-slash')
+
+
+class ProfilingMiddleware:
+    """
+    Profile one request on demand: an admin sends an X-Profile header or a
+    _profile query flag. Requests without either only pay for that check.
+    Goes after ShardMiddleware, as authenticating may activate a shard.
+    """
+    
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        if not profiling_requested(request):
+            return self.get_response(request)
+        
+        user = profiling_user(request)
+        if user is None:
+            return self.get_response(request)
+        return profile_request(request, self.get_response, user)
+
+
+class ThresholdGZipMiddleware(GZipMiddleware):
+    """GZip responses of at least GZIP_MIN_BYTES for clients that accept it; small ones are not worth the CPU"""
+    
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < settings.GZIP_MIN_BYTES:
+            return response
+        return super().process_response(request, response)
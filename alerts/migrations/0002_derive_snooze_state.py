@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:37
+
+from django.db import migrations, models
+
+
+def clear_inactive_snoozes(apps, schema_editor):
+    """Drop snooze_until on rows the old is_snoozed flag had already released"""
+    UserAlertPreference = apps.get_model('alerts', 'UserAlertPreference')
+    UserAlertPreference.objects.using(schema_editor.connection.alias).filter(
+        is_snoozed=False,
+        snooze_until__isnull=False
+    ).update(snooze_until=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_inactive_snoozes, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='useralertpreference',
+            name='user_alert__is_snoo_271236_idx',
+        ),
+        migrations.RemoveField(
+            model_name='useralertpreference',
+            name='is_snoozed',
+        ),
+        migrations.AddIndex(
+            model_name='useralertpreference',
+            index=models.Index(fields=['snooze_until'], name='user_alert__snooze__09dfe0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useralertpreference',
+            index=models.Index(fields=['alert', 'snooze_until'], name='user_alert__alert_i_98da1c_idx'),
+        ),
+    ]
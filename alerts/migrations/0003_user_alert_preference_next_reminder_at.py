@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0002_derive_snooze_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useralertpreference',
+            name='next_reminder_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='useralertpreference',
+            index=models.Index(fields=['next_reminder_at'], name='user_alert__next_re_aa9efd_idx'),
+        ),
+    ]
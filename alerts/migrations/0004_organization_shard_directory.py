@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0003_user_alert_preference_next_reminder_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('organization', models.CharField(max_length=100, unique=True)),
+                ('database', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'organization_shards',
+            },
+        ),
+    ]
@@ -0,0 +1,139 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def forwards(apps, schema_editor):
+    """Create one Organization per distinct string and point rows at it"""
+    alias = schema_editor.connection.alias
+    Organization = apps.get_model('alerts', 'Organization')
+    User = apps.get_model('alerts', 'User')
+    Team = apps.get_model('alerts', 'Team')
+    Alert = apps.get_model('alerts', 'Alert')
+
+    names = set(User.objects.using(alias).values_list('organization', flat=True).distinct())
+    names |= set(Team.objects.using(alias).values_list('organization', flat=True).distinct())
+    names |= set(
+        Alert.objects.using(alias).exclude(target_organization='')
+        .values_list('target_organization', flat=True).distinct()
+    )
+    names.add('default-org')
+
+    Organization.objects.using(alias).bulk_create(
+        [Organization(name=name) for name in sorted(names)],
+        ignore_conflicts=True
+    )
+    ids = dict(Organization.objects.using(alias).values_list('name', 'id'))
+
+    # One set-based UPDATE per organization and table
+    for name, organization_id in ids.items():
+        User.objects.using(alias).filter(organization=name).update(organization_ref=organization_id)
+        Team.objects.using(alias).filter(organization=name).update(organization_ref=organization_id)
+        Alert.objects.using(alias).filter(target_organization=name).update(target_organization_ref=organization_id)
+
+
+def backwards(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Organization = apps.get_model('alerts', 'Organization')
+    User = apps.get_model('alerts', 'User')
+    Team = apps.get_model('alerts', 'Team')
+    Alert = apps.get_model('alerts', 'Alert')
+
+    for organization_id, name in Organization.objects.using(alias).values_list('id', 'name'):
+        User.objects.using(alias).filter(organization_ref=organization_id).update(organization=name)
+        Team.objects.using(alias).filter(organization_ref=organization_id).update(organization=name)
+        Alert.objects.using(alias).filter(target_organization_ref=organization_id).update(target_organization=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0004_organization_shard_directory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Organization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'organizations',
+            },
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='organization_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='alerts.organization'),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='organization_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='alerts.organization'),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='target_organization_ref',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='alerts.organization'),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveIndex(
+            model_name='team',
+            name='teams_organiz_3dbaac_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='users_organiz_29ac71_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='team',
+            unique_together=set(),
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='organization',
+        ),
+        migrations.RemoveField(
+            model_name='team',
+            name='organization',
+        ),
+        migrations.RemoveField(
+            model_name='alert',
+            name='target_organization',
+        ),
+        migrations.RenameField(
+            model_name='user',
+            old_name='organization_ref',
+            new_name='organization',
+        ),
+        migrations.RenameField(
+            model_name='team',
+            old_name='organization_ref',
+            new_name='organization',
+        ),
+        migrations.RenameField(
+            model_name='alert',
+            old_name='target_organization_ref',
+            new_name='target_organization',
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='organization',
+            field=models.ForeignKey(blank=True, on_delete=django.db.models.deletion.PROTECT, related_name='users', to='alerts.organization'),
+        ),
+        migrations.AlterField(
+            model_name='team',
+            name='organization',
+            field=models.ForeignKey(blank=True, on_delete=django.db.models.deletion.PROTECT, related_name='teams', to='alerts.organization'),
+        ),
+        migrations.AlterField(
+            model_name='alert',
+            name='target_organization',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='alerts', to='alerts.organization'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='team',
+            unique_together={('name', 'organization')},
+        ),
+    ]
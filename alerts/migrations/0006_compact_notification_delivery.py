@@ -0,0 +1,154 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BATCH_SIZE = 5000
+
+CHANNEL_CODES = {'InApp': 1, 'Email': 2, 'SMS': 3}
+STATUS_CODES = {'pending': 0, 'sent': 1, 'failed': 2, 'read': 3}
+
+
+def _id_batches(queryset):
+    """Yield (low, high) primary key ranges covering the table"""
+    bounds = queryset.aggregate(low=models.Min('id'), high=models.Max('id'))
+    if bounds['low'] is None:
+        return
+    for low in range(bounds['low'], bounds['high'] + 1, BATCH_SIZE):
+        yield low, low + BATCH_SIZE - 1
+
+
+def to_compact(apps, schema_editor):
+    """Convert string enums to codes and move failure reasons, one id range at a time"""
+    alias = schema_editor.connection.alias
+    NotificationDelivery = apps.get_model('alerts', 'NotificationDelivery')
+    NotificationFailure = apps.get_model('alerts', 'NotificationFailure')
+    deliveries = NotificationDelivery.objects.using(alias)
+
+    for low, high in _id_batches(deliveries):
+        batch = deliveries.filter(id__gte=low, id__lte=high)
+        for name, code in CHANNEL_CODES.items():
+            batch.filter(delivery_type=name).update(delivery_type_code=code)
+        # Unknown channels fall back to InApp, as the strategy factory does
+        batch.filter(delivery_type_code__isnull=True).update(delivery_type_code=CHANNEL_CODES['InApp'])
+        for name, code in STATUS_CODES.items():
+            batch.filter(status=name).update(status_code=code)
+
+        NotificationFailure.objects.using(alias).bulk_create([
+            NotificationFailure(delivery_id=delivery_id, reason=reason)
+            for delivery_id, reason in batch.exclude(failure_reason='').values_list('id', 'failure_reason')
+        ])
+
+
+def from_compact(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    NotificationDelivery = apps.get_model('alerts', 'NotificationDelivery')
+    NotificationFailure = apps.get_model('alerts', 'NotificationFailure')
+    deliveries = NotificationDelivery.objects.using(alias)
+
+    for low, high in _id_batches(deliveries):
+        batch = deliveries.filter(id__gte=low, id__lte=high)
+        for name, code in CHANNEL_CODES.items():
+            batch.filter(delivery_type_code=code).update(delivery_type=name)
+        for name, code in STATUS_CODES.items():
+            batch.filter(status_code=code).update(status=name)
+
+    for failure in NotificationFailure.objects.using(alias).iterator(chunk_size=BATCH_SIZE):
+        deliveries.filter(id=failure.delivery_id).update(failure_reason=failure.reason)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0005_organization'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationFailure',
+            fields=[
+                ('delivery', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='failure', serialize=False, to='alerts.notificationdelivery')),
+                ('reason', models.TextField()),
+            ],
+            options={
+                'db_table': 'notification_failures',
+            },
+        ),
+        migrations.AddField(
+            model_name='notificationdelivery',
+            name='delivery_type_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='notificationdelivery',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        # Nullable first so a reverse migration can re-add and refill the columns
+        migrations.AlterField(
+            model_name='notificationdelivery',
+            name='delivery_type',
+            field=models.CharField(max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='notificationdelivery',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed'), ('read', 'Read')], default='pending', max_length=20, null=True),
+        ),
+        migrations.RunPython(to_compact, from_compact),
+        migrations.RemoveIndex(
+            model_name='notificationdelivery',
+            name='notificatio_user_id_495627_idx',
+        ),
+        migrations.RemoveField(
+            model_name='notificationdelivery',
+            name='delivery_type',
+        ),
+        migrations.RemoveField(
+            model_name='notificationdelivery',
+            name='status',
+        ),
+        migrations.RenameField(
+            model_name='notificationdelivery',
+            old_name='delivery_type_code',
+            new_name='delivery_type',
+        ),
+        migrations.RenameField(
+            model_name='notificationdelivery',
+            old_name='status_code',
+            new_name='status',
+        ),
+        migrations.AlterField(
+            model_name='notificationdelivery',
+            name='delivery_type',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'InApp'), (2, 'Email'), (3, 'SMS')]),
+        ),
+        migrations.AlterField(
+            model_name='notificationdelivery',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'pending'), (1, 'sent'), (2, 'failed'), (3, 'read')], default=0),
+        ),
+        migrations.AddIndex(
+            model_name='notificationdelivery',
+            index=models.Index(fields=['user', 'status'], name='notificatio_user_id_495627_idx'),
+        ),
+        migrations.AlterModelOptions(
+            name='notificationdelivery',
+            options={'ordering': ['-id']},
+        ),
+        migrations.RemoveField(
+            model_name='notificationdelivery',
+            name='failure_reason',
+        ),
+        migrations.RemoveField(
+            model_name='notificationdelivery',
+            name='reminder_count',
+        ),
+        migrations.RemoveField(
+            model_name='notificationdelivery',
+            name='created_at',
+        ),
+        migrations.RemoveField(
+            model_name='notificationdelivery',
+            name='updated_at',
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0006_compact_notification_delivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='last_occurred_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='alert',
+            name='occurrence_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.CreateModel(
+            name='AlertDedupKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255)),
+                ('last_seen_at', models.DateTimeField()),
+                ('alert', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dedup_keys', to='alerts.alert')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dedup_keys', to='alerts.organization')),
+            ],
+            options={
+                'db_table': 'alert_dedup_keys',
+                'unique_together': {('organization', 'key')},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-19 02:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0007_alert_event_dedup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivery_type', models.PositiveSmallIntegerField(choices=[(1, 'InApp'), (2, 'Email'), (3, 'SMS')])),
+                ('is_reminder', models.BooleanField(default=False)),
+                ('due_at', models.DateTimeField(db_index=True)),
+                ('alert', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_items', to='alerts.alert')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digest_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'digest_items',
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivery_type', models.PositiveSmallIntegerField(choices=[(1, 'InApp'), (2, 'Email'), (3, 'SMS')])),
+                ('status', models.PositiveSmallIntegerField(choices=[(0, 'pending'), (1, 'sent'), (2, 'failed'), (3, 'read')], default=0)),
+                ('alert_ids', models.JSONField(default=list)),
+                ('alert_count', models.PositiveIntegerField(default=0)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='digests', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'notification_digests',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['user', 'sent_at'], name='notificatio_user_id_d99fbc_idx')],
+            },
+        ),
+    ]
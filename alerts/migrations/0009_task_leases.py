@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0008_notification_digests'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=150, unique=True)),
+                ('owner', models.CharField(max_length=64)),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'task_leases',
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+# The DDL is a frozen copy of alerts/search.py at the time of this migration, so
+# later changes there never alter what migrating an existing database does
+FULLTEXT_INDEX = 'alerts_title_message_ft'
+FTS_TABLE = 'alerts_fts'
+FTS_TRIGGERS = {
+    'alerts_fts_insert': f'''
+        CREATE TRIGGER IF NOT EXISTS alerts_fts_insert AFTER INSERT ON alerts BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, message) VALUES (new.id, new.title, new.message);
+        END
+    ''',
+    'alerts_fts_delete': f'''
+        CREATE TRIGGER IF NOT EXISTS alerts_fts_delete AFTER DELETE ON alerts BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, message) VALUES ('delete', old.id, old.title, old.message);
+        END
+    ''',
+    'alerts_fts_update': f'''
+        CREATE TRIGGER IF NOT EXISTS alerts_fts_update AFTER UPDATE OF title, message ON alerts BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, message) VALUES ('delete', old.id, old.title, old.message);
+            INSERT INTO {FTS_TABLE}(rowid, title, message) VALUES (new.id, new.title, new.message);
+        END
+    ''',
+}
+
+
+def install(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'mysql':
+        schema_editor.execute(f'ALTER TABLE alerts ADD FULLTEXT INDEX {FULLTEXT_INDEX} (title, message)')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(title, message, content='alerts', content_rowid='id')"
+        )
+        for sql in FTS_TRIGGERS.values():
+            schema_editor.execute(sql)
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def remove(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'mysql':
+        schema_editor.execute(f'ALTER TABLE alerts DROP INDEX {FULLTEXT_INDEX}')
+    elif connection.vendor == 'sqlite':
+        for name in FTS_TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0009_task_leases'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlertSearchEntry',
+            fields=[
+                ('alert', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='alerts.alert')),
+                ('document', models.TextField(db_column='alerts_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'alerts_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(install, remove),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0010_alert_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='template_fields',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
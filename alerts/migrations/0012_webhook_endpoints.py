@@ -0,0 +1,52 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:36
+
+import alerts.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0011_alert_template_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alert',
+            name='delivery_type',
+            field=models.CharField(choices=[('InApp', 'In-App'), ('Email', 'Email'), ('SMS', 'SMS'), ('Webhook', 'Webhook')], default='InApp', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='digestitem',
+            name='delivery_type',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'InApp'), (2, 'Email'), (3, 'SMS'), (4, 'Webhook')]),
+        ),
+        migrations.AlterField(
+            model_name='notificationdelivery',
+            name='delivery_type',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'InApp'), (2, 'Email'), (3, 'SMS'), (4, 'Webhook')]),
+        ),
+        migrations.AlterField(
+            model_name='notificationdigest',
+            name='delivery_type',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'InApp'), (2, 'Email'), (3, 'SMS'), (4, 'Webhook')]),
+        ),
+        migrations.CreateModel(
+            name='WebhookEndpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('url', models.URLField(max_length=500)),
+                ('secret', models.CharField(default=alerts.models.generate_webhook_secret, max_length=128)),
+                ('batch_size', models.PositiveSmallIntegerField(default=50)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='webhook_endpoints', to='alerts.organization')),
+            ],
+            options={
+                'db_table': 'webhook_endpoints',
+            },
+        ),
+    ]
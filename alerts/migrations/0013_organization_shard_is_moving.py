@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0012_webhook_endpoints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organizationshard',
+            name='is_moving',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:12
+
+from django.db import connections, migrations, models
+import django.db.models.deletion
+
+
+def link_organizations(apps, schema_editor):
+    """Point each directory row at its organization's id on the shard it names"""
+    alias = schema_editor.connection.alias
+    Organization = apps.get_model('alerts', 'Organization')
+    OrganizationShard = apps.get_model('alerts', 'OrganizationShard')
+
+    for row in OrganizationShard.objects.using(alias).all():
+        organization_id = None
+        if row.database in connections:
+            organization_id = Organization.objects.using(row.database).filter(
+                name=row.name
+            ).values_list('id', flat=True).first()
+        if organization_id is None:
+            # Stale entry; backfill_shard_directory records the organization again
+            row.delete()
+        else:
+            row.organization_id = organization_id
+            row.save(update_fields=['organization'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0013_organization_shard_is_moving'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='organizationshard',
+            old_name='organization',
+            new_name='name',
+        ),
+        migrations.AddField(
+            model_name='organizationshard',
+            name='organization',
+            field=models.OneToOneField(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='alerts.organization'),
+        ),
+        migrations.RunPython(
+            link_organizations,
+            migrations.RunPython.noop,
+            hints={'model_name': 'organizationshard'}
+        ),
+        migrations.AlterField(
+            model_name='organizationshard',
+            name='organization',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='alerts.organization'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0014_organization_shard_by_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationdigest',
+            name='read_alert_ids',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='notificationdigest',
+            name='read_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notificationdigest',
+            name='reminder_alert_ids',
+            field=models.JSONField(default=list),
+        ),
+    ]
@@ -1,8 +1,33 @@
-from django.db import models
+import secrets
+import zlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connections, models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
 
+DEFAULT_ORGANIZATION = 'default-org'
+
+
+class Organization(models.Model):
+    """Organization (tenant) Model"""
+    name = models.CharField(max_length=100, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'organizations'
+    
+    def __str__(self):
+        return self.name
+
+
+def get_default_organization():
+    """Primary key of the default organization, created on first use"""
+    organization, created = Organization.objects.get_or_create(name=DEFAULT_ORGANIZATION)
+    return organization.pk
+
+
 class User(AbstractUser):
     """Custom User Model"""
     ROLE_CHOICES = [
@@ -12,25 +37,29 @@ class User(AbstractUser):
     
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='user')
     team = models.ForeignKey('Team', on_delete=models.SET_NULL, null=True, blank=True, related_name='members')
-    organization = models.CharField(max_length=100, default='default-org')
+    organization = models.ForeignKey(Organization, on_delete=models.PROTECT, blank=True, related_name='users')
     is_active = models.BooleanField(default=True)
     
     class Meta:
         db_table = 'users'
         indexes = [
             models.Index(fields=['email']),
-            models.Index(fields=['organization']),
         ]
     
     def __str__(self):
         return f"{self.username} ({self.role})"
+    
+    def save(self, *args, **kwargs):
+        if self.organization_id is None:
+            self.organization_id = get_default_organization()
+        super().save(*args, **kwargs)
 
 
 class Team(models.Model):
     """Team/Department Model"""
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
-    organization = models.CharField(max_length=100, default='default-org')
+    organization = models.ForeignKey(Organization, on_delete=models.PROTECT, blank=True, related_name='teams')
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -38,12 +67,14 @@ class Team(models.Model):
     class Meta:
         db_table = 'teams'
         unique_together = ['name', 'organization']
-        indexes = [
-            models.Index(fields=['organization']),
-        ]
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        if self.organization_id is None:
+            self.organization_id = get_default_organization()
+        super().save(*args, **kwargs)
 
 
 class Alert(models.Model):
@@ -58,6 +89,7 @@ class Alert(models.Model):
         ('InApp', 'In-App'),
         ('Email', 'Email'),
         ('SMS', 'SMS'),
+        ('Webhook', 'Webhook'),
     ]
     
     VISIBILITY_CHOICES = [
@@ -68,12 +100,14 @@ class Alert(models.Model):
     
     title = models.CharField(max_length=255)
     message = models.TextField()
+    # Values for {{ fields.<name> }} in the title and message (see alerts.templating)
+    template_fields = models.JSONField(default=dict, blank=True)
     severity = models.CharField(max_length=20, choices=SEVERITY_CHOICES, default='Info')
     delivery_type = models.CharField(max_length=20, choices=DELIVERY_CHOICES, default='InApp')
     visibility_type = models.CharField(max_length=20, choices=VISIBILITY_CHOICES)
     
     # Target audience
-    target_organization = models.CharField(max_length=100, blank=True)
+    target_organization = models.ForeignKey(Organization, on_delete=models.PROTECT, null=True, blank=True, related_name='alerts')
     target_teams = models.ManyToManyField(Team, blank=True, related_name='alerts')
     target_users = models.ManyToManyField(User, blank=True, related_name='targeted_alerts')
     
@@ -89,6 +123,10 @@ class Alert(models.Model):
     is_active = models.BooleanField(default=True)
     is_archived = models.BooleanField(default=False)
     
+    # Event ingestion: repeats of the same condition fold into this alert
+    occurrence_count = models.PositiveIntegerField(default=1)
+    last_occurred_at = models.DateTimeField(null=True, blank=True)
+    
     # Metadata
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_alerts')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -123,29 +161,72 @@ class Alert(models.Model):
         )
 
 
+class AlertSearchEntry(models.Model):
+    """
+    Row of the SQLite FTS5 table over alert titles and messages (see alerts.search).
+    Created by migration, not by Django; MySQL uses a FULLTEXT index instead.
+    """
+    alert = models.OneToOneField(
+        Alert, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='search_entry'
+    )
+    # FTS5's hidden column named after the table (the MATCH target) and its bm25 rank
+    document = models.TextField(db_column='alerts_fts')
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = 'alerts_fts'
+
+
+class AlertDedupKey(models.Model):
+    """Latest alert opened for an ingestion dedup key within an organization"""
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='dedup_keys')
+    key = models.CharField(max_length=255)
+    alert = models.ForeignKey(Alert, on_delete=models.CASCADE, related_name='dedup_keys')
+    last_seen_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'alert_dedup_keys'
+        unique_together = ['organization', 'key']
+    
+    def __str__(self):
+        return f"{self.key} -> {self.alert_id}"
+
+
 class NotificationDelivery(models.Model):
-    """Notification Delivery Log"""
-    STATUS_CHOICES = [
-        ('pending', 'Pending'),
-        ('sent', 'Sent'),
-        ('failed', 'Failed'),
-        ('read', 'Read'),
-    ]
+    """Notification Delivery Log (compact row: small integer enums, no unread timestamps)"""
+    CHANNEL_CODES = {
+        'InApp': 1,
+        'Email': 2,
+        'SMS': 3,
+        'Webhook': 4,
+    }
+    CHANNEL_CHOICES = [(code, name) for name, code in CHANNEL_CODES.items()]
+    
+    STATUS_CODES = {
+        'pending': 0,
+        'sent': 1,
+        'failed': 2,
+        'read': 3,
+    }
+    STATUS_CHOICES = [(code, name) for name, code in STATUS_CODES.items()]
+    STATUS_PENDING = STATUS_CODES['pending']
+    STATUS_SENT = STATUS_CODES['sent']
+    STATUS_FAILED = STATUS_CODES['failed']
+    STATUS_READ = STATUS_CODES['read']
+    # Rows that reached the user; failed and pending rows are not deliveries
+    DELIVERED_STATUSES = (STATUS_SENT, STATUS_READ)
     
     alert = models.ForeignKey(Alert, on_delete=models.CASCADE, related_name='deliveries')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
-    delivery_type = models.CharField(max_length=20)
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    delivery_type = models.PositiveSmallIntegerField(choices=CHANNEL_CHOICES)
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=STATUS_PENDING)
     
     sent_at = models.DateTimeField(null=True, blank=True)
     read_at = models.DateTimeField(null=True, blank=True)
-    failure_reason = models.TextField(blank=True)
     
     is_reminder = models.BooleanField(default=False)
-    reminder_count = models.IntegerField(default=0)
-    
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'notification_deliveries'
@@ -153,10 +234,116 @@ class NotificationDelivery(models.Model):
             models.Index(fields=['alert', 'user']),
             models.Index(fields=['user', 'status']),
         ]
-        ordering = ['-created_at']
+        ordering = ['-id']
     
     def __str__(self):
         return f"Delivery: {self.alert.title} to {self.user.username}"
+    
+    @classmethod
+    def status_name(cls, code):
+        """API name of a status code"""
+        return dict(cls.STATUS_CHOICES)[code]
+
+
+class NotificationFailure(models.Model):
+    """Failure details, written only for failed deliveries"""
+    delivery = models.OneToOneField(
+        NotificationDelivery,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='failure'
+    )
+    reason = models.TextField()
+    
+    class Meta:
+        db_table = 'notification_failures'
+    
+    def __str__(self):
+        return f"Failure: {self.reason[:50]}"
+
+
+def generate_webhook_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    """HTTP endpoint an organization's Webhook alerts are posted to (see alerts.webhooks)"""
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='webhook_endpoints')
+    name = models.CharField(max_length=100)
+    url = models.URLField(max_length=500)
+    # Key of the HMAC-SHA256 signature sent with every request
+    secret = models.CharField(max_length=128, default=generate_webhook_secret)
+    # Deliveries per POST; 1 posts every recipient separately
+    batch_size = models.PositiveSmallIntegerField(default=50)
+    is_active = models.BooleanField(default=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'webhook_endpoints'
+    
+    def __str__(self):
+        return f"{self.name} ({self.url})"
+
+
+class DigestItem(models.Model):
+    """Delivery buffered for a user's next digest"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='digest_items')
+    alert = models.ForeignKey(Alert, on_delete=models.CASCADE, related_name='digest_items')
+    delivery_type = models.PositiveSmallIntegerField(choices=NotificationDelivery.CHANNEL_CHOICES)
+    is_reminder = models.BooleanField(default=False)
+    
+    # End of the aligned window this item belongs to
+    due_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'digest_items'
+    
+    def __str__(self):
+        return f"Digest item: alert {self.alert_id} for user {self.user_id}"
+
+
+class NotificationDigestQuerySet(models.QuerySet):
+    def containing(self, alert_id):
+        """Digests listing the alert; without JSON containment the candidate rows are checked here"""
+        if connections[self.db].features.supports_json_field_contains:
+            return self.filter(alert_ids__contains=[alert_id])
+        return self.filter(id__in=[
+            digest_id for digest_id, alert_ids in self.values_list('id', 'alert_ids') if alert_id in alert_ids
+        ])
+
+
+class NotificationDigest(models.Model):
+    """
+    One combined notification sent to a user in place of several deliveries.
+    It is the delivery record of every alert it lists: reads and reminders are
+    tracked here rather than in one NotificationDelivery row per alert.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='digests')
+    delivery_type = models.PositiveSmallIntegerField(choices=NotificationDelivery.CHANNEL_CHOICES)
+    status = models.PositiveSmallIntegerField(
+        choices=NotificationDelivery.STATUS_CHOICES,
+        default=NotificationDelivery.STATUS_PENDING
+    )
+    alert_ids = models.JSONField(default=list)
+    alert_count = models.PositiveIntegerField(default=0)
+    reminder_alert_ids = models.JSONField(default=list)
+    read_alert_ids = models.JSONField(default=list)
+    read_count = models.PositiveIntegerField(default=0)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    objects = NotificationDigestQuerySet.as_manager()
+    
+    class Meta:
+        db_table = 'notification_digests'
+        indexes = [
+            models.Index(fields=['user', 'sent_at']),
+        ]
+        ordering = ['-id']
+    
+    def __str__(self):
+        return f"Digest of {self.alert_count} alerts to user {self.user_id}"
 
 
 class UserAlertPreference(models.Model):
@@ -167,11 +354,15 @@ class UserAlertPreference(models.Model):
     is_read = models.BooleanField(default=False)
     read_at = models.DateTimeField(null=True, blank=True)
     
-    is_snoozed = models.BooleanField(default=False)
+    # Snooze state is derived from snooze_until alone: a row is snoozed only
+    # while snooze_until is in the future, so nothing has to reset it.
     snoozed_at = models.DateTimeField(null=True, blank=True)
     snooze_until = models.DateTimeField(null=True, blank=True)
     
     last_reminder_sent_at = models.DateTimeField(null=True, blank=True)
+    # Due time of the next reminder; snoozing moves it to snooze_until so the
+    # user wakes up exactly when the snooze ends
+    next_reminder_at = models.DateTimeField(null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -181,25 +372,40 @@ class UserAlertPreference(models.Model):
         unique_together = ['user', 'alert']
         indexes = [
             models.Index(fields=['user', 'is_read']),
-            models.Index(fields=['is_snoozed', 'snooze_until']),
+            models.Index(fields=['snooze_until']),
+            models.Index(fields=['alert', 'snooze_until']),
+            models.Index(fields=['next_reminder_at']),
         ]
     
     def __str__(self):
         return f"{self.user.username} - {self.alert.title}"
     
+    @property
+    def is_snoozed(self):
+        """Snooze state derived from snooze_until"""
+        return self.is_snoozed_now()
+    
     def is_snoozed_now(self):
         """Check if snooze is still active"""
-        if not self.is_snoozed or not self.snooze_until:
+        if not self.snooze_until:
             return False
         return self.snooze_until > timezone.now()
     
+    def snooze(self, until):
+        """Snooze alert until the given time and wake up with a reminder then"""
+        self.snoozed_at = timezone.now()
+        self.snooze_until = until
+        self.next_reminder_at = until
+        self.save()
+    
+    def snooze_for(self, duration):
+        """Snooze alert for a timedelta"""
+        self.snooze(timezone.now() + duration)
+    
     def snooze_for_day(self):
         """Snooze alert until end of day"""
         end_of_day = timezone.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-        self.is_snoozed = True
-        self.snoozed_at = timezone.now()
-        self.snooze_until = end_of_day
-        self.save()
+        self.snooze(end_of_day)
     
     def mark_as_read(self):
         """Mark alert as read"""
@@ -207,13 +413,67 @@ class UserAlertPreference(models.Model):
         self.read_at = timezone.now()
         self.save()
     
+    def reminder_slot(self, reminder_frequency_hours=2, after=None):
+        """
+        Next reminder time on this user/alert pair's fixed phase within the reminder period.
+        Phases are spread evenly over the period, and a slot is always at least
+        half a period after `after`.
+        """
+        period = max(int(reminder_frequency_hours * 3600), 1)
+        phase = zlib.crc32(f'{self.user_id}:{self.alert_id}'.encode()) % period
+        earliest = int((after or timezone.now()).timestamp()) + period // 2
+        
+        slot = earliest // period * period + phase
+        if slot < earliest:
+            slot += period
+        return datetime.fromtimestamp(slot, tz=dt_timezone.utc)
+    
     def should_receive_reminder(self, reminder_frequency_hours=2):
         """Check if user should receive reminder"""
         if self.is_snoozed_now():
             return False
         
+        if self.next_reminder_at:
+            return self.next_reminder_at <= timezone.now()
+        
         if not self.last_reminder_sent_at:
             return True
         
         time_since_last = timezone.now() - self.last_reminder_sent_at
-        return time_since_last.total_seconds() / 3600 >= reminder_frequency_hours
\ No newline at end of file
+        return time_since_last.total_seconds() / 3600 >= reminder_frequency_hours
+
+
+class OrganizationShard(models.Model):
+    """Organization -> database shard directory (always stored on default)"""
+    # The organization row lives on its shard, so there is no database constraint;
+    # ids are unique across shards, which interleave auto-increment values
+    organization = models.OneToOneField(
+        Organization, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+    )
+    # Copy of the organization's name, kept in sync on rename, to find it at registration
+    name = models.CharField(max_length=100, unique=True)
+    database = models.CharField(max_length=50)
+    # Set by move_organization while rows are copied; tenant writes are refused
+    is_moving = models.BooleanField(default=False)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'organization_shards'
+    
+    def __str__(self):
+        return f"{self.name} -> {self.database}"
+
+
+class TaskLease(models.Model):
+    """Lease row used to lock periodic tasks when no shared Redis cache is configured"""
+    name = models.CharField(max_length=150, unique=True)
+    owner = models.CharField(max_length=64)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'task_leases'
+    
+    def __str__(self):
+        return f"{self.name} held by {self.owner} until {self.expires_at}"
@@ -0,0 +1,35 @@
+import io
+import re
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import orjson
+
+
+# orjson reads integers beyond 64 bits as floats, where json keeps them exact;
+# any run of 19+ digits (even inside a string) sends the body to the stdlib parser
+LONG_NUMBER = re.compile(rb'[0-9]{19}')
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser using orjson when it is installed, with the same results: bodies
+    orjson reads differently (huge integers) or rejects where json does not
+    (lone surrogates, overflowing floats) are parsed again by the stdlib parser.
+    """
+    
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8' or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+        
+        data = stream.read()
+        if not LONG_NUMBER.search(data):
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass
+        # Errors, too, are reported as DRF reports them
+        return super().parse(io.BytesIO(data), media_type, parser_context)
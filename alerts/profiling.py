@@ -0,0 +1,128 @@
+import cProfile
+import io
+import marshal
+import pstats
+import secrets
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+
+from .authentication import OrganizationJWTAuthentication
+
+
+# Profiles are kept for a day; the index holds the newest PROFILE_HISTORY ids
+PROFILE_TTL = 24 * 60 * 60
+INDEX_KEY = 'profiles:index'
+
+
+def _profile_key(profile_id):
+    return f'profiles:{profile_id}'
+
+
+def profiling_requested(request):
+    """Cheap check done on every request: header or query flag present"""
+    return 'HTTP_X_PROFILE' in request.META or '_profile' in request.META.get('QUERY_STRING', '')
+
+
+def profiling_user(request):
+    """
+    The admin asking for a profile, or None. Authenticates the token up front
+    so nobody else can make the server pay for profiling.
+    """
+    try:
+        result = OrganizationJWTAuthentication().authenticate(Request(request))
+    except APIException:
+        return None
+    if result is None or result[0].role != 'admin':
+        return None
+    return result[0]
+
+
+def profile_request(request, get_response, user):
+    """Run the request under cProfile, record its SQL and store the profile"""
+    statements = []
+    
+    def record_statement(execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(statements) < settings.PROFILE_SQL_LIMIT:
+                statements.append({
+                    'sql': sql,
+                    'many': many,
+                    'ms': round((time.perf_counter() - started) * 1000, 3),
+                    'database': context['connection'].alias
+                })
+    
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(record_statement))
+        profiler.enable()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+    elapsed = time.perf_counter() - started
+    
+    profiler.create_stats()
+    # Same format as pstats.Stats.dump_stats, so the download opens in snakeviz etc.;
+    # taken first because pstats.Stats empties the profiler's stats
+    raw_stats = marshal.dumps(profiler.stats)
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(40)
+    
+    profile_id = secrets.token_hex(8)
+    save_profile({
+        'id': profile_id,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'user': user.username,
+        'createdAt': timezone.now().isoformat(),
+        'ms': round(elapsed * 1000, 3),
+        'queryCount': len(statements),
+        'sqlMs': round(sum(statement['ms'] for statement in statements), 3),
+        'sql': statements,
+        'stats': stream.getvalue(),
+        'pstats': raw_stats,
+    })
+    response['X-Profile-Id'] = profile_id
+    return response
+
+
+# ==================== Storage ====================
+
+def save_profile(profile):
+    cache.set(_profile_key(profile['id']), profile, PROFILE_TTL)
+    index = [profile['id']] + (cache.get(INDEX_KEY) or [])
+    history = settings.PROFILE_HISTORY
+    cache.delete_many([_profile_key(profile_id) for profile_id in index[history:]])
+    cache.set(INDEX_KEY, index[:history], PROFILE_TTL)
+
+
+def get_profile(profile_id):
+    return cache.get(_profile_key(profile_id))
+
+
+def list_profiles():
+    """Newest first, without the bulky SQL, stats and pstats fields"""
+    index = cache.get(INDEX_KEY) or []
+    profiles = cache.get_many([_profile_key(profile_id) for profile_id in index])
+    summaries = []
+    for profile_id in index:
+        profile = profiles.get(_profile_key(profile_id))
+        if profile:
+            summaries.append({
+                key: value for key, value in profile.items()
+                if key not in ('sql', 'stats', 'pstats')
+            })
+    return summaries
@@ -0,0 +1,92 @@
+import datetime
+import uuid
+
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib renderer is used without it
+    orjson = None
+
+
+# Values orjson writes exactly as DRF does (lazy strings go through DRF's encoder).
+# Not datetime.time: DRF rejects aware times, orjson writes them
+EXACT_TYPES = (str, int, type(None), datetime.date, uuid.UUID, Promise)
+CONTAINER_TYPES = (dict, list, tuple)
+
+# Concrete types already classified, so most containers are checked with one subset test
+_exact_types = set()
+_container_types = set()
+
+
+def _classify(value_type):
+    if issubclass(value_type, CONTAINER_TYPES):
+        _container_types.add(value_type)
+    elif issubclass(value_type, EXACT_TYPES):
+        _exact_types.add(value_type)
+    else:
+        return False
+    return True
+
+
+def renders_float_exactly(value):
+    """
+    Plain decimal floats come out of orjson as json writes them (shortest repr).
+    Exponents do not: orjson writes 1e16 and 0.00009999 where json writes 1e+16
+    and 9.999e-05, and NaN/Infinity as null where DRF raises.
+    """
+    return value == 0 or 1e-4 <= abs(value) < 1e16
+
+
+def renders_exactly(values):
+    """
+    Whether orjson renders these values byte-for-byte like DRF. Floats only do
+    in plain decimal range; Decimals and other types DRF's encoder converts do not.
+    """
+    types = set(map(type, values))
+    if float in types:
+        if not all(renders_float_exactly(value) for value in values if type(value) is float):
+            return False
+        types.discard(float)
+    if types <= _exact_types:
+        return True
+    if not all(value_type in _exact_types or value_type in _container_types or _classify(value_type) for value_type in types):
+        return False
+    if types.isdisjoint(_container_types):
+        return True
+    return all(
+        renders_exactly(value.values() if isinstance(value, dict) else value)
+        for value in values if type(value) in _container_types
+    )
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer producing the same bytes with orjson when it is installed.
+    Payloads holding floats written with an exponent or types only DRF's encoder
+    knows, indented output and anything orjson rejects (non-string keys, huge ints)
+    use the stdlib renderer.
+    """
+    
+    options = orjson.OPT_UTC_Z | orjson.OPT_PASSTHROUGH_DATACLASS if orjson else 0
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if not renders_exactly([data]):
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        # Same escaping as JSONRenderer, keeping the output a strict JavaScript subset;
+        # the one-byte check is a fast pre-filter for the UTF-8 lead byte of both
+        if b'\xe2' in ret and (b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret):
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,149 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+
+# ==================== Organization Shard Routing ====================
+
+_current_shard = ContextVar('current_shard', default=None)
+# Set while the active organization is being moved between shards
+_writes_frozen = ContextVar('writes_frozen', default=False)
+
+
+class OrganizationMoving(DatabaseError):
+    """A tenant write was attempted while its organization is being moved"""
+
+
+def current_shard():
+    """Database alias of the shard active in this context, if any"""
+    return _current_shard.get()
+
+
+def activate_shard(alias, frozen=False):
+    """
+    Activate a shard for the rest of the current context (e.g. a request).
+    With `frozen`, reads still work but tenant writes raise OrganizationMoving.
+    """
+    _current_shard.set(alias)
+    _writes_frozen.set(frozen)
+
+
+@contextmanager
+def use_shard(alias, frozen=False):
+    """Route all queries inside this block to the given shard alias"""
+    token = _current_shard.set(alias)
+    frozen_token = _writes_frozen.set(frozen)
+    try:
+        yield
+    finally:
+        _writes_frozen.reset(frozen_token)
+        _current_shard.reset(token)
+
+
+class ShardRouter:
+    """
+    Database router that sends tenant data to the shard active in the
+    current context. The organization -> shard directory and task leases
+    always live on the default database. Tenant writes are refused while the
+    organization is being moved, so none are lost with the source rows.
+    """
+    GLOBAL_MODELS = {'organizationshard', 'tasklease'}
+    
+    def _route(self, model, hints):
+        if not settings.SHARDING_ENABLED:
+            return None
+        
+        if model._meta.model_name in self.GLOBAL_MODELS:
+            return 'default'
+        
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        
+        return _current_shard.get()
+    
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+    
+    def db_for_write(self, model, **hints):
+        if _writes_frozen.get() and model._meta.model_name not in self.GLOBAL_MODELS:
+            raise OrganizationMoving(f'{model._meta.label} is read-only while the organization is moved')
+        return self._route(model, hints)
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if model_name in self.GLOBAL_MODELS:
+            return db == 'default'
+        return None
+
+
+# ==================== Read Replica Routing ====================
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def _pin_key(user_id):
+    return f'db-pin:user:{user_id}'
+
+
+def pin_to_primary(user):
+    """Send this user's replica reads to the primary for a short window after a write"""
+    if settings.REPLICA_DATABASES:
+        cache.set(_pin_key(user.pk), 1, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user):
+    """Check if the user wrote recently and must read their own writes"""
+    return cache.get(_pin_key(user.pk)) is not None
+
+
+@contextmanager
+def replica_reads(user=None):
+    """
+    Route reads inside this block to a replica.
+    Reads stay on the primary when no replica is configured or when the
+    user has been pinned to the primary by a recent write.
+    """
+    if not settings.REPLICA_DATABASES or (user is not None and is_pinned_to_primary(user)):
+        yield
+        return
+    
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Database router that sends reads marked with replica_reads() to one of
+    settings.REPLICA_DATABASES; everything else uses the primary.
+    """
+    
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and settings.REPLICA_DATABASES:
+            return random.choice(settings.REPLICA_DATABASES)
+        return None
+    
+    def db_for_write(self, model, **hints):
+        return None
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        pool = {'default', *settings.REPLICA_DATABASES}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes through replication
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
@@ -0,0 +1,128 @@
+import re
+
+from django.db import connections
+from django.db.models import F, FloatField, Lookup, Q, Value
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+
+# MySQL: a FULLTEXT index on alerts(title, message), maintained by InnoDB.
+# SQLite: an external-content FTS5 table kept in sync by triggers, so bulk_create()
+# and queryset.update() are covered as well as save(). Other databases use LIKE.
+FULLTEXT_INDEX = 'alerts_title_message_ft'
+FTS_TABLE = 'alerts_fts'
+FTS_TRIGGERS = {
+    'alerts_fts_insert': f'''
+        CREATE TRIGGER IF NOT EXISTS alerts_fts_insert AFTER INSERT ON alerts BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, message) VALUES (new.id, new.title, new.message);
+        END
+    ''',
+    'alerts_fts_delete': f'''
+        CREATE TRIGGER IF NOT EXISTS alerts_fts_delete AFTER DELETE ON alerts BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, message) VALUES ('delete', old.id, old.title, old.message);
+        END
+    ''',
+    'alerts_fts_update': f'''
+        CREATE TRIGGER IF NOT EXISTS alerts_fts_update AFTER UPDATE OF title, message ON alerts BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, message) VALUES ('delete', old.id, old.title, old.message);
+            INSERT INTO {FTS_TABLE}(rowid, title, message) VALUES (new.id, new.title, new.message);
+        END
+    ''',
+}
+
+# Words are matched whole; operators and punctuation in the query are ignored
+SEARCH_TERM = re.compile(r'\w+')
+MAX_SEARCH_TERMS = 16
+
+
+class Match(Lookup):
+    """`<fts5 table column> MATCH <expression>`"""
+    lookup_name = 'match'
+    
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+def search_terms(query):
+    return SEARCH_TERM.findall(query)[:MAX_SEARCH_TERMS]
+
+
+def search_alerts(queryset, query):
+    """
+    Alerts of `queryset` matching any word of `query`, most relevant first.
+    Each row is annotated with `search_rank` (higher is better).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    
+    connection = connections[queryset.db]
+    
+    if connection.vendor == 'mysql':
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        match = RawSQL(
+            f'MATCH ({table}.`title`, {table}.`message`) AGAINST (%s IN NATURAL LANGUAGE MODE)',
+            [' '.join(terms)],
+            output_field=FloatField()
+        )
+        queryset = queryset.annotate(search_rank=match).filter(search_rank__gt=0)
+    elif connection.vendor == 'sqlite':
+        # Joined through AlertSearchEntry so SQLite scans the FTS matches once;
+        # its rank is bm25(), which is lower for better matches
+        expression = ' OR '.join(f'"{term}"' for term in terms)
+        # (isnull=False makes it an inner join, which FTS5 needs to use MATCH)
+        queryset = queryset.filter(
+            Match(F('search_entry__document'), expression),
+            search_entry__isnull=False
+        ).annotate(search_rank=-F('search_entry__rank'))
+    else:
+        condition = Q()
+        for term in terms:
+            condition |= Q(title__icontains=term) | Q(message__icontains=term)
+        queryset = queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+    
+    return queryset.order_by('-search_rank', '-id')
+
+
+class AlertSearchFilter(BaseFilterBackend):
+    """`?search=` over alert titles and messages, ordered by relevance"""
+    search_param = 'search'
+    
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_alerts(queryset, query)
+
+
+# ==================== Index Maintenance ====================
+
+def install_search_index(connection):
+    """Create the full-text index on `connection`, filling it from existing alerts"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f'ALTER TABLE alerts ADD FULLTEXT INDEX {FULLTEXT_INDEX} (title, message)')
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                f"USING fts5(title, message, content='alerts', content_rowid='id')"
+            )
+            for sql in FTS_TRIGGERS.values():
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def repair_search_index(connection):
+    """
+    SQLite drops a table's triggers when a migration rebuilds it; recreate them
+    and rebuild the FTS table if any went missing. A no-op elsewhere.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE name = %s OR type = 'trigger'", [FTS_TABLE])
+        existing = {name for _type, name in cursor.fetchall()}
+    if FTS_TABLE in existing and not set(FTS_TRIGGERS) <= existing:
+        install_search_index(connection)
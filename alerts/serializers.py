@@ -1,11 +1,52 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import authenticate
-from .models import User, Team, Alert, NotificationDelivery, UserAlertPreference
+from django.utils import timezone
+from .models import User, Team, Alert, NotificationDelivery, UserAlertPreference, Organization, WebhookEndpoint
+from .routers import use_shard
+from .sharding import shard_databases
+from .templating import compile_message, render_alert, unknown_variables
+
+
+class OrganizationField(serializers.SlugRelatedField):
+    """
+    Organization represented by its name, as clients have always sent it.
+    Numeric ids are accepted too. Unknown names are rejected rather than
+    created, so a typo never starts a new tenant; only registration creates one.
+    """
+    
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', Organization.objects.all())
+        super().__init__(slug_field='name', **kwargs)
+    
+    def to_internal_value(self, data):
+        # One lookup per distinct value, e.g. across the items of a bulk request
+        key = (type(data), data) if isinstance(data, (int, str)) else None
+        resolved = getattr(self, '_resolved', None)
+        if resolved is None:
+            resolved = self._resolved = {}
+        if key not in resolved:
+            resolved[key] = self._resolve(data)
+        return resolved[key]
+    
+    def _resolve(self, data):
+        if isinstance(data, int):
+            try:
+                return self.get_queryset().get(pk=data)
+            except Organization.DoesNotExist:
+                self.fail('does_not_exist', slug_name='id', value=data)
+        if not isinstance(data, str) or not data.strip():
+            self.fail('invalid')
+        try:
+            return self.get_queryset().get(name=data.strip())
+        except Organization.DoesNotExist:
+            self.fail('does_not_exist', slug_name='name', value=data)
 
 
 class UserSerializer(serializers.ModelSerializer):
     """User Serializer"""
     team_name = serializers.CharField(source='team.name', read_only=True)
+    organization = OrganizationField(required=False)
     
     class Meta:
         model = User
@@ -15,8 +56,9 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
-    """User Registration Serializer"""
+    """User Registration Serializer; joins the named organization, creating it if it is new"""
     password = serializers.CharField(write_only=True, min_length=8)
+    organization = serializers.CharField(max_length=100, required=False)
     
     class Meta:
         model = User
@@ -24,6 +66,14 @@ class UserCreateSerializer(serializers.ModelSerializer):
                   'role', 'team', 'organization']
     
     def create(self, validated_data):
+        name = validated_data.pop('organization', None)
+        if name is not None:
+            # The only place a new organization (tenant) is created; existing
+            # ones are matched regardless of case
+            organization = Organization.objects.filter(name__iexact=name).first()
+            if organization is None:
+                organization = Organization.objects.create(name=name)
+            validated_data['organization'] = organization
         user = User.objects.create_user(**validated_data)
         return user
 
@@ -40,11 +90,17 @@ class LoginSerializer(serializers.Serializer):
         if email and password:
             # Django's authenticate uses username by default
             # We need to get user by email first
-            try:
-                user = User.objects.get(email=email)
-                user = authenticate(username=user.username, password=password)
-            except User.DoesNotExist:
-                user = None
+            # Users are looked up on every shard; without sharding this is
+            # just the default database
+            user = None
+            for alias in shard_databases():
+                try:
+                    candidate = User.objects.using(alias).get(email=email)
+                except User.DoesNotExist:
+                    continue
+                with use_shard(alias):
+                    user = authenticate(username=candidate.username, password=password)
+                break
             
             if not user:
                 raise serializers.ValidationError('Invalid credentials')
@@ -61,6 +117,7 @@ class LoginSerializer(serializers.Serializer):
 class TeamSerializer(serializers.ModelSerializer):
     """Team Serializer"""
     member_count = serializers.SerializerMethodField()
+    organization = OrganizationField(required=False)
     
     class Meta:
         model = Team
@@ -69,12 +126,48 @@ class TeamSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_member_count(self, obj):
-        return obj.members.count()
+        # Annotated by TeamViewSet; a freshly saved team falls back to a count query
+        count = getattr(obj, 'member_count', None)
+        if count is None:
+            return obj.members.count()
+        return count
+
+
+class TeamMembershipSerializer(serializers.Serializer):
+    """Bulk Team Membership Request Serializer"""
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
+
+
+class TargetPreviewField(serializers.ManyRelatedField):
+    """
+    Target id list: writes take the full set, reads return only the first
+    ALERT_TARGET_PREVIEW ids, ordered by id like the names next to them.
+    """
+    
+    def __init__(self, queryset, **kwargs):
+        kwargs.setdefault('required', False)
+        super().__init__(child_relation=serializers.PrimaryKeyRelatedField(queryset=queryset), **kwargs)
+    
+    def get_attribute(self, instance):
+        if not instance.pk:
+            return []
+        return super().get_attribute(instance).order_by('id')[:settings.ALERT_TARGET_PREVIEW]
 
 
 class AlertSerializer(serializers.ModelSerializer):
     """Alert Serializer"""
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
+    target_organization = OrganizationField(required=False, allow_null=True)
+    # Target lists can run to thousands of rows; reads get counts and the
+    # first ids and names here, and page through the targets/ sub-resources
+    target_teams = TargetPreviewField(queryset=Team.objects.all())
+    target_users = TargetPreviewField(queryset=User.objects.all())
+    target_teams_count = serializers.SerializerMethodField()
+    target_users_count = serializers.SerializerMethodField()
     target_teams_names = serializers.SerializerMethodField()
     target_users_names = serializers.SerializerMethodField()
     is_expired = serializers.ReadOnlyField()
@@ -82,13 +175,38 @@ class AlertSerializer(serializers.ModelSerializer):
     class Meta:
         model = Alert
         fields = '__all__'
-        read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_by', 'occurrence_count', 'last_occurred_at', 'created_at', 'updated_at']
+    
+    def get_target_teams_count(self, obj):
+        return obj.target_teams.count()
+    
+    def get_target_users_count(self, obj):
+        return obj.target_users.count()
     
     def get_target_teams_names(self, obj):
-        return [team.name for team in obj.target_teams.all()]
+        teams = obj.target_teams.order_by('id').values_list('name', flat=True)
+        return list(teams[:settings.ALERT_TARGET_PREVIEW])
     
     def get_target_users_names(self, obj):
-        return [user.get_full_name() or user.username for user in obj.target_users.all()]
+        users = obj.target_users.order_by('id').only('username', 'first_name', 'last_name')
+        return [user.get_full_name() or user.username for user in users[:settings.ALERT_TARGET_PREVIEW]]
+    
+    def validate_title(self, value):
+        return self._validate_template(value)
+    
+    def validate_message(self, value):
+        return self._validate_template(value)
+    
+    def validate_template_fields(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Template fields must be an object")
+        return value
+    
+    def _validate_template(self, value):
+        unknown = unknown_variables(value)
+        if unknown:
+            raise serializers.ValidationError(f"Unknown template variables: {', '.join(unknown)}")
+        return value
     
     def validate(self, data):
         """Validate alert data"""
@@ -105,6 +223,67 @@ class AlertSerializer(serializers.ModelSerializer):
         return data
 
 
+class AlertBulkItemSerializer(AlertSerializer):
+    """One alert of a bulk create; targets are plain ids checked for the whole batch"""
+    target_teams = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+    target_users = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False)
+
+
+def validate_bulk_targets(items):
+    """Check every team and user referenced by a batch with one query each"""
+    team_ids = {pk for item in items for pk in item.get('target_teams', [])}
+    user_ids = {pk for item in items for pk in item.get('target_users', [])}
+    
+    missing_teams = team_ids - set(Team.objects.filter(id__in=team_ids).values_list('id', flat=True))
+    missing_users = user_ids - set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+    
+    errors = {}
+    if missing_teams:
+        errors['target_teams'] = f"Unknown team ids: {sorted(missing_teams)}"
+    if missing_users:
+        errors['target_users'] = f"Unknown user ids: {sorted(missing_users)}"
+    if errors:
+        raise serializers.ValidationError(errors)
+
+
+class AlertBulkCreateSerializer(serializers.Serializer):
+    """Bulk Alert Create Serializer"""
+    alerts = AlertBulkItemSerializer(many=True, allow_empty=False, max_length=500)
+    
+    def validate(self, data):
+        validate_bulk_targets(data['alerts'])
+        return data
+    
+    def create(self, validated_data):
+        """Insert the alerts and their target rows with bulk inserts"""
+        from .services import AlertIngestionService
+        
+        created_by = validated_data['created_by']
+        alerts = []
+        targets = []
+        for item in validated_data['alerts']:
+            item = dict(item)
+            targets.append((item.pop('target_teams', []), item.pop('target_users', [])))
+            alerts.append(Alert(created_by=created_by, **item))
+        
+        return AlertIngestionService().create_alerts(alerts, targets)
+
+
+class EventSerializer(AlertBulkItemSerializer):
+    """Ingested Event Serializer; repeats of a dedup_key fold into one open alert"""
+    dedup_key = serializers.CharField(max_length=255)
+    expiry_time = serializers.DateTimeField(required=False)
+
+
+class EventIngestSerializer(serializers.Serializer):
+    """Event Batch Serializer"""
+    events = EventSerializer(many=True, allow_empty=False, max_length=5000)
+    
+    def validate(self, data):
+        validate_bulk_targets(data['events'])
+        return data
+
+
 class AlertListSerializer(serializers.ModelSerializer):
     """Simplified Alert Serializer for Lists"""
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
@@ -130,6 +309,14 @@ class UserAlertSerializer(serializers.ModelSerializer):
                   'expiry_time', 'created_by_name', 'created_at',
                   'is_read', 'is_snoozed', 'snooze_until']
     
+    def to_representation(self, instance):
+        # Title and message are rendered for the viewing user
+        data = super().to_representation(instance)
+        user = self.context.get('user')
+        if user:
+            data['title'], data['message'] = render_alert(instance, user)
+        return data
+    
     def get_is_read(self, obj):
         user = self.context.get('user')
         if user:
@@ -152,22 +339,155 @@ class UserAlertSerializer(serializers.ModelSerializer):
         return None
 
 
+# ==================== Fast List Paths ====================
+# The hot list endpoints build their rows from .values() instead of model
+# instances and DRF fields. Output must stay identical to AlertListSerializer
+# and UserAlertSerializer; tests/test_list_rows.py and every run_benchmarks run check that.
+
+_datetime_field = serializers.DateTimeField()
+
+ALERT_LIST_VALUES = (
+    'id', 'title', 'message', 'severity', 'visibility_type', 'is_active', 'is_archived',
+    'expiry_time', 'created_at', 'created_by__first_name', 'created_by__last_name',
+)
+
+USER_ALERT_VALUES = (
+    'id', 'title', 'message', 'template_fields', 'severity', 'delivery_type', 'expiry_time',
+    'created_at', 'created_by__first_name', 'created_by__last_name',
+)
+
+
+def _full_name(row):
+    # Same as AbstractUser.get_full_name
+    return f"{row['created_by__first_name']} {row['created_by__last_name']}".strip()
+
+
+def alert_list_rows(rows):
+    """AlertListSerializer(many=True).data for rows of .values(*ALERT_LIST_VALUES)"""
+    now = timezone.now()
+    to_datetime = _datetime_field.to_representation
+    return [
+        {
+            'id': row['id'],
+            'title': row['title'],
+            'message': row['message'],
+            'severity': row['severity'],
+            'visibility_type': row['visibility_type'],
+            'is_active': row['is_active'],
+            'is_archived': row['is_archived'],
+            'expiry_time': to_datetime(row['expiry_time']),
+            'created_by_name': _full_name(row),
+            'created_at': to_datetime(row['created_at']),
+            'is_expired': row['expiry_time'] < now,
+        }
+        for row in rows
+    ]
+
+
+def user_alert_rows(rows, user):
+    """
+    UserAlertSerializer(many=True, context={'user': user}).data for rows of
+    .values(*USER_ALERT_VALUES), with one preference query for all rows.
+    """
+    rows = list(rows)
+    preferences = {
+        alert_id: (is_read, snooze_until)
+        for alert_id, is_read, snooze_until in UserAlertPreference.objects.filter(
+            user=user,
+            alert_id__in=[row['id'] for row in rows]
+        ).values_list('alert_id', 'is_read', 'snooze_until')
+    }
+    
+    now = timezone.now()
+    to_datetime = _datetime_field.to_representation
+    data = []
+    for row in rows:
+        is_read, snooze_until = preferences.get(row['id'], (False, None))
+        is_snoozed = snooze_until is not None and snooze_until > now
+        title, message = compile_message(row['title'], row['message']).render(user, row['template_fields'])
+        data.append({
+            'id': row['id'],
+            'title': title,
+            'message': message,
+            'severity': row['severity'],
+            'delivery_type': row['delivery_type'],
+            'expiry_time': to_datetime(row['expiry_time']),
+            'created_by_name': _full_name(row),
+            'created_at': to_datetime(row['created_at']),
+            'is_read': is_read,
+            'is_snoozed': is_snoozed,
+            # A method field in UserAlertSerializer, so the datetime is left to the renderer
+            'snooze_until': snooze_until if is_snoozed else None,
+        })
+    return data
+
+
+class WebhookEndpointSerializer(serializers.ModelSerializer):
+    """Webhook Endpoint Serializer; the secret is generated unless one is given, and never read back"""
+    secret = serializers.CharField(max_length=128, min_length=16, required=False, write_only=True)
+    batch_size = serializers.IntegerField(min_value=1, max_value=500, required=False)
+    
+    class Meta:
+        model = WebhookEndpoint
+        fields = ['id', 'name', 'url', 'secret', 'batch_size', 'is_active', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+
 class NotificationDeliverySerializer(serializers.ModelSerializer):
     """Notification Delivery Serializer"""
     alert_title = serializers.CharField(source='alert.title', read_only=True)
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
+    delivery_type = serializers.CharField(source='get_delivery_type_display', read_only=True)
+    status = serializers.CharField(source='get_status_display', read_only=True)
+    failure_reason = serializers.SerializerMethodField()
     
     class Meta:
         model = NotificationDelivery
         fields = '__all__'
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id']
+    
+    def get_failure_reason(self, obj):
+        if obj.status != NotificationDelivery.STATUS_FAILED:
+            return ''
+        failure = getattr(obj, 'failure', None)
+        return failure.reason if failure else ''
 
 
 class UserAlertPreferenceSerializer(serializers.ModelSerializer):
     """User Alert Preference Serializer"""
     alert_title = serializers.CharField(source='alert.title', read_only=True)
+    is_snoozed = serializers.ReadOnlyField()
     
     class Meta:
         model = UserAlertPreference
         fields = '__all__'
-        read_only_fields = ['id', 'user', 'alert', 'created_at', 'updated_at']
\ No newline at end of file
+        read_only_fields = ['id', 'user', 'alert', 'created_at', 'updated_at']
+
+
+class SnoozeSerializer(serializers.Serializer):
+    """Snooze Request Serializer (defaults to end of day)"""
+    minutes = serializers.IntegerField(required=False, min_value=1, max_value=60 * 24 * 30)
+    hours = serializers.IntegerField(required=False, min_value=1, max_value=24 * 30)
+    until = serializers.DateTimeField(required=False)
+    
+    def validate(self, data):
+        from django.utils import timezone
+        from datetime import timedelta
+        
+        provided = [key for key in ('minutes', 'hours', 'until') if key in data]
+        if len(provided) > 1:
+            raise serializers.ValidationError("Provide only one of minutes, hours or until")
+        
+        now = timezone.now()
+        if 'minutes' in data:
+            data['snooze_until'] = now + timedelta(minutes=data['minutes'])
+        elif 'hours' in data:
+            data['snooze_until'] = now + timedelta(hours=data['hours'])
+        elif 'until' in data:
+            if data['until'] <= now:
+                raise serializers.ValidationError("Snooze time must be in the future")
+            data['snooze_until'] = data['until']
+        else:
+            data['snooze_until'] = now.replace(hour=23, minute=59, second=59, microsecond=999999)
+        
+        return data
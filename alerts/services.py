@@ -1,6 +1,23 @@
+import logging
+import time
 from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import F
 from django.utils import timezone
-from .models import Alert, User, NotificationDelivery, UserAlertPreference
+from .authentication import invalidate_cached_users
+from .metrics import record_recipients, record_send, record_skip
+from .models import (
+    Alert, AlertDedupKey, DigestItem, NotificationDigest, User, NotificationDelivery,
+    NotificationFailure, UserAlertPreference
+)
+from .templating import alert_template, render_alert
+from .webhooks import queue_delivery, webhook_batching
+
+
+logger = logging.getLogger(__name__)
 
 
 # ==================== Strategy Pattern for Notification Channels ====================
@@ -9,17 +26,22 @@ class NotificationStrategy(ABC):
     """Base Notification Strategy"""
     
     @abstractmethod
-    def send(self, user, alert):
-        """Send notification to user"""
+    def send(self, user, alert, content):
+        """Send notification to user; `content` is the alert's Message rendered for them"""
+        pass
+    
+    @abstractmethod
+    def send_digest(self, user, alerts, contents):
+        """Send several alerts to user as one combined notification"""
         pass
 
 
 class InAppNotificationStrategy(NotificationStrategy):
     """In-App Notification Strategy"""
     
-    def send(self, user, alert):
+    def send(self, user, alert, content):
         """Send in-app notification"""
-        print(f"[InApp] Sending alert '{alert.title}' to user {user.email}")
+        logger.debug("[InApp] Sending alert '%s' to user %s", content.title, user.email)
         
         return {
             'success': True,
@@ -28,20 +50,32 @@ class InAppNotificationStrategy(NotificationStrategy):
             'alert_id': alert.id,
             'sent_at': timezone.now()
         }
+    
+    def send_digest(self, user, alerts, contents):
+        """Send in-app digest"""
+        logger.debug("[InApp] Sending digest of %d alerts to user %s", len(alerts), user.email)
+        
+        return {
+            'success': True,
+            'channel': 'InApp',
+            'user_id': user.id,
+            'alert_ids': [alert.id for alert in alerts],
+            'sent_at': timezone.now()
+        }
 
 
 class EmailNotificationStrategy(NotificationStrategy):
     """Email Notification Strategy"""
     
-    def send(self, user, alert):
+    def send(self, user, alert, content):
         """Send email notification"""
-        print(f"[Email] Would send alert '{alert.title}' to {user.email}")
+        logger.debug("[Email] Would send alert '%s' to %s", content.title, user.email)
         
         # TODO: Integrate with Django email backend or SendGrid
         # from django.core.mail import send_mail
         # send_mail(
-        #     subject=alert.title,
-        #     message=alert.message,
+        #     subject=content.title,
+        #     message=content.message,
         #     from_email='noreply@alertplatform.com',
         #     recipient_list=[user.email],
         # )
@@ -53,20 +87,32 @@ class EmailNotificationStrategy(NotificationStrategy):
             'alert_id': alert.id,
             'sent_at': timezone.now()
         }
+    
+    def send_digest(self, user, alerts, contents):
+        """Send one email listing all buffered alerts"""
+        logger.debug("[Email] Would send digest of %d alerts to %s", len(alerts), user.email)
+        
+        return {
+            'success': True,
+            'channel': 'Email',
+            'user_id': user.id,
+            'alert_ids': [alert.id for alert in alerts],
+            'sent_at': timezone.now()
+        }
 
 
 class SMSNotificationStrategy(NotificationStrategy):
     """SMS Notification Strategy"""
     
-    def send(self, user, alert):
+    def send(self, user, alert, content):
         """Send SMS notification"""
-        print(f"[SMS] Would send alert '{alert.title}' to user {user.email}")
+        logger.debug("[SMS] Would send alert '%s' to user %s", content.title, user.email)
         
         # TODO: Integrate with Twilio or AWS SNS
         # from twilio.rest import Client
         # client = Client(account_sid, auth_token)
         # client.messages.create(
-        #     body=f"{alert.title}: {alert.message}",
+        #     body=f"{content.title}: {content.message}",
         #     from_='+1234567890',
         #     to=user.phone_number
         # )
@@ -78,6 +124,57 @@ class SMSNotificationStrategy(NotificationStrategy):
             'alert_id': alert.id,
             'sent_at': timezone.now()
         }
+    
+    def send_digest(self, user, alerts, contents):
+        """Send one SMS summarising all buffered alerts"""
+        logger.debug("[SMS] Would send digest of %d alerts to user %s", len(alerts), user.email)
+        
+        return {
+            'success': True,
+            'channel': 'SMS',
+            'user_id': user.id,
+            'alert_ids': [alert.id for alert in alerts],
+            'sent_at': timezone.now()
+        }
+
+
+class WebhookNotificationStrategy(NotificationStrategy):
+    """Webhook Notification Strategy; posts happen in the deliver_webhook task"""
+    
+    def send(self, user, alert, content):
+        """Queue the alert for the user's organization endpoints"""
+        logger.debug("[Webhook] Queueing alert '%s' for user %s", content.title, user.email)
+        
+        if not queue_delivery(user, alert, content):
+            return {
+                'success': False,
+                'channel': 'Webhook',
+                'user_id': user.id,
+                'alert_id': alert.id,
+                'error': 'No active webhook endpoint'
+            }
+        
+        return {
+            'success': True,
+            'channel': 'Webhook',
+            'user_id': user.id,
+            'alert_id': alert.id,
+            'sent_at': timezone.now()
+        }
+    
+    def send_digest(self, user, alerts, contents):
+        """Queue every buffered alert; batching combines them into as few posts as possible"""
+        logger.debug("[Webhook] Queueing digest of %d alerts for user %s", len(alerts), user.email)
+        
+        queued = [queue_delivery(user, alert, content) for alert, content in zip(alerts, contents)]
+        
+        return {
+            'success': all(queued),
+            'channel': 'Webhook',
+            'user_id': user.id,
+            'alert_ids': [alert.id for alert in alerts],
+            'sent_at': timezone.now()
+        }
 
 
 # ==================== Factory Pattern ====================
@@ -92,6 +189,7 @@ class NotificationStrategyFactory:
             'InApp': InAppNotificationStrategy,
             'Email': EmailNotificationStrategy,
             'SMS': SMSNotificationStrategy,
+            'Webhook': WebhookNotificationStrategy,
         }
         
         strategy_class = strategies.get(delivery_type, InAppNotificationStrategy)
@@ -103,13 +201,13 @@ class NotificationStrategyFactory:
 class NotificationService:
     """Service to handle notification logic"""
     
-    def get_target_users(self, alert):
-        """Get all users who should receive this alert"""
-        users = []
+    def get_target_users(self, alert, related=()):
+        """Get all users who should receive this alert, joined to `related`"""
+        users = User.objects.none()
         
         if alert.visibility_type == 'Organization':
             users = User.objects.filter(
-                organization=alert.target_organization,
+                organization_id=alert.target_organization_id,
                 is_active=True
             )
         
@@ -122,10 +220,98 @@ class NotificationService:
         elif alert.visibility_type == 'User':
             users = alert.target_users.filter(is_active=True)
         
+        if related:
+            users = users.select_related(*related)
         return users
     
-    def send_to_user(self, alert, user, is_reminder=False):
-        """Send alert to specific user"""
+    def uses_digest(self, alert):
+        """Check if deliveries of this alert are buffered into digests"""
+        if alert.severity == 'Critical':
+            return False
+        return alert.severity in settings.DIGEST_RULES.get(alert.delivery_type, [])
+    
+    def digest_due_at(self):
+        """End of the current digest window; windows are aligned so no lookup is needed"""
+        window = settings.DIGEST_WINDOW_SECONDS
+        window_end = (int(timezone.now().timestamp()) // window + 1) * window
+        return datetime.fromtimestamp(window_end, tz=dt_timezone.utc)
+    
+    def next_reminder_time(self, preference, alert, now=None):
+        """When the next reminder is due; spread over the period unless REMINDER_SPREAD is off"""
+        now = now or timezone.now()
+        if not settings.REMINDER_SPREAD:
+            return now + timedelta(hours=alert.reminder_frequency_hours)
+        return preference.reminder_slot(alert.reminder_frequency_hours, after=now)
+    
+    def schedule_next_reminder(self, preference, alert):
+        """Record a delivery (or digest buffering) and schedule the next reminder"""
+        now = timezone.now()
+        preference.last_reminder_sent_at = now
+        preference.next_reminder_at = self.next_reminder_time(preference, alert, now)
+        preference.save()
+    
+    def claim_reminder(self, preference, alert):
+        """
+        Atomically move the reminder schedule forward, but only if nobody else has
+        since the preference was read. Returns False when another run got there first.
+        """
+        now = timezone.now()
+        next_reminder_at = self.next_reminder_time(preference, alert, now)
+        
+        claimed = UserAlertPreference.objects.filter(
+            id=preference.id,
+            next_reminder_at=preference.next_reminder_at,
+            last_reminder_sent_at=preference.last_reminder_sent_at
+        ).update(last_reminder_sent_at=now, next_reminder_at=next_reminder_at)
+        
+        if claimed:
+            preference.last_reminder_sent_at = now
+            preference.next_reminder_at = next_reminder_at
+        return bool(claimed)
+    
+    def buffer_digest(self, alert, users, batch_size=1000):
+        """
+        Buffer a fan-out for the recipients' next digest and schedule their
+        reminders, with bulk writes instead of a round trip per recipient.
+        """
+        now = timezone.now()
+        channel = NotificationDelivery.CHANNEL_CODES.get(
+            alert.delivery_type, NotificationDelivery.CHANNEL_CODES['InApp']
+        )
+        due_at = self.digest_due_at()
+        DigestItem.objects.bulk_create(
+            [DigestItem(user=user, alert=alert, delivery_type=channel, due_at=due_at) for user in users],
+            batch_size=batch_size
+        )
+        
+        # Same bookkeeping as schedule_next_reminder, one statement per batch
+        user_ids = [user.id for user in users]
+        preferences = list(UserAlertPreference.objects.filter(alert=alert, user_id__in=user_ids))
+        for preference in preferences:
+            preference.last_reminder_sent_at = now
+            preference.next_reminder_at = self.next_reminder_time(preference, alert, now)
+            preference.updated_at = now
+        UserAlertPreference.objects.bulk_update(
+            preferences, ['last_reminder_sent_at', 'next_reminder_at', 'updated_at'], batch_size=batch_size
+        )
+        
+        existing = {preference.user_id for preference in preferences}
+        missing = []
+        for user_id in user_ids:
+            if user_id not in existing:
+                preference = UserAlertPreference(user_id=user_id, alert=alert, last_reminder_sent_at=now)
+                preference.next_reminder_at = self.next_reminder_time(preference, alert, now)
+                missing.append(preference)
+        UserAlertPreference.objects.bulk_create(missing, batch_size=batch_size, ignore_conflicts=True)
+        
+        record_skip('digest', len(users))
+        return len(users)
+    
+    def send_to_user(self, alert, user, is_reminder=False, content=None, digest_items=None):
+        """
+        Send alert to specific user; `content` is rendered here unless the caller batched it.
+        Digest items are appended to `digest_items` when given, for the caller to write in bulk.
+        """
         try:
             # Get or create user preference
             preference, created = UserAlertPreference.objects.get_or_create(
@@ -135,40 +321,93 @@ class NotificationService:
             
             # Check if user has snoozed this alert
             if is_reminder and preference.is_snoozed_now():
-                print(f"User {user.email} has snoozed alert {alert.title}")
+                logger.debug("User %s has snoozed alert %s", user.email, alert.title)
+                record_skip('snoozed')
                 return {'success': False, 'reason': 'snoozed'}
             
             # Check if enough time has passed for reminder
             if is_reminder and not preference.should_receive_reminder(alert.reminder_frequency_hours):
-                print(f"Not enough time passed for reminder to {user.email}")
+                logger.debug("Not enough time passed for reminder to %s", user.email)
+                record_skip('too_soon')
                 return {'success': False, 'reason': 'too_soon'}
             
+            # Claim the reminder before sending so overlapping runs never double-send
+            if is_reminder and not self.claim_reminder(preference, alert):
+                logger.debug("Reminder to %s already claimed by another run", user.email)
+                record_skip('claimed')
+                return {'success': False, 'reason': 'claimed'}
+            
+            channel = NotificationDelivery.CHANNEL_CODES.get(
+                alert.delivery_type, NotificationDelivery.CHANNEL_CODES['InApp']
+            )
+            
+            # Buffer for the user's next digest instead of notifying now
+            if self.uses_digest(alert):
+                item = DigestItem(
+                    user=user,
+                    alert=alert,
+                    delivery_type=channel,
+                    is_reminder=is_reminder,
+                    due_at=self.digest_due_at()
+                )
+                if digest_items is None:
+                    item.save()
+                else:
+                    digest_items.append(item)
+                if not is_reminder:
+                    self.schedule_next_reminder(preference, alert)
+                record_skip('digest')
+                return {
+                    'success': True,
+                    'channel': alert.delivery_type,
+                    'user_id': user.id,
+                    'alert_id': alert.id,
+                    'digest': True
+                }
+            
             # Get the appropriate notification strategy
             strategy = NotificationStrategyFactory.get_strategy(alert.delivery_type)
             
             # Send the notification
-            result = strategy.send(user, alert)
+            if content is None:
+                content = render_alert(alert, user)
+            started = time.perf_counter()
+            result = strategy.send(user, alert, content)
+            record_send(alert.delivery_type, time.perf_counter() - started, result['success'])
             
             if result['success']:
                 # Log the delivery
                 NotificationDelivery.objects.create(
                     alert=alert,
                     user=user,
-                    delivery_type=alert.delivery_type,
-                    status='sent',
+                    delivery_type=channel,
+                    status=NotificationDelivery.STATUS_SENT,
                     sent_at=timezone.now(),
-                    is_reminder=is_reminder,
-                    reminder_count=1 if is_reminder else 0
+                    is_reminder=is_reminder
                 )
                 
-                # Update preference
-                preference.last_reminder_sent_at = timezone.now()
-                preference.save()
+                # Update preference and schedule the next reminder (claimed reminders already are)
+                if not is_reminder:
+                    self.schedule_next_reminder(preference, alert)
+            else:
+                # Only failures pay for the failure side table
+                delivery = NotificationDelivery.objects.create(
+                    alert=alert,
+                    user=user,
+                    delivery_type=channel,
+                    status=NotificationDelivery.STATUS_FAILED,
+                    is_reminder=is_reminder
+                )
+                NotificationFailure.objects.create(
+                    delivery=delivery,
+                    reason=result.get('error') or result.get('reason') or 'unknown'
+                )
             
             return result
         
         except Exception as e:
-            print(f"Error sending notification to {user.email}: {str(e)}")
+            logger.exception("Error sending notification to %s", user.email)
+            record_skip('error')
             return {'success': False, 'error': str(e)}
     
     def send_alert(self, alert_id, is_reminder=False):
@@ -185,42 +424,114 @@ class NotificationService:
             if not alert.should_send_reminder():
                 return {'success': False, 'reason': 'Alert expired or reminders disabled'}
             
-            users = self.get_target_users(alert)
+            # Compiled once per title/message; recipients are rendered in one batch
+            template = alert_template(alert)
+            users = list(self.get_target_users(alert, template.relations))
             
             results = {
-                'total': users.count(),
+                'total': len(users),
                 'sent': 0,
                 'failed': 0,
                 'snoozed': 0,
                 'details': []
             }
             
-            for user in users:
-                result = self.send_to_user(alert, user, is_reminder)
-                
-                if result['success']:
-                    results['sent'] += 1
-                elif result.get('reason') == 'snoozed':
-                    results['snoozed'] += 1
-                else:
-                    results['failed'] += 1
-                
-                results['details'].append({
-                    'user_id': user.id,
-                    'email': user.email,
-                    **result
-                })
+            record_recipients(results['total'])
+            if self.uses_digest(alert) and not is_reminder:
+                # Rendered when the digest goes out
+                results['sent'] = self.buffer_digest(alert, users)
+                results['details'] = [
+                    {'user_id': user.id, 'email': user.email, 'success': True, 'digest': True}
+                    for user in users
+                ]
+                return results
+            
+            contents = template.render_many(users, alert.template_fields)
+            # Webhook deliveries are posted in batches once every recipient is done
+            with webhook_batching():
+                for user, content in zip(users, contents):
+                    result = self.send_to_user(alert, user, is_reminder, content)
+                    
+                    if result['success']:
+                        results['sent'] += 1
+                    elif result.get('reason') == 'snoozed':
+                        results['snoozed'] += 1
+                    else:
+                        results['failed'] += 1
+                    
+                    results['details'].append({
+                        'user_id': user.id,
+                        'email': user.email,
+                        **result
+                    })
             
             return results
         
         except Alert.DoesNotExist:
             return {'success': False, 'reason': 'Alert not found'}
-        except Exception as e:
-            print(f"Error in send_alert: {str(e)}")
+        except Exception:
+            logger.exception("Error in send_alert")
             raise
     
-    def process_reminders(self):
-        """Process all active alerts for reminders"""
+    def audience_key(self, alert):
+        """Alerts with the same key resolve to the same recipients"""
+        if alert.visibility_type == 'Organization':
+            return ('Organization', alert.target_organization_id)
+        if alert.visibility_type == 'Team':
+            return ('Team', frozenset(team.id for team in alert.target_teams.all()))
+        return ('User', frozenset(user.id for user in alert.target_users.all()))
+    
+    def send_alerts(self, alert_ids, is_reminder=False):
+        """Send a batch of alerts, resolving each distinct audience only once"""
+        alerts = Alert.objects.filter(id__in=alert_ids).select_related('created_by').prefetch_related(
+            'target_teams', 'target_users'
+        )
+        
+        # Audiences are shared between alerts, so they join whatever any template reads
+        templates = {alert.id: alert_template(alert) for alert in alerts}
+        related = set().union(*(template.relations for template in templates.values()))
+        
+        recipients = {}
+        results = {
+            'alerts': 0,
+            'audiences': 0,
+            'sent': 0,
+            'failed': 0,
+            'skipped': 0
+        }
+        
+        with webhook_batching():
+            for alert in alerts:
+                if not alert.should_send_reminder():
+                    results['skipped'] += 1
+                    continue
+                
+                key = self.audience_key(alert)
+                if key not in recipients:
+                    recipients[key] = list(self.get_target_users(alert, related))
+                
+                results['alerts'] += 1
+                record_recipients(len(recipients[key]))
+                if self.uses_digest(alert) and not is_reminder:
+                    results['sent'] += self.buffer_digest(alert, recipients[key])
+                    continue
+                contents = templates[alert.id].render_many(recipients[key], alert.template_fields)
+                for user, content in zip(recipients[key], contents):
+                    result = self.send_to_user(alert, user, is_reminder, content)
+                    if result['success']:
+                        results['sent'] += 1
+                    else:
+                        results['failed'] += 1
+        
+        results['audiences'] = len(recipients)
+        return results
+    
+    def process_reminders(self, batch_size=1000):
+        """
+        Make sure every recipient of an active alert has a reminder scheduled.
+        Nothing is sent here: each missing schedule gets its own slot in the
+        reminder period, and process_due_reminders sends them at a capped rate.
+        """
         now = timezone.now()
         
         # Find all alerts that should send reminders
@@ -230,17 +541,403 @@ class NotificationService:
             reminder_enabled=True,
             start_time__lte=now,
             expiry_time__gt=now
-        )
-        
-        print(f"Processing reminders for {alerts.count()} active alerts")
+        ).prefetch_related('target_teams', 'target_users')
         
         results = []
         for alert in alerts:
-            result = self.send_alert(alert.id, is_reminder=True)
+            user_ids = set(self.get_target_users(alert).values_list('id', flat=True))
+            record_recipients(len(user_ids))
+            
+            preferences = {
+                preference.user_id: preference
+                for preference in UserAlertPreference.objects.filter(alert=alert, user_id__in=user_ids)
+            }
+            
+            # Rows without a schedule get one; snoozed and scheduled rows are left alone
+            unscheduled = [
+                preference for preference in preferences.values()
+                if preference.next_reminder_at is None and not preference.is_snoozed_now()
+            ]
+            for preference in unscheduled:
+                preference.next_reminder_at = self.next_reminder_time(preference, alert, now)
+            UserAlertPreference.objects.bulk_update(unscheduled, ['next_reminder_at'], batch_size=batch_size)
+            
+            missing = []
+            for user_id in user_ids - preferences.keys():
+                preference = UserAlertPreference(user_id=user_id, alert=alert)
+                preference.next_reminder_at = self.next_reminder_time(preference, alert, now)
+                missing.append(preference)
+            UserAlertPreference.objects.bulk_create(missing, batch_size=batch_size, ignore_conflicts=True)
+            
             results.append({
                 'alert_id': alert.id,
                 'alert_title': alert.title,
-                **result
+                'recipients': len(user_ids),
+                'scheduled': len(unscheduled) + len(missing)
             })
         
-        return results
\ No newline at end of file
+        return results
+    
+    def process_due_reminders(self, limit=500):
+        """Send reminders whose due time has passed, oldest first"""
+        now = timezone.now()
+        
+        # Range scan on the next_reminder_at index; only due rows are read.
+        # Team and organization are joined for templates that mention them
+        due = list(
+            UserAlertPreference.objects.filter(next_reminder_at__lte=now)
+            .select_related('alert', 'user__team', 'user__organization')
+            .order_by('next_reminder_at')[:limit]
+        )
+        
+        results = {
+            'due': len(due),
+            'sent': 0,
+            'skipped': 0,
+            'cleared': 0,
+            'deferred': 0
+        }
+        
+        record_recipients(len(due))
+        stale_ids = []
+        snoozed_ids = []
+        skipped = []
+        digest_items = []
+        with webhook_batching():
+            for preference in due:
+                alert = preference.alert
+                if not alert.should_send_reminder() or not preference.user.is_active:
+                    stale_ids.append(preference.id)
+                    record_skip('stale')
+                    continue
+                
+                result = self.send_to_user(alert, preference.user, is_reminder=True, digest_items=digest_items)
+                if result['success']:
+                    results['sent'] += 1
+                    continue
+                
+                results['skipped'] += 1
+                if result.get('reason') == 'snoozed':
+                    snoozed_ids.append(preference.id)
+                elif result.get('reason') != 'claimed':
+                    skipped.append(preference)
+        DigestItem.objects.bulk_create(digest_items, batch_size=1000)
+        
+        # Alerts that can no longer remind drop out of the due index
+        if stale_ids:
+            results['cleared'] = UserAlertPreference.objects.filter(
+                id__in=stale_ids
+            ).update(next_reminder_at=None)
+        
+        # Skipped rows move out of the due range so they cannot fill every later batch:
+        # snoozed ones wake up when the snooze ends, the rest (too_soon, errors) at their next slot
+        if snoozed_ids:
+            results['deferred'] += UserAlertPreference.objects.filter(
+                id__in=snoozed_ids, snooze_until__gt=now
+            ).update(next_reminder_at=F('snooze_until'))
+        for preference in skipped:
+            # Conditional, so a row another run has already moved is left alone
+            results['deferred'] += UserAlertPreference.objects.filter(
+                id=preference.id,
+                next_reminder_at=preference.next_reminder_at
+            ).update(next_reminder_at=self.next_reminder_time(preference, preference.alert, now))
+        
+        return results
+    
+    def claim_digest_items(self, limit):
+        """
+        Take up to `limit` due digest items off the buffer, oldest window first.
+        A user's items for one window are never split between runs, and claimed
+        items are deleted before anything is sent, so a crash cannot send them twice.
+        """
+        now = timezone.now()
+        database = router.db_for_write(DigestItem)
+        due = DigestItem.objects.filter(due_at__lte=now).select_related(
+            'user__team', 'user__organization', 'alert'
+        )
+        
+        with transaction.atomic(using=database):
+            items = list(due.order_by('due_at', 'user_id', 'id')[:limit])
+            if len(items) == limit:
+                # Finish the last user's window even if that goes past the limit
+                last = items[-1]
+                items += list(due.filter(due_at=last.due_at, user_id=last.user_id, id__gt=last.id).order_by('id'))
+            DigestItem.objects.filter(id__in=[item.id for item in items]).delete()
+        return items
+    
+    def flush_digests(self, limit=5000):
+        """Send one combined notification per user and channel for every closed digest window"""
+        items = self.claim_digest_items(limit)
+        
+        groups = defaultdict(dict)
+        for item in items:
+            # An alert buffered twice in one window (e.g. send + reminder) is listed once
+            groups[(item.user_id, item.delivery_type)].setdefault(item.alert_id, item)
+        record_recipients(len(groups))
+        
+        channel_names = dict(NotificationDelivery.CHANNEL_CHOICES)
+        digests = []
+        with webhook_batching():
+            for (user_id, channel), grouped in groups.items():
+                group_items = list(grouped.values())
+                user = group_items[0].user
+                alerts = [item.alert for item in group_items]
+                contents = [render_alert(alert, user) for alert in alerts]
+                
+                strategy = NotificationStrategyFactory.get_strategy(channel_names[channel])
+                started = time.perf_counter()
+                try:
+                    result = strategy.send_digest(user, alerts, contents)
+                except Exception:
+                    logger.exception("Error sending digest to user %s", user_id)
+                    result = {'success': False}
+                record_send(channel_names[channel], time.perf_counter() - started, result['success'])
+                
+                status = NotificationDelivery.STATUS_SENT if result['success'] else NotificationDelivery.STATUS_FAILED
+                sent_at = result.get('sent_at')
+                # The digest is the delivery record of every alert it lists
+                digests.append(NotificationDigest(
+                    user_id=user_id,
+                    delivery_type=channel,
+                    status=status,
+                    alert_ids=[alert.id for alert in alerts],
+                    alert_count=len(alerts),
+                    reminder_alert_ids=[item.alert_id for item in group_items if item.is_reminder],
+                    sent_at=sent_at
+                ))
+            
+            # Written before the batched webhook posts go out, so a failed post finds its digest
+            NotificationDigest.objects.bulk_create(digests, batch_size=1000)
+        
+        return {
+            'items': len(items),
+            'digests': len(digests),
+            'failed': sum(1 for digest in digests if digest.status == NotificationDelivery.STATUS_FAILED)
+        }
+
+
+# ==================== Team Membership ====================
+
+class TeamMembershipService:
+    """Set-based team membership changes"""
+    
+    BATCH_SIZE = 1000
+    
+    def add_members(self, team, user_ids):
+        """Move users from any team (or none) into this team"""
+        database = router.db_for_write(User)
+        with transaction.atomic(using=database):
+            moved_ids = list(
+                User.objects.filter(id__in=user_ids, organization_id=team.organization_id)
+                .exclude(team=team)
+                .values_list('id', flat=True)
+            )
+            cleared = seeded = 0
+            if moved_ids:
+                User.objects.filter(id__in=moved_ids).update(team=team)
+                cleared = self._clear_lost_reminders(moved_ids, team)
+                seeded = self._seed_team_reminders(moved_ids, team)
+                self._invalidate(moved_ids, database)
+        
+        return {
+            'requested': len(user_ids),
+            'updated': len(moved_ids),
+            'reminders_cleared': cleared,
+            'reminders_scheduled': seeded
+        }
+    
+    def remove_members(self, team, user_ids):
+        """Take users out of this team"""
+        database = router.db_for_write(User)
+        with transaction.atomic(using=database):
+            removed_ids = list(
+                User.objects.filter(id__in=user_ids, team=team).values_list('id', flat=True)
+            )
+            cleared = 0
+            if removed_ids:
+                User.objects.filter(id__in=removed_ids).update(team=None)
+                cleared = self._clear_lost_reminders(removed_ids, None)
+                self._invalidate(removed_ids, database)
+        
+        return {
+            'requested': len(user_ids),
+            'updated': len(removed_ids),
+            'reminders_cleared': cleared,
+            'reminders_scheduled': 0
+        }
+    
+    def _clear_lost_reminders(self, user_ids, team):
+        """Stop reminders for Team alerts these users can no longer see"""
+        lost = UserAlertPreference.objects.filter(
+            user_id__in=user_ids,
+            alert__visibility_type='Team',
+            next_reminder_at__isnull=False
+        )
+        if team is not None:
+            lost = lost.exclude(alert__target_teams=team)
+        return lost.update(next_reminder_at=None)
+    
+    def _seed_team_reminders(self, user_ids, team):
+        """Make the team's live alerts due for new members, picked up by process_due_reminders"""
+        now = timezone.now()
+        alert_ids = list(
+            Alert.objects.filter(
+                visibility_type='Team',
+                target_teams=team,
+                is_active=True,
+                is_archived=False,
+                reminder_enabled=True,
+                start_time__lte=now,
+                expiry_time__gt=now
+            ).values_list('id', flat=True)
+        )
+        if not alert_ids:
+            return 0
+        
+        # Members returning to the team keep their read/snooze state
+        existing = UserAlertPreference.objects.filter(user_id__in=user_ids, alert_id__in=alert_ids)
+        seeded = existing.filter(next_reminder_at__isnull=True).update(next_reminder_at=now)
+        
+        have = set(existing.values_list('user_id', 'alert_id'))
+        UserAlertPreference.objects.bulk_create(
+            [
+                UserAlertPreference(user_id=user_id, alert_id=alert_id, next_reminder_at=now)
+                for alert_id in alert_ids
+                for user_id in user_ids
+                if (user_id, alert_id) not in have
+            ],
+            batch_size=self.BATCH_SIZE,
+            ignore_conflicts=True
+        )
+        return seeded + len(alert_ids) * len(user_ids) - len(have)
+    
+    def _invalidate(self, user_ids, database):
+        # Cached users carry team_id, and update() skips the post_save signal
+        transaction.on_commit(lambda: invalidate_cached_users(user_ids, database), using=database)
+
+
+# ==================== Alert Ingestion ====================
+
+class AlertIngestionService:
+    """Bulk alert creation and deduplicated event ingestion"""
+    
+    def create_alerts(self, alerts, targets):
+        """
+        Insert alerts and their (team_ids, user_ids) targets with bulk inserts.
+        Returns the alerts with primary keys set.
+        """
+        database = router.db_for_write(Alert)
+        with transaction.atomic(using=database):
+            if connections[database].features.can_return_rows_from_bulk_insert:
+                Alert.objects.using(database).bulk_create(alerts)
+            else:
+                # MySQL cannot return the new ids from a multi-row insert
+                for alert in alerts:
+                    alert.save(using=database)
+            
+            TeamThrough = Alert.target_teams.through
+            UserThrough = Alert.target_users.through
+            TeamThrough.objects.using(database).bulk_create([
+                TeamThrough(alert_id=alert.id, team_id=team_id)
+                for alert, (team_ids, _) in zip(alerts, targets)
+                for team_id in set(team_ids)
+            ])
+            UserThrough.objects.using(database).bulk_create([
+                UserThrough(alert_id=alert.id, user_id=user_id)
+                for alert, (_, user_ids) in zip(alerts, targets)
+                for user_id in set(user_ids)
+            ])
+        
+        return alerts
+    
+    def ingest(self, events, created_by):
+        """
+        Fold events into open alerts by dedup key.
+        Keys seen within EVENT_DEDUP_WINDOW_SECONDS bump the open alert's
+        occurrence_count; other keys open a new alert. Returns per-key
+        results and the newly created alerts (to be fanned out).
+        """
+        now = timezone.now()
+        window_start = now - timedelta(seconds=settings.EVENT_DEDUP_WINDOW_SECONDS)
+        organization_id = created_by.organization_id
+        database = router.db_for_write(Alert)
+        
+        # Repeats inside the batch coalesce first; the earliest event opens the alert
+        grouped = {}
+        for event in events:
+            event = dict(event)
+            key = event.pop('dedup_key')
+            if key in grouped:
+                grouped[key][1] += 1
+            else:
+                grouped[key] = [event, 1]
+        
+        with transaction.atomic(using=database):
+            # One indexed lookup on (organization, key) for the whole batch
+            open_alerts = dict(
+                AlertDedupKey.objects.filter(
+                    organization_id=organization_id,
+                    key__in=list(grouped),
+                    last_seen_at__gte=window_start,
+                    alert__is_active=True,
+                    alert__is_archived=False,
+                    alert__expiry_time__gt=now
+                ).values_list('key', 'alert_id')
+            )
+            
+            # One UPDATE per distinct repeat count rather than one per event
+            by_count = defaultdict(list)
+            for key, alert_id in open_alerts.items():
+                by_count[grouped[key][1]].append(alert_id)
+            for count, alert_ids in by_count.items():
+                Alert.objects.filter(id__in=alert_ids).update(
+                    occurrence_count=F('occurrence_count') + count,
+                    last_occurred_at=now,
+                    updated_at=now
+                )
+            
+            new_keys = [key for key in grouped if key not in open_alerts]
+            alerts = []
+            targets = []
+            for key in new_keys:
+                event, count = grouped[key]
+                targets.append((event.pop('target_teams', []), event.pop('target_users', [])))
+                event.setdefault('expiry_time', now + timedelta(hours=settings.EVENT_ALERT_TTL_HOURS))
+                alerts.append(Alert(
+                    created_by=created_by,
+                    occurrence_count=count,
+                    last_occurred_at=now,
+                    **event
+                ))
+            self.create_alerts(alerts, targets)
+            created = {key: alert.id for key, alert in zip(new_keys, alerts)}
+            
+            # Upsert the directory so the next repeat finds the open alert
+            upsert_target = {}
+            if connections[database].features.supports_update_conflicts_with_target:
+                upsert_target['unique_fields'] = ['organization', 'key']
+            AlertDedupKey.objects.using(database).bulk_create(
+                [
+                    AlertDedupKey(organization_id=organization_id, key=key, alert_id=alert_id, last_seen_at=now)
+                    for key, alert_id in {**open_alerts, **created}.items()
+                ],
+                update_conflicts=True,
+                update_fields=['alert', 'last_seen_at'],
+                **upsert_target
+            )
+        
+        return {
+            'received': len(events),
+            'created': len(created),
+            'coalesced': len(events) - len(created),
+            'alerts': [
+                {
+                    'dedup_key': key,
+                    'alert_id': created.get(key) or open_alerts[key],
+                    'created': key in created,
+                    'occurrences': grouped[key][1]
+                }
+                for key in grouped
+            ],
+            'created_alerts': alerts
+        }
@@ -0,0 +1,113 @@
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from .models import OrganizationShard
+from .routers import use_shard
+
+
+# ==================== Organization Shard Directory ====================
+
+DIRECTORY_CACHE_SECONDS = 300
+
+
+def _directory_key(organization_id):
+    return f'shard-directory:v3:{organization_id}'
+
+
+def shard_databases():
+    """All database aliases holding tenant data"""
+    return list(settings.SHARD_DATABASES)
+
+
+def directory_entry(organization_id):
+    """
+    (shard alias, is_moving) of an organization, by id.
+    Organizations missing from the directory predate sharding and live on default.
+    """
+    if not settings.SHARDING_ENABLED:
+        return 'default', False
+    
+    key = _directory_key(organization_id)
+    entry = cache.get(key)
+    if entry:
+        return entry
+    
+    row = OrganizationShard.objects.filter(
+        organization_id=organization_id
+    ).values_list('database', 'is_moving').first()
+    entry = tuple(row) if row else ('default', False)
+    cache.set(key, entry, DIRECTORY_CACHE_SECONDS)
+    return entry
+
+
+def find_organization(name):
+    """
+    (organization id, shard alias, is_moving) of an organization by name.
+    Names not in the directory get id None and a stable hash placement, which
+    registration records once the organization exists.
+    """
+    if not settings.SHARDING_ENABLED:
+        return None, 'default', False
+    
+    row = OrganizationShard.objects.filter(name__iexact=name).values_list('organization_id', 'database', 'is_moving').first()
+    if row:
+        return tuple(row)
+    
+    databases = shard_databases()
+    return None, databases[zlib.crc32(name.encode()) % len(databases)], False
+
+
+def shard_for_organization(organization_id):
+    """Resolve the shard alias for an organization"""
+    return directory_entry(organization_id)[0]
+
+
+def assign_organization(organization, alias):
+    """Point an organization at a shard, ending any move, and drop the cached directory entry"""
+    OrganizationShard.objects.update_or_create(
+        organization_id=organization.pk,
+        defaults={'name': organization.name, 'database': alias, 'is_moving': False}
+    )
+    cache.delete(_directory_key(organization.pk))
+
+
+def rename_organization(organization):
+    """Keep the directory's copy of the name in step with the organization row"""
+    OrganizationShard.objects.filter(organization_id=organization.pk).update(name=organization.name)
+
+
+def set_organization_moving(organization_id, moving):
+    """
+    Freeze (or thaw) an organization's writes and fan-out tasks. Processes with
+    a per-process cache only notice once their directory entry expires.
+    """
+    OrganizationShard.objects.filter(organization_id=organization_id).update(is_moving=moving)
+    cache.delete(_directory_key(organization_id))
+
+
+def for_each_shard(func, *args, **kwargs):
+    """
+    Run func once per shard in parallel, each inside use_shard(alias).
+    Returns a dict of alias -> result.
+    """
+    databases = shard_databases()
+    
+    def run(alias):
+        try:
+            with use_shard(alias):
+                return func(*args, **kwargs)
+        finally:
+            # Worker threads own their connections
+            connections.close_all()
+    
+    if len(databases) == 1:
+        with use_shard(databases[0]):
+            return {databases[0]: func(*args, **kwargs)}
+    
+    with ThreadPoolExecutor(max_workers=len(databases)) as executor:
+        futures = {alias: executor.submit(run, alias) for alias in databases}
+        return {alias: future.result() for alias, future in futures.items()}
@@ -0,0 +1,28 @@
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+from .models import Organization, User
+from .search import repair_search_index
+from .sharding import rename_organization
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, using, **kwargs):
+    """Drop the cached authentication record when a user changes"""
+    invalidate_cached_user(instance.pk, using)
+
+
+@receiver(post_save, sender=Organization)
+def sync_directory_name(sender, instance, created, **kwargs):
+    """A renamed organization keeps its shard directory entry, which is keyed by id"""
+    if not created:
+        rename_organization(instance)
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    """Put back the SQLite search triggers after a migration rebuilt the alerts table"""
+    if sender.name == 'alerts':
+        repair_search_index(connections[using])
@@ -1,23 +1,120 @@
-from celery import shared_task
+import logging
+import time
+from collections import Counter, defaultdict
+from celery import shared_task, group
+from celery.utils import uuid
+from django.conf import settings
 from django.utils import timezone
-from .models import UserAlertPreference
+from .models import UserAlertPreference, WebhookEndpoint
+from .locks import single_instance
+from .metrics import record_send, track_task_run
+from .routers import use_shard
 from .services import NotificationService
+from .sharding import directory_entry, shard_databases
+from .webhooks import WebhookError, mark_failed, post_webhook
+
+
+logger = logging.getLogger(__name__)
+
+# How long an organization's fan-out task waits before retrying during a move
+MOVE_REQUEUE_SECONDS = 30
+
+
+def dispatch_per_shard(task, database, **kwargs):
+    """
+    When sharding is enabled and no shard was given, run the task once per
+    shard in parallel so one large tenant cannot hold up the others.
+    Returns True if the work was dispatched.
+    """
+    if database is not None or not settings.SHARDING_ENABLED:
+        return False
+    
+    group(task.s(database=alias, **kwargs) for alias in shard_databases()).apply_async()
+    return True
+
+
+def queue_for_severity(severity):
+    """Celery queue that carries fan-out work for alerts of this severity"""
+    return settings.ALERT_SEVERITY_QUEUES.get(severity, settings.CELERY_TASK_DEFAULT_QUEUE)
+
+
+def plan_dispatch(alerts):
+    """
+    Fan-out tasks for the alerts: one per severity (and organization) on that
+    severity's queue, with task ids chosen up front so callers can report them.
+    """
+    alert_ids = defaultdict(list)
+    for alert in alerts:
+        alert_ids[alert.severity, alert.created_by.organization_id].append(alert.id)
+    
+    return [
+        {'task_id': uuid(), 'queue': queue_for_severity(severity), 'organization': organization, 'alert_ids': ids}
+        for (severity, organization), ids in alert_ids.items()
+    ]
+
+
+def dispatch_alerts(alerts, is_reminder=False, database=None, plan=None):
+    """
+    Fan out alerts in the background, so Critical work never waits behind Info work.
+    `plan` is the result of plan_dispatch(alerts) when the caller made it earlier.
+    """
+    for task in plan or plan_dispatch(alerts):
+        send_alerts_task.apply_async(
+            args=[task['alert_ids']],
+            kwargs={'is_reminder': is_reminder, 'database': database, 'organization': task['organization']},
+            queue=task['queue'],
+            task_id=task['task_id']
+        )
+
+
+def organization_shard(task, organization, database):
+    """
+    (shard alias, requeued) for an organization's fan-out task. The directory
+    wins over the alias the task was queued with, which is stale once the
+    organization has moved. While it is being moved the task is queued again
+    for later instead, so nothing is written to rows that are being copied.
+    """
+    if organization is None or not settings.SHARDING_ENABLED:
+        return database, False
+    
+    alias, moving = directory_entry(organization)
+    if not moving:
+        return alias, False
+    
+    delivery_info = task.request.delivery_info or {}
+    task.apply_async(
+        args=task.request.args,
+        kwargs=task.request.kwargs,
+        countdown=MOVE_REQUEUE_SECONDS,
+        queue=delivery_info.get('routing_key'),
+        retries=task.request.retries
+    )
+    logger.info("%s for organization %s requeued while it is moved", task.name, organization)
+    return alias, True
 
 
 @shared_task
-def process_reminders():
+@single_instance
+def process_reminders(database=None):
     """
-    Celery task to process reminders every 2 hours
+    Celery task to schedule missing reminders every 2 hours
+    Sending is left to process_due_reminders, which spreads it over the period
     This is scheduled in settings.py CELERY_BEAT_SCHEDULE
     """
-    print("=== Running reminder processing task ===")
+    if dispatch_per_shard(process_reminders, database):
+        return {'success': True, 'dispatched': shard_databases()}
     
     notification_service = NotificationService()
-    results = notification_service.process_reminders()
+    with track_task_run('process_reminders', database) as run, use_shard(database):
+        results = notification_service.process_reminders()
+        run.counts['alerts'] = len(results)
+        run.counts['scheduled'] = sum(result['scheduled'] for result in results)
     
-    print(f"Processed {len(results)} alerts")
     for result in results:
-        print(f"Alert: {result['alert_title']} - Sent: {result.get('sent', 0)}, Snoozed: {result.get('snoozed', 0)}")
+        logger.debug(
+            "Alert: %s - Recipients: %d, Scheduled: %d",
+            result['alert_title'], result['recipients'], result['scheduled']
+        )
     
     return {
         'success': True,
@@ -27,30 +124,96 @@ def process_reminders():
 
 
 @shared_task
-def reset_expired_snoozes():
+@single_instance
+def process_due_reminders(limit=None, database=None):
     """
-    Celery task to reset expired snoozes at midnight
+    Celery task to send reminders that are due, including snooze wake-ups
+    Runs every minute and only reads rows from the next_reminder_at index
     This is scheduled in settings.py CELERY_BEAT_SCHEDULE
     """
-    print("=== Running snooze reset task ===")
+    if dispatch_per_shard(process_due_reminders, database, limit=limit):
+        return {'success': True, 'dispatched': shard_databases()}
     
-    now = timezone.now()
+    notification_service = NotificationService()
+    limit = limit or settings.DUE_REMINDER_BATCH_SIZE
+    totals = Counter()
+    with track_task_run('process_due_reminders', database) as run, use_shard(database):
+        # A backlog larger than one batch is drained in further batches, up to the cap
+        for _ in range(settings.DUE_REMINDER_MAX_BATCHES):
+            result = notification_service.process_due_reminders(limit=limit)
+            totals.update(result)
+            totals['batches'] += 1
+            if result['due'] < limit:
+                break
+        run.counts['cleared'] = totals['cleared']
     
-    # Find all preferences where snooze has expired
-    expired_snoozes = UserAlertPreference.objects.filter(
-        is_snoozed=True,
-        snooze_until__lt=now
-    )
+    return {
+        'success': True,
+        **totals
+    }
+
+
+@shared_task
+@single_instance
+def flush_digests(limit=None, database=None):
+    """
+    Celery task to send digests whose window has closed
+    One notification per user and channel, however many alerts were buffered
+    This is scheduled in settings.py CELERY_BEAT_SCHEDULE
+    """
+    if dispatch_per_shard(flush_digests, database, limit=limit):
+        return {'success': True, 'dispatched': shard_databases()}
     
-    count = expired_snoozes.count()
+    notification_service = NotificationService()
+    with track_task_run('flush_digests', database) as run, use_shard(database):
+        result = notification_service.flush_digests(
+            limit=limit or settings.DIGEST_FLUSH_BATCH_SIZE
+        )
+        run.counts['items'] = result['items']
     
-    # Reset them
-    expired_snoozes.update(
-        is_snoozed=False,
-        snooze_until=None
-    )
+    return {
+        'success': True,
+        **result
+    }
+
+
+@shared_task
+@single_instance
+def reset_expired_snoozes(batch_size=None, max_batches=None, database=None):
+    """
+    Celery task to clear stale snooze_until values in small batches
+    Snooze state is derived from snooze_until, so this is housekeeping only;
+    it runs frequently and never rewrites more than a few batches at once.
+    This is scheduled in settings.py CELERY_BEAT_SCHEDULE
+    """
+    if dispatch_per_shard(reset_expired_snoozes, database,
+                          batch_size=batch_size, max_batches=max_batches):
+        return {'success': True, 'dispatched': shard_databases()}
+    
+    batch_size = batch_size or settings.SNOOZE_CLEANUP_BATCH_SIZE
+    max_batches = max_batches or settings.SNOOZE_CLEANUP_MAX_BATCHES
+    now = timezone.now()
     
-    print(f"Reset {count} expired snoozes")
+    count = 0
+    with track_task_run('reset_expired_snoozes', database) as run, use_shard(database):
+        for _ in range(max_batches):
+            # Walk the snooze_until index from the oldest expired snooze
+            ids = list(
+                UserAlertPreference.objects.filter(snooze_until__lte=now)
+                .order_by('snooze_until')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            
+            count += UserAlertPreference.objects.filter(
+                id__in=ids,
+                snooze_until__lte=now
+            ).update(snooze_until=None)
+            
+            if len(ids) < batch_size:
+                break
+        run.counts['reset'] = count
     
     return {
         'success': True,
@@ -58,12 +221,89 @@ def reset_expired_snoozes():
     }
 
 
-@shared_task
-def send_alert_task(alert_id, is_reminder=False):
+@shared_task(bind=True)
+def send_alerts_task(self, alert_ids, is_reminder=False, database=None, organization=None):
+    """
+    Celery task to fan out a batch of alerts, e.g. from the bulk create endpoint
+    Recipients are resolved once per distinct audience in the batch
+    """
+    database, requeued = organization_shard(self, organization, database)
+    if requeued:
+        return {'success': False, 'reason': 'Organization is being moved; requeued'}
+    
+    notification_service = NotificationService()
+    with track_task_run('send_alerts_task', database) as run, use_shard(database):
+        result = notification_service.send_alerts(alert_ids, is_reminder)
+        run.counts['alerts'] = result['alerts']
+        run.counts['audiences'] = result['audiences']
+    
+    return {
+        'success': True,
+        **result
+    }
+
+
+@shared_task(bind=True)
+def send_alert_task(self, alert_id, is_reminder=False, database=None, organization=None):
     """
     Celery task to send alert asynchronously
-    Can be called manually or scheduled
+    Can be called manually or scheduled; pass the alert's shard (or organization) when sharded
     """
+    database, requeued = organization_shard(self, organization, database)
+    if requeued:
+        return {'success': False, 'reason': 'Organization is being moved; requeued'}
+    
     notification_service = NotificationService()
-    result = notification_service.send_alert(alert_id, is_reminder)
-    return result
\ No newline at end of file
+    with track_task_run('send_alert_task', database), use_shard(database):
+        result = notification_service.send_alert(alert_id, is_reminder)
+    return result
+
+
+@shared_task(bind=True)
+def deliver_webhook(self, endpoint_id, payload_id, deliveries, database=None, organization=None):
+    """
+    Celery task to POST one batch of webhook deliveries
+    Failures are retried with exponential backoff by re-queueing the task, so a
+    slow or broken endpoint never holds up fan-out or other endpoints; once the
+    retries run out the batch's delivery rows are marked failed
+    """
+    database, requeued = organization_shard(self, organization, database)
+    if requeued:
+        return {'success': False, 'reason': 'Organization is being moved; requeued'}
+    
+    retry = None
+    with track_task_run('deliver_webhook', database) as run, use_shard(database):
+        endpoint = WebhookEndpoint.objects.filter(id=endpoint_id, is_active=True).first()
+        if endpoint is None:
+            return {'success': False, 'reason': 'Endpoint not found or inactive'}
+        
+        run.counts['deliveries'] = len(deliveries)
+        attempt = self.request.retries + 1
+        started = time.perf_counter()
+        try:
+            status = post_webhook(endpoint, payload_id, deliveries, attempt)
+        except WebhookError as exc:
+            record_send('Webhook', time.perf_counter() - started, success=False)
+            if not exc.retryable or self.request.retries >= settings.WEBHOOK_MAX_RETRIES:
+                failed = mark_failed(deliveries, f'Webhook {endpoint.name}: {exc}')
+                logger.error("Webhook %s gave up after %d attempts: %s", endpoint_id, attempt, exc)
+                return {'success': False, 'error': str(exc), 'failed': failed}
+            retry = exc
+        else:
+            record_send('Webhook', time.perf_counter() - started)
+    
+    # Raised outside the run so the failed attempt is still recorded
+    if retry is not None:
+        logger.warning("Webhook %s attempt %d failed (%s); retrying", endpoint_id, attempt, retry)
+        raise self.retry(
+            exc=retry,
+            countdown=settings.WEBHOOK_RETRY_BACKOFF_SECONDS * 2 ** self.request.retries,
+            max_retries=settings.WEBHOOK_MAX_RETRIES
+        )
+    
+    return {
+        'success': True,
+        'status': status,
+        'deliveries': len(deliveries),
+        'attempt': attempt
+    }
@@ -0,0 +1,116 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+
+# A recipient's rendered alert
+Message = namedtuple('Message', ['title', 'message'])
+
+# {{ user.name }}, {{ team.name }}, {{ fields.service }}, ...
+VARIABLE = re.compile(r'\{\{\s*([\w.]+)\s*\}\}')
+
+USER_VARIABLES = {
+    'user.name': lambda user: user.get_full_name() or user.username,
+    'user.first_name': lambda user: user.first_name,
+    'user.last_name': lambda user: user.last_name,
+    'user.username': lambda user: user.username,
+    'user.email': lambda user: user.email,
+    'team.name': lambda user: user.team.name if user.team_id else '',
+    'organization.name': lambda user: user.organization.name if user.organization_id else '',
+}
+
+# Relations a variable reads, for select_related() on the recipients
+VARIABLE_RELATIONS = {'team.name': 'team', 'organization.name': 'organization'}
+
+# Distinct renders kept per template before its cache starts over
+RENDER_CACHE_SIZE = 10000
+
+
+def is_variable(name):
+    return name in USER_VARIABLES or (name.startswith('fields.') and len(name) > len('fields.'))
+
+
+def unknown_variables(text):
+    """Names between {{ }} in `text` that are not template variables"""
+    return [name for name in VARIABLE.findall(text) if not is_variable(name)]
+
+
+class MessageTemplate:
+    """
+    An alert's title and message compiled once into format strings. Renders are
+    cached by the values of the variables the template actually uses, so
+    recipients who share them (e.g. a team, for "{{ team.name }}") share one render.
+    Text without variables renders as-is; unknown {{ names }} are left literal.
+    """
+    
+    def __init__(self, title, message):
+        self.title = title
+        self.message = message
+        self.variables = []
+        self.title_format = self._compile(title)
+        self.message_format = self._compile(message)
+        self.variables = tuple(self.variables)
+        self.static = not self.variables
+        self.relations = {VARIABLE_RELATIONS[name] for name in self.variables if name in VARIABLE_RELATIONS}
+        self._rendered = {}
+    
+    def _compile(self, text):
+        parts = []
+        position = 0
+        for match in VARIABLE.finditer(text):
+            name = match.group(1)
+            if not is_variable(name):
+                continue
+            if name not in self.variables:
+                self.variables.append(name)
+            parts.append(self._escape(text[position:match.start()]))
+            parts.append(f'{{{self.variables.index(name)}}}')
+            position = match.end()
+        parts.append(self._escape(text[position:]))
+        return ''.join(parts)
+    
+    @staticmethod
+    def _escape(literal):
+        return literal.replace('{', '{{').replace('}', '}}')
+    
+    def _value(self, name, user, fields):
+        if name in USER_VARIABLES:
+            return USER_VARIABLES[name](user)
+        value = fields.get(name[len('fields.'):], '') if fields else ''
+        return '' if value is None else str(value)
+    
+    def render(self, user, fields=None):
+        """The Message for one recipient; `fields` are the alert's custom template fields"""
+        if self.static:
+            return Message(self.title, self.message)
+        
+        values = tuple(self._value(name, user, fields) for name in self.variables)
+        rendered = self._rendered.get(values)
+        if rendered is None:
+            if len(self._rendered) >= RENDER_CACHE_SIZE:
+                self._rendered.clear()
+            rendered = self._rendered[values] = Message(
+                self.title_format.format(*values),
+                self.message_format.format(*values)
+            )
+        return rendered
+    
+    def render_many(self, users, fields=None):
+        """Messages for `users`, in order"""
+        if self.static:
+            return [Message(self.title, self.message)] * len(users)
+        return [self.render(user, fields) for user in users]
+
+
+@lru_cache(maxsize=1024)
+def compile_message(title, message):
+    """The compiled template of a title/message pair, shared by every alert using it"""
+    return MessageTemplate(title, message)
+
+
+def alert_template(alert):
+    return compile_message(alert.title, alert.message)
+
+
+def render_alert(alert, user):
+    return alert_template(alert).render(user, alert.template_fields)
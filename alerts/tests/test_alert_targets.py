@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from alerts.models import Alert, Organization, Team, User
+
+
+@override_settings(ALERT_TARGET_PREVIEW=3)
+class AlertTargetPreviewTests(TestCase):
+    """Alert details carry bounded target ids; writes still take the full lists"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name='acme')
+        cls.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=organization)
+        cls.teams = [Team.objects.create(name=f'team-{i}', organization=organization) for i in range(5)]
+        cls.users = [
+            User.objects.create_user(f'user{i}', f'user{i}@acme.test', 'password', organization=organization)
+            for i in range(5)
+        ]
+        cls.alert = Alert.objects.create(
+            title='Disk full', message='Clean up', visibility_type='Team', created_by=cls.admin,
+            expiry_time=timezone.now() + timedelta(days=1)
+        )
+        cls.alert.target_teams.set(cls.teams)
+        cls.alert.target_users.set(cls.users)
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def test_detail_returns_the_first_ids_next_to_the_names(self):
+        data = self.client.get(f'/api/admin/alerts/{self.alert.id}/').json()
+        
+        self.assertEqual(data['target_teams'], [team.id for team in self.teams[:3]])
+        self.assertEqual(data['target_teams_names'], ['team-0', 'team-1', 'team-2'])
+        self.assertEqual(data['target_teams_count'], 5)
+        self.assertEqual(data['target_users'], [user.id for user in self.users[:3]])
+        self.assertEqual(data['target_users_count'], 5)
+    
+    def test_detail_query_count_does_not_grow_with_targets(self):
+        with self.assertNumQueries(7):
+            self.client.get(f'/api/admin/alerts/{self.alert.id}/')
+        
+        self.alert.target_users.add(*[
+            User.objects.create_user(f'extra{i}', f'extra{i}@acme.test', 'password') for i in range(20)
+        ])
+        with self.assertNumQueries(7):
+            response = self.client.get(f'/api/admin/alerts/{self.alert.id}/')
+        self.assertEqual(len(response.json()['target_users']), 3)
+    
+    def test_update_replaces_the_full_target_list(self):
+        ids = [user.id for user in self.users[1:]]
+        response = self.client.patch(f'/api/admin/alerts/{self.alert.id}/', {'target_users': ids}, format='json')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(self.alert.target_users.values_list('id', flat=True)), ids)
+        self.assertEqual(response.json()['target_users'], ids[:3])
+    
+    def test_unknown_target_ids_are_rejected(self):
+        response = self.client.patch(f'/api/admin/alerts/{self.alert.id}/', {'target_teams': [999999]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('target_teams', response.json())
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from alerts.authentication import _user_cache_key, tokens_for_user
+from alerts.models import Organization, Team, User
+from alerts.services import TeamMembershipService
+
+
+class CachedUserInvalidationTests(TestCase):
+    """Authentication reads users from the cache, so every change must drop the entry"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='acme')
+        cls.team = Team.objects.create(name='ops', organization=cls.organization)
+        cls.user = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=cls.organization)
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_for_user(self.user).access_token}')
+        self.key = _user_cache_key('default', self.user.id)
+        
+        # The first request fills the cache
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 200)
+        self.assertEqual(cache.get(self.key)['is_active'], True)
+    
+    def test_deactivated_user_is_rejected_on_the_next_request(self):
+        self.user.is_active = False
+        self.user.save()
+        
+        self.assertIsNone(cache.get(self.key))
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 401)
+    
+    def test_role_change_applies_on_the_next_request(self):
+        self.assertEqual(self.client.get('/api/admin/alerts/').status_code, 200)
+        
+        self.user.role = 'user'
+        self.user.save()
+        self.assertEqual(self.client.get('/api/admin/alerts/').status_code, 403)
+    
+    def test_deleted_user_is_rejected(self):
+        self.user.delete()
+        
+        self.assertIsNone(cache.get(self.key))
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 401)
+    
+    def test_bulk_membership_changes_drop_cached_users(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            TeamMembershipService().add_members(self.team, [self.user.id])
+        self.assertIsNone(cache.get(self.key))
+        
+        self.client.get('/api/auth/me/')
+        self.assertEqual(cache.get(self.key)['team_id'], self.team.id)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            TeamMembershipService().remove_members(self.team, [self.user.id])
+        self.assertIsNone(cache.get(self.key))
+        
+        self.client.get('/api/auth/me/')
+        self.assertIsNone(cache.get(self.key)['team_id'])
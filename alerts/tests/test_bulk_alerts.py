@@ -0,0 +1,98 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from alerts.models import Alert, NotificationDelivery, Organization, Team, User
+from alerts.services import NotificationService
+
+
+class BulkAlertCreateTests(TestCase):
+    """POST /api/admin/alerts/bulk/ inserts a batch at once and fans it out per audience"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='acme')
+        cls.team = Team.objects.create(name='ops', organization=cls.organization)
+        cls.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=cls.organization)
+        cls.users = [
+            User.objects.create_user(f'user-{i}', f'user-{i}@acme.test', 'password', organization=cls.organization, team=cls.team)
+            for i in range(3)
+        ]
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def item(self, title, **fields):
+        return {
+            'title': title, 'message': 'Details', 'visibility_type': 'Organization',
+            'target_organization': 'acme',
+            'expiry_time': (timezone.now() + timedelta(hours=1)).isoformat(),
+            **fields
+        }
+    
+    def post(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/admin/alerts/bulk/', {'alerts': items}, format='json')
+    
+    def test_batch_is_inserted_with_its_targets(self):
+        response = self.post([
+            self.item('Org wide'),
+            self.item('Team', visibility_type='Team', target_organization=None, target_teams=[self.team.id]),
+            self.item('Direct', visibility_type='User', target_organization=None,
+                      target_users=[self.users[0].id, self.users[1].id, self.users[0].id]),
+        ])
+        
+        self.assertEqual(response.status_code, 201)
+        ids = response.json()['data']['ids']
+        self.assertEqual(len(ids), 3)
+        alerts = {alert.title: alert for alert in Alert.objects.filter(id__in=ids)}
+        self.assertEqual(set(alerts), {'Org wide', 'Team', 'Direct'})
+        self.assertEqual(list(alerts['Team'].target_teams.all()), [self.team])
+        # Repeated ids make one through row
+        self.assertEqual(set(alerts['Direct'].target_users.all()), set(self.users[:2]))
+        self.assertTrue(all(alert.created_by == self.admin for alert in alerts.values()))
+    
+    def test_item_errors_reject_the_whole_batch(self):
+        organizations = Organization.objects.count()
+        response = self.post([
+            self.item('Fine'),
+            self.item('Bad expiry', expiry_time=(timezone.now() - timedelta(hours=1)).isoformat()),
+            self.item('Unknown tenant', target_organization='acme-typo'),
+        ])
+        
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['alerts']
+        self.assertEqual(errors[0], {})
+        self.assertIn('non_field_errors', errors[1])
+        self.assertIn('target_organization', errors[2])
+        self.assertFalse(Alert.objects.exists())
+        self.assertEqual(Organization.objects.count(), organizations)
+    
+    def test_unknown_targets_are_reported_for_the_batch(self):
+        response = self.post([
+            self.item('Team', visibility_type='Team', target_organization=None, target_teams=[self.team.id, 999999]),
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('999999', str(response.json()['target_teams']))
+        self.assertFalse(Alert.objects.exists())
+    
+    def test_alerts_sharing_an_audience_resolve_it_once(self):
+        with mock.patch.object(
+            NotificationService, 'get_target_users', autospec=True, side_effect=NotificationService.get_target_users
+        ) as get_target_users:
+            response = self.post([
+                self.item('First'),
+                self.item('Second'),
+                self.item('Third'),
+                self.item('Team', visibility_type='Team', target_organization=None, target_teams=[self.team.id]),
+            ])
+        
+        self.assertEqual(response.status_code, 201)
+        # Two audiences: the organization and the team
+        self.assertEqual(get_target_users.call_count, 2)
+        # Every alert still reaches each recipient once: 3 x 4 organization members, 1 x 3 team members
+        self.assertEqual(NotificationDelivery.objects.count(), 3 * 4 + 3)
@@ -0,0 +1,175 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from alerts.models import (
+    Alert, DigestItem, NotificationDelivery, NotificationDigest, Organization, User, UserAlertPreference
+)
+from alerts.services import EmailNotificationStrategy, NotificationService
+
+EMAIL = NotificationDelivery.CHANNEL_CODES['Email']
+
+
+# Analytics read from the replica, which cannot see rows inside a test transaction
+@override_settings(REPLICA_DATABASES=[])
+class FlushDigestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name='acme')
+        cls.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=organization)
+        cls.users = [
+            User.objects.create_user(f'user-{i}', f'user-{i}@acme.test', 'password', organization=organization)
+            for i in range(2)
+        ]
+        cls.alerts = [
+            Alert.objects.create(
+                title=f'Alert {i}', message='Details', severity='Info', delivery_type='Email',
+                visibility_type='Organization', target_organization=organization, created_by=cls.admin,
+                expiry_time=timezone.now() + timedelta(days=1)
+            )
+            for i in range(3)
+        ]
+    
+    def buffer(self, user, alerts, due_at):
+        DigestItem.objects.bulk_create(
+            DigestItem(user=user, alert=alert, delivery_type=EMAIL, due_at=due_at) for alert in alerts
+        )
+    
+    def test_batch_is_cut_on_user_window_boundaries(self):
+        due_at = timezone.now() - timedelta(minutes=1)
+        self.buffer(self.users[0], self.alerts, due_at)
+        self.buffer(self.users[1], self.alerts, due_at)
+        
+        # The limit falls inside the first user's window, which is still sent whole
+        result = NotificationService().flush_digests(limit=2)
+        self.assertEqual(result, {'items': 3, 'digests': 1, 'failed': 0})
+        self.assertEqual(DigestItem.objects.filter(user=self.users[0]).count(), 0)
+        self.assertEqual(DigestItem.objects.filter(user=self.users[1]).count(), 3)
+        
+        digest = NotificationDigest.objects.get()
+        self.assertEqual(digest.user, self.users[0])
+        self.assertEqual(sorted(digest.alert_ids), [alert.id for alert in self.alerts])
+    
+    def test_open_windows_are_left_alone(self):
+        self.buffer(self.users[0], self.alerts, timezone.now() + timedelta(minutes=1))
+        result = NotificationService().flush_digests()
+        self.assertEqual(result['items'], 0)
+        self.assertEqual(DigestItem.objects.count(), 3)
+    
+    def test_items_are_claimed_before_sending(self):
+        self.buffer(self.users[0], self.alerts, timezone.now() - timedelta(minutes=1))
+        
+        def send_digest(strategy, user, alerts, contents):
+            # A second run while this one is still sending finds nothing to send
+            self.assertEqual(DigestItem.objects.count(), 0)
+            return {'success': True, 'channel': 'Email', 'sent_at': timezone.now()}
+        
+        with mock.patch.object(EmailNotificationStrategy, 'send_digest', send_digest):
+            NotificationService().flush_digests()
+        self.assertEqual(NotificationDigest.objects.count(), 1)
+    
+    def test_digest_is_the_delivery_record(self):
+        user = self.users[0]
+        self.buffer(user, self.alerts, timezone.now() - timedelta(minutes=1))
+        NotificationService().flush_digests()
+        
+        self.assertFalse(NotificationDelivery.objects.exists())
+        client = APIClient()
+        client.force_authenticate(user)
+        for _ in range(2):
+            client.put(f'/api/user/alerts/{self.alerts[0].id}/mark_read/')
+        
+        digest = NotificationDigest.objects.get()
+        self.assertEqual((digest.read_alert_ids, digest.read_count), ([self.alerts[0].id], 1))
+        
+        client.force_authenticate(self.admin)
+        overview = client.get('/api/analytics/').json()['data']['overview']
+        self.assertEqual((overview['totalDelivered'], overview['totalRead']), (3, 1))
+        metrics = client.get(f'/api/analytics/alerts/{self.alerts[0].id}/').json()['data']['metrics']
+        self.assertEqual((metrics['totalDeliveries'], metrics['readCount']), (1, 1))
+        metrics = client.get(f'/api/analytics/alerts/{self.alerts[1].id}/').json()['data']['metrics']
+        self.assertEqual((metrics['totalDeliveries'], metrics['readCount']), (1, 0))
+    
+    def test_failed_digest_is_not_counted_as_delivered(self):
+        self.buffer(self.users[0], self.alerts[:2], timezone.now() - timedelta(minutes=1))
+        
+        with self.assertLogs('alerts.services', 'ERROR'), \
+                mock.patch.object(EmailNotificationStrategy, 'send_digest', side_effect=RuntimeError('smtp down')):
+            result = NotificationService().flush_digests()
+        
+        self.assertEqual(result['failed'], 1)
+        self.assertEqual(NotificationDigest.objects.get().status, NotificationDelivery.STATUS_FAILED)
+        self.assertFalse(NotificationDelivery.objects.exists())
+        self.assertEqual(DigestItem.objects.count(), 0)
+        
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        data = client.get(f'/api/analytics/alerts/{self.alerts[0].id}/').json()['data']
+        self.assertEqual(data['metrics']['totalDeliveries'], 0)
+        self.assertEqual(data['statusBreakdown'], [{'status': 'failed', 'count': 1}])
+
+
+@override_settings(DIGEST_RULES={'Email': ['Info']})
+class DigestFanOutTests(TestCase):
+    """An alert storm reaches each recipient as one digest"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='acme')
+        cls.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=cls.organization)
+        for i in range(3):
+            User.objects.create_user(f'user-{i}', f'user-{i}@acme.test', 'password', organization=cls.organization)
+    
+    def create_alerts(self, count):
+        return [
+            Alert.objects.create(
+                title=f'Alert {i}', message='Details', severity='Info', delivery_type='Email',
+                visibility_type='Organization', target_organization=self.organization, created_by=self.admin,
+                expiry_time=timezone.now() + timedelta(days=1)
+            )
+            for i in range(count)
+        ]
+    
+    def test_storm_sends_one_digest_per_user(self):
+        alerts = self.create_alerts(5)
+        users = User.objects.filter(organization=self.organization).count()
+        
+        result = NotificationService().send_alerts([alert.id for alert in alerts])
+        self.assertEqual((result['sent'], result['audiences']), (5 * users, 1))
+        self.assertEqual(DigestItem.objects.count(), 5 * users)
+        self.assertEqual(
+            UserAlertPreference.objects.filter(next_reminder_at__isnull=False, last_reminder_sent_at__isnull=False).count(),
+            5 * users
+        )
+        
+        DigestItem.objects.update(due_at=timezone.now() - timedelta(seconds=1))
+        with mock.patch.object(
+            EmailNotificationStrategy, 'send_digest', autospec=True, side_effect=EmailNotificationStrategy.send_digest
+        ) as send_digest, mock.patch.object(EmailNotificationStrategy, 'send', autospec=True) as send:
+            result = NotificationService().flush_digests()
+        
+        self.assertEqual(result, {'items': 5 * users, 'digests': users, 'failed': 0})
+        self.assertEqual(send_digest.call_count, users)
+        send.assert_not_called()
+        self.assertEqual(NotificationDigest.objects.count(), users)
+        self.assertFalse(NotificationDelivery.objects.exists())
+    
+    def test_buffering_queries_do_not_grow_with_recipients(self):
+        service = NotificationService()
+        alert, = self.create_alerts(1)
+        users = list(User.objects.filter(organization=self.organization))
+        with CaptureQueriesContext(connection) as few:
+            service.buffer_digest(alert, users[:1])
+        
+        alert, = self.create_alerts(1)
+        UserAlertPreference.objects.create(user=users[0], alert=alert)
+        with CaptureQueriesContext(connection) as many:
+            service.buffer_digest(alert, users)
+        
+        self.assertEqual(len(many), len(few) + 1)
+        self.assertEqual(DigestItem.objects.filter(alert=alert).count(), len(users))
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from alerts.models import Alert, AlertDedupKey, Organization, User
+
+
+@override_settings(EVENT_DEDUP_WINDOW_SECONDS=900)
+class EventIngestionTests(TestCase):
+    """POST /api/events/ folds repeats of a dedup_key into the open alert"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='acme')
+        cls.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=cls.organization)
+        cls.other_organization = Organization.objects.create(name='globex')
+        cls.other_admin = User.objects.create_user(
+            'globex-admin', 'admin@globex.test', 'password', role='admin', organization=cls.other_organization
+        )
+    
+    def ingest(self, *keys, user=None):
+        client = APIClient()
+        client.force_authenticate(user or self.admin)
+        events = [
+            {'dedup_key': key, 'title': f'{key} firing', 'message': 'Check the dashboard',
+             'visibility_type': 'Organization', 'target_organization': (user or self.admin).organization.name}
+            for key in keys
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/events/', {'events': events}, format='json')
+        self.assertEqual(response.status_code, 202, response.data)
+        return response.json()['data']
+    
+    def test_duplicates_in_a_batch_fold_into_one_alert(self):
+        data = self.ingest('disk', 'disk', 'cpu', 'disk')
+        
+        self.assertEqual((data['received'], data['created'], data['coalesced']), (4, 2, 2))
+        self.assertEqual(Alert.objects.count(), 2)
+        disk = Alert.objects.get(title='disk firing')
+        self.assertEqual(disk.occurrence_count, 3)
+        self.assertEqual(
+            {item['dedup_key']: item['occurrences'] for item in data['alerts']}, {'disk': 3, 'cpu': 1}
+        )
+    
+    def test_repeats_within_the_window_coalesce(self):
+        first = self.ingest('disk')['alerts'][0]
+        data = self.ingest('disk', 'disk')
+        
+        self.assertEqual(data['created'], 0)
+        self.assertEqual(data['alerts'][0]['alert_id'], first['alert_id'])
+        self.assertFalse(data['alerts'][0]['created'])
+        self.assertEqual(Alert.objects.get().occurrence_count, 3)
+    
+    def test_a_new_alert_opens_once_the_window_has_passed(self):
+        first = self.ingest('disk')['alerts'][0]['alert_id']
+        AlertDedupKey.objects.update(last_seen_at=timezone.now() - timedelta(seconds=901))
+        
+        item = self.ingest('disk')['alerts'][0]
+        
+        self.assertTrue(item['created'])
+        self.assertNotEqual(item['alert_id'], first)
+        self.assertEqual(Alert.objects.get(id=first).occurrence_count, 1)
+        # The directory now points repeats at the new alert
+        key = AlertDedupKey.objects.get()
+        self.assertEqual(key.alert_id, item['alert_id'])
+        self.assertGreater(key.last_seen_at, timezone.now() - timedelta(seconds=60))
+        self.assertEqual(self.ingest('disk')['alerts'][0]['alert_id'], item['alert_id'])
+    
+    def test_a_closed_alert_is_not_reopened(self):
+        first = self.ingest('disk')['alerts'][0]['alert_id']
+        Alert.objects.filter(id=first).update(is_archived=True)
+        
+        item = self.ingest('disk')['alerts'][0]
+        self.assertTrue(item['created'])
+        self.assertEqual(AlertDedupKey.objects.get().alert_id, item['alert_id'])
+    
+    def test_keys_are_scoped_to_the_organization(self):
+        ours = self.ingest('disk')['alerts'][0]
+        theirs = self.ingest('disk', user=self.other_admin)['alerts'][0]
+        
+        self.assertTrue(theirs['created'])
+        self.assertNotEqual(theirs['alert_id'], ours['alert_id'])
+        self.assertEqual(
+            dict(AlertDedupKey.objects.values_list('organization_id', 'alert_id')),
+            {self.organization.id: ours['alert_id'], self.other_organization.id: theirs['alert_id']}
+        )
+        self.assertEqual(Alert.objects.get(id=ours['alert_id']).occurrence_count, 1)
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from alerts.models import Alert, Organization, Team, User, UserAlertPreference
+from alerts.serializers import (
+    ALERT_LIST_VALUES, USER_ALERT_VALUES, AlertListSerializer, UserAlertSerializer,
+    alert_list_rows, user_alert_rows
+)
+
+
+class FastListParityTests(TestCase):
+    """The .values() list paths must produce exactly what the serializers do"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name='acme')
+        team = Team.objects.create(name='payments', organization=organization)
+        cls.admin = User.objects.create_user(
+            'admin', 'admin@acme.test', 'password', role='admin', organization=organization,
+            first_name='Ada', last_name='Lovelace'
+        )
+        # No names: created_by_name falls back to an empty string
+        nameless = User.objects.create_user('ops', 'ops@acme.test', 'password', role='admin', organization=organization)
+        cls.user = User.objects.create_user(
+            'user', 'user@acme.test', 'password', organization=organization, team=team, first_name='Grace'
+        )
+        
+        now = timezone.now()
+        
+        def alert(title, message='Check the dashboard', creator=cls.admin, **fields):
+            return Alert.objects.create(
+                title=title, message=message, visibility_type='Organization',
+                target_organization=organization, created_by=creator,
+                expiry_time=fields.pop('expiry_time', now + timedelta(days=1)), **fields
+            )
+        
+        cls.unread = alert('Plain alert', severity='Warning')
+        cls.read = alert('Read alert', creator=nameless)
+        cls.snoozed = alert('Snoozed alert', delivery_type='Email')
+        cls.snooze_expired = alert('Snooze over', severity='Critical')
+        cls.expired = alert('Expired alert', expiry_time=now - timedelta(days=1), is_active=False, is_archived=True)
+        cls.templated = alert(
+            '{{ team.name }}: {{ fields.service }} is down',
+            message='Hi {{ user.name }}, {{ fields.service }} in {{ organization.name }}; {{ unknown }} stays',
+            template_fields={'service': 'checkout'}
+        )
+        
+        UserAlertPreference.objects.create(user=cls.user, alert=cls.read, is_read=True, read_at=now)
+        UserAlertPreference.objects.create(
+            user=cls.user, alert=cls.snoozed, snoozed_at=now, snooze_until=now + timedelta(hours=2)
+        )
+        UserAlertPreference.objects.create(
+            user=cls.user, alert=cls.snooze_expired, is_read=True,
+            snoozed_at=now - timedelta(hours=3), snooze_until=now - timedelta(hours=1)
+        )
+    
+    def alerts(self):
+        return Alert.objects.order_by('id')
+    
+    def assertSameOutput(self, fast, serialized):
+        self.assertEqual([list(row.items()) for row in fast], [list(row.items()) for row in serialized])
+        # Byte for byte once rendered, including datetimes left to the renderer
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(serialized))
+    
+    def test_alert_list_rows_match_the_serializer(self):
+        fast = alert_list_rows(self.alerts().values(*ALERT_LIST_VALUES))
+        serialized = AlertListSerializer(self.alerts().select_related('created_by'), many=True).data
+        
+        self.assertEqual(len(fast), 6)
+        self.assertSameOutput(fast, serialized)
+        self.assertEqual([row['is_expired'] for row in fast], [False, False, False, False, True, False])
+    
+    def test_user_alert_rows_match_the_serializer(self):
+        fast = user_alert_rows(self.alerts().values(*USER_ALERT_VALUES), self.user)
+        serialized = UserAlertSerializer(
+            self.alerts().select_related('created_by'), many=True, context={'user': self.user}
+        ).data
+        
+        self.assertSameOutput(fast, serialized)
+        
+        rows = {row['id']: row for row in fast}
+        self.assertEqual(
+            [(rows[alert.id]['is_read'], rows[alert.id]['is_snoozed']) for alert in (
+                self.unread, self.read, self.snoozed, self.snooze_expired
+            )],
+            [(False, False), (True, False), (False, True), (True, False)]
+        )
+        self.assertIsNotNone(rows[self.snoozed.id]['snooze_until'])
+        self.assertIsNone(rows[self.snooze_expired.id]['snooze_until'])
+        self.assertEqual(rows[self.templated.id]['title'], 'payments: checkout is down')
+        self.assertEqual(
+            rows[self.templated.id]['message'],
+            'Hi Grace, checkout in acme; {{ unknown }} stays'
+        )
+    
+    def test_user_alert_rows_without_preferences(self):
+        other = User.objects.create_user('other', 'other@acme.test', 'password', organization=self.user.organization)
+        fast = user_alert_rows(self.alerts().values(*USER_ALERT_VALUES), other)
+        serialized = UserAlertSerializer(self.alerts(), many=True, context={'user': other}).data
+        
+        self.assertSameOutput(fast, serialized)
+        self.assertEqual(fast[5]['title'], ': checkout is down')
@@ -0,0 +1,102 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from alerts.metrics import (
+    COUNT, SERIES_LENGTH, collect_snapshots, last_task_runs, publish_snapshot, render_prometheus,
+    request_series, task_metrics, track_task_run
+)
+
+
+class ProcessSeriesTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        for target in ('alerts.metrics.queue_depths', 'alerts.metrics.request_metrics.flush'):
+            patcher = mock.patch(target, return_value={})
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def publish(self, pid, count, kind='requests', ttl=150):
+        series = [0] * SERIES_LENGTH
+        series[COUNT] = count
+        with mock.patch('alerts.metrics.os.getpid', return_value=pid), \
+                mock.patch('alerts.metrics.socket.gethostname', return_value='web'):
+            publish_snapshot(kind, {('user-alerts-list', 'GET', 200): series}, ttl)
+    
+    def test_each_process_keeps_its_own_series(self):
+        self.publish(1, 10)
+        self.publish(2, 3)
+        
+        series = request_series()
+        self.assertEqual(series[('web:1', 'user-alerts-list', 'GET', 200)][COUNT], 10)
+        self.assertEqual(series[('web:2', 'user-alerts-list', 'GET', 200)][COUNT], 3)
+    
+    def test_restarted_process_starts_a_new_series(self):
+        self.publish(1, 10)
+        # Process 1 is replaced by process 3, which counts from zero
+        cache.delete('metrics:requests:web:1')
+        self.publish(3, 1)
+        
+        text = render_prometheus()
+        self.assertIn('http_request_duration_seconds_count{process="web:3",view="user-alerts-list",method="GET",status="200"} 1', text)
+        self.assertNotIn('process="web:1"', text)
+    
+    def test_registry_update_holds_the_lock(self):
+        self.publish(1, 1)
+        
+        # A publisher that finds the lock taken waits for it rather than overwriting the registry
+        cache.add('metrics:requests:processes:lock', 1, 5)
+        with mock.patch('alerts.metrics.time.sleep', side_effect=lambda _: cache.delete('metrics:requests:processes:lock')) as sleep:
+            self.publish(2, 1)
+        sleep.assert_called()
+        self.assertEqual(set(collect_snapshots('requests')), {'web:1', 'web:2'})
+    
+    def test_registry_lock_timeout_leaves_the_holder_alone(self):
+        self.publish(1, 1)
+        
+        # Another process holds the lock past the wait: skip the rewrite and keep its lock
+        cache.add('metrics:requests:processes:lock', 'other', 5)
+        with mock.patch('alerts.metrics.REGISTRY_LOCK_SECONDS', 0), self.assertLogs('alerts.metrics', 'WARNING'):
+            self.publish(2, 1)
+        self.assertEqual(cache.get('metrics:requests:processes:lock'), 'other')
+        self.assertEqual(set(collect_snapshots('requests')), {'web:1'})
+        
+        # The next publish after the holder is done registers the process
+        cache.delete('metrics:requests:processes:lock')
+        self.publish(2, 2)
+        self.assertEqual(set(collect_snapshots('requests')), {'web:1', 'web:2'})
+    
+    def test_registry_is_rewritten_only_to_renew(self):
+        self.publish(1, 1)
+        with mock.patch('alerts.metrics._registry_lock') as lock:
+            self.publish(1, 2)
+        lock.assert_not_called()
+        self.assertEqual(collect_snapshots('requests')['web:1'][('user-alerts-list', 'GET', 200)][COUNT], 2)
+
+
+class TaskRunTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+    
+    def flush_digests_totals(self):
+        totals = task_metrics.totals.get('flush_digests', {})
+        return totals.get('runs', 0), totals.get('errors', 0)
+    
+    def test_run_that_raises_still_emits_its_record(self):
+        runs, errors = self.flush_digests_totals()
+        with self.assertLogs('alerts.metrics', 'INFO') as logs, self.assertRaises(RuntimeError):
+            with track_task_run('flush_digests') as run:
+                run.recipients = 4
+                raise RuntimeError('smtp down')
+        
+        self.assertIn('"error": "RuntimeError: smtp down"', logs.output[0])
+        record = last_task_runs(['flush_digests'])['flush_digests']
+        self.assertEqual((record['recipients'], record['error']), (4, 'RuntimeError: smtp down'))
+        self.assertEqual(self.flush_digests_totals(), (runs + 1, errors + 1))
+    
+    def test_clean_run_has_no_error(self):
+        with self.assertLogs('alerts.metrics', 'INFO'):
+            with track_task_run('flush_digests'):
+                pass
+        self.assertIsNone(last_task_runs(['flush_digests'])['flush_digests']['error'])
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from alerts.models import Alert, Organization, Team, User
+
+
+class OrganizationFieldTests(TestCase):
+    """Only registration creates organizations; elsewhere unknown names are errors"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='Acme')
+        cls.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=cls.organization)
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def create_alert(self, organization):
+        return self.client.post('/api/admin/alerts/', {
+            'title': 'Disk full', 'message': 'Clean up', 'visibility_type': 'Organization',
+            'target_organization': organization,
+            'expiry_time': (timezone.now() + timedelta(hours=1)).isoformat()
+        }, format='json')
+    
+    def test_unknown_names_are_rejected(self):
+        organizations = Organization.objects.count()
+        for name in ('acme', 'Acme Inc'):
+            response = self.create_alert(name)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('target_organization', response.json())
+        
+        response = self.client.post('/api/teams/', {'name': 'ops', 'organization': 'Globex'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('organization', response.json())
+        
+        self.assertEqual(Organization.objects.count(), organizations)
+        self.assertFalse(Alert.objects.exists())
+        self.assertFalse(Team.objects.exists())
+    
+    def test_known_names_and_ids_resolve(self):
+        self.assertEqual(self.create_alert(' Acme ').status_code, 201)
+        self.assertEqual(self.create_alert(self.organization.id).status_code, 201)
+        self.assertEqual(self.create_alert(999999).status_code, 400)
+        self.assertEqual(Alert.objects.filter(target_organization=self.organization).count(), 2)
+    
+    def test_registration_joins_or_creates_the_organization(self):
+        organizations = Organization.objects.count()
+        client = APIClient()
+        
+        def register(username, organization):
+            return client.post('/api/auth/register/', {
+                'username': username, 'email': f'{username}@example.test',
+                'password': 'Sup3r-secret!', 'organization': organization
+            }, format='json')
+        
+        self.assertEqual(register('joiner', 'acme ').status_code, 201)
+        self.assertEqual(User.objects.get(username='joiner').organization, self.organization)
+        
+        self.assertEqual(register('founder', 'Globex').status_code, 201)
+        self.assertEqual(User.objects.get(username='founder').organization.name, 'Globex')
+        self.assertEqual(Organization.objects.count(), organizations + 1)
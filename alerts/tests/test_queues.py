@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from alerting_platform.celery import app
+from alerts.models import Alert, Organization, User
+from alerts.tasks import dispatch_alerts, flush_digests, process_due_reminders
+
+
+@override_settings(CELERY_TASK_ALWAYS_EAGER=False)
+class SeverityQueueTests(TestCase):
+    """Tasks are published to the in-memory broker instead of running inline"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='acme')
+        cls.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=cls.organization)
+    
+    def setUp(self):
+        self.connection = app.connection_for_write()
+        self.addCleanup(self.connection.release)
+        self.addCleanup(self.purge)
+        self.purge()
+        
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def purge(self):
+        for queue in ('critical', 'alerts', 'bulk', 'reminders'):
+            self.connection.default_channel.queue_purge(queue)
+    
+    def messages(self, queue):
+        channel = self.connection.default_channel
+        tasks = []
+        while True:
+            message = channel.basic_get(queue, no_ack=True)
+            if message is None:
+                return tasks
+            args, _, _ = message.decode()
+            tasks.append((message.headers['task'], args))
+    
+    def create_alert(self, severity):
+        return Alert.objects.create(
+            title=f'{severity} alert', message='Details', severity=severity,
+            visibility_type='Organization', target_organization=self.organization, created_by=self.admin,
+            expiry_time=timezone.now() + timedelta(days=1)
+        )
+    
+    def test_critical_alert_lands_alone_on_the_critical_queue(self):
+        # A backlog of Info fan-out and periodic reminder work
+        info = [self.create_alert('Info') for _ in range(20)]
+        for alert in info:
+            dispatch_alerts([alert])
+        for _ in range(5):
+            process_due_reminders.delay()
+            flush_digests.delay()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/admin/alerts/', {
+                'title': 'Database down', 'message': 'Primary unreachable', 'severity': 'Critical',
+                'delivery_type': 'InApp', 'visibility_type': 'Organization', 'target_organization': self.organization.id,
+                'expiry_time': (timezone.now() + timedelta(hours=1)).isoformat()
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        critical = Alert.objects.get(severity='Critical')
+        
+        self.assertEqual(self.messages('critical'), [('alerts.tasks.send_alerts_task', [[critical.id]])])
+        self.assertEqual(len(self.messages('bulk')), 20)
+        self.assertEqual(len(self.messages('reminders')), 10)
+        self.assertEqual(self.messages('alerts'), [])
+    
+    def test_trigger_queues_the_alert_by_severity(self):
+        alert = self.create_alert('Warning')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/admin/alerts/{alert.id}/trigger/')
+        
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual((data['alert_id'], data['status'], data['queue']), (alert.id, 'queued', 'alerts'))
+        message = self.connection.default_channel.basic_get('alerts', no_ack=True)
+        self.assertEqual((message.headers['id'], message.decode()[0]), (data['task_id'], [[alert.id]]))
+        self.assertEqual(self.messages('alerts'), [])
+        self.assertEqual(self.messages('critical'), [])
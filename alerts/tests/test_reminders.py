@@ -0,0 +1,124 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from alerts.locks import task_lease
+from alerts.metrics import task_overlaps
+from alerts.models import Alert, NotificationDelivery, Organization, User, UserAlertPreference
+from alerts.services import InAppNotificationStrategy, NotificationService
+from alerts.tasks import process_due_reminders
+
+
+class DueReminderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name='acme')
+        cls.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=organization)
+        cls.alert = Alert.objects.create(
+            title='Disk full', message='Clean up', visibility_type='Organization',
+            target_organization=organization, created_by=cls.admin,
+            expiry_time=timezone.now() + timedelta(days=1)
+        )
+        cls.users = [
+            User.objects.create_user(f'user-{i}', f'user-{i}@acme.test', 'password', organization=organization)
+            for i in range(5)
+        ]
+    
+    def make_due(self, users, **fields):
+        due_at = timezone.now() - timedelta(minutes=5)
+        return [
+            UserAlertPreference.objects.create(user=user, alert=self.alert, next_reminder_at=due_at, **fields)
+            for user in users
+        ]
+    
+    def test_snoozed_rows_move_to_the_end_of_the_snooze(self):
+        snooze_until = timezone.now() + timedelta(hours=1)
+        snoozed = self.make_due(self.users[:2], snooze_until=snooze_until)
+        due = self.make_due(self.users[2:3])
+        
+        result = NotificationService().process_due_reminders(limit=3)
+        self.assertEqual((result['sent'], result['skipped'], result['deferred']), (1, 2, 2))
+        for preference in snoozed:
+            preference.refresh_from_db()
+            self.assertEqual(preference.next_reminder_at, snooze_until)
+        
+        due[0].refresh_from_db()
+        self.assertGreater(due[0].next_reminder_at, timezone.now())
+    
+    def test_rows_that_error_are_moved_to_their_next_slot(self):
+        preference, = self.make_due(self.users[:1])
+        
+        with self.assertLogs('alerts.services', 'ERROR'), \
+                mock.patch.object(NotificationService, 'claim_reminder', side_effect=RuntimeError('database gone')):
+            result = NotificationService().process_due_reminders()
+        
+        self.assertEqual(result['deferred'], 1)
+        preference.refresh_from_db()
+        self.assertGreater(preference.next_reminder_at, timezone.now())
+    
+    @override_settings(DUE_REMINDER_BATCH_SIZE=2, DUE_REMINDER_MAX_BATCHES=10)
+    def test_backlog_is_drained_in_batches(self):
+        self.make_due(self.users)
+        
+        result = process_due_reminders()
+        self.assertEqual((result['sent'], result['batches']), (5, 3))
+        self.assertEqual(NotificationDelivery.objects.filter(is_reminder=True).count(), 5)
+        self.assertFalse(UserAlertPreference.objects.filter(next_reminder_at__lte=timezone.now()).exists())
+    
+    @override_settings(DUE_REMINDER_BATCH_SIZE=2, DUE_REMINDER_MAX_BATCHES=2)
+    def test_draining_stops_at_the_batch_cap(self):
+        self.make_due(self.users)
+        
+        result = process_due_reminders()
+        self.assertEqual((result['sent'], result['batches']), (4, 2))
+    
+    def test_overlapping_run_is_skipped_and_counted(self):
+        self.make_due(self.users[:1])
+        overlaps = task_overlaps()['process_due_reminders']
+        
+        # A previous run still holds the lease
+        with task_lease('alerts.tasks.process_due_reminders:all'), self.assertLogs('alerts.locks', 'WARNING'):
+            result = process_due_reminders()
+        
+        self.assertEqual(result, {'success': False, 'reason': 'overlap'})
+        self.assertEqual(task_overlaps()['process_due_reminders'], overlaps + 1)
+        self.assertFalse(NotificationDelivery.objects.exists())
+        
+        # Released leases do not block the next run
+        self.assertEqual(process_due_reminders()['sent'], 1)
+    
+    def test_stale_claims_send_nothing(self):
+        now = timezone.now()
+        for field, value in (('next_reminder_at', now + timedelta(hours=2)), ('last_reminder_sent_at', now)):
+            with self.subTest(field=field):
+                UserAlertPreference.objects.all().delete()
+                preference, = self.make_due(self.users[:1])
+                should_receive_reminder = UserAlertPreference.should_receive_reminder
+                
+                def another_run_claims(instance, *args):
+                    # Another run moves the schedule after this one has read the row
+                    UserAlertPreference.objects.filter(id=instance.id).update(**{field: value})
+                    return should_receive_reminder(instance, *args)
+                
+                with mock.patch.object(UserAlertPreference, 'should_receive_reminder', another_run_claims), \
+                        mock.patch.object(InAppNotificationStrategy, 'send') as send:
+                    result = NotificationService().process_due_reminders()
+                
+                send.assert_not_called()
+                self.assertEqual((result['sent'], result['skipped'], result['deferred']), (0, 1, 0))
+                self.assertFalse(NotificationDelivery.objects.exists())
+                preference.refresh_from_db()
+                self.assertEqual(getattr(preference, field), value)
+    
+    def test_claim_reminder_fails_on_a_stale_row(self):
+        preference, = self.make_due(self.users[:1])
+        stale = UserAlertPreference.objects.get(id=preference.id)
+        
+        service = NotificationService()
+        self.assertTrue(service.claim_reminder(preference, self.alert))
+        self.assertFalse(service.claim_reminder(stale, self.alert))
+        self.assertEqual(
+            service.send_to_user(self.alert, self.users[0], is_reminder=True)['reason'], 'too_soon'
+        )
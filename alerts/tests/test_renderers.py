@@ -0,0 +1,114 @@
+import datetime
+import io
+import json
+import random
+import uuid
+from dataclasses import dataclass
+from decimal import Decimal
+from unittest import mock, skipIf
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from alerts.parsers import FastJSONParser
+from alerts.renderers import FastJSONRenderer, orjson, renders_exactly
+
+
+@skipIf(orjson is None, 'orjson is not installed')
+class FastJSONRendererTests(SimpleTestCase):
+    def assertRendersLikeDRF(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+    
+    def test_common_payloads(self):
+        when = datetime.datetime(2026, 10, 19, 8, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+        rows = ReturnList([
+            ReturnDict({'id': i, 'title': f'Alert  {i}', 'read': i % 2 == 0, 'snooze_until': when if i else None}, serializer=None)
+            for i in range(3)
+        ], serializer=None)
+        for data in (
+            {'count': 3, 'next': None, 'results': rows},
+            {'day': datetime.date(2026, 10, 19), 'at': datetime.time(8, 30, 15, 500000), 'id': uuid.uuid4()},
+            {'message': gettext_lazy('Not found.'), 'nested': [[1, [2, {'a': ('b', 'c')}]]]},
+            {'big': 2 ** 70},
+            [],
+            'text',
+        ):
+            with self.subTest(data=data):
+                self.assertRendersLikeDRF(data)
+    
+    def test_floats_render_like_drf(self):
+        for value in (1e16, 1.5e-05, 1e-07, 2.5, -0.0, 1e100, 0.1 + 0.2):
+            with self.subTest(value=value):
+                self.assertRendersLikeDRF({'rows': [{'rate': value}]})
+                self.assertRendersLikeDRF(value)
+        self.assertEqual(FastJSONRenderer().render({'rate': 1e16}), b'{"rate":1e+16}')
+    
+    def test_plain_floats_take_the_fast_path(self):
+        random.seed(46)
+        values = [0.0, 1e-4, 9999999999999998.0, 42.86, 0.1 + 0.2] + [
+            round(random.uniform(0, 100), 2) for _ in range(200)
+        ] + [random.choice((1, -1)) * random.uniform(1, 9.9) * 10 ** random.randint(-4, 15) for _ in range(200)]
+        for value in values:
+            with self.subTest(value=value):
+                self.assertTrue(renders_exactly([value]))
+                self.assertRendersLikeDRF({'overview': {'readRate': value}})
+        
+        data = {'success': True, 'data': {'overview': {'totalDelivered': 7, 'readRate': 42.86}}}
+        with mock.patch.object(JSONRenderer, 'render') as drf_render:
+            self.assertEqual(FastJSONRenderer().render(data), json.dumps(data, separators=(',', ':')).encode())
+        drf_render.assert_not_called()
+        self.assertFalse(renders_exactly([9.999e-05]))
+        self.assertFalse(renders_exactly([1e16]))
+    
+    def test_non_finite_floats_raise_like_drf(self):
+        for value in (float('nan'), float('inf'), float('-inf')):
+            with self.subTest(value=value), self.assertRaises(ValueError):
+                FastJSONRenderer().render({'results': [{'rate': value}]})
+    
+    def test_types_only_drf_knows(self):
+        self.assertRendersLikeDRF({'amount': Decimal('1.10'), 'keys': {1: 'one'}})
+        
+        @dataclass
+        class Point:
+            x: int
+        
+        # DRF's encoder cannot serialize dataclasses, and neither may the fast path
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({'point': Point(1)})
+        with self.assertRaises(ValueError):
+            FastJSONRenderer().render({'at': datetime.time(8, 30, tzinfo=datetime.timezone.utc)})
+
+
+@skipIf(orjson is None, 'orjson is not installed')
+class FastJSONParserTests(SimpleTestCase):
+    def parse(self, parser_class, body):
+        return parser_class().parse(io.BytesIO(body), parser_context={})
+    
+    def assertParsesLikeDRF(self, body):
+        self.assertEqual(repr(self.parse(FastJSONParser, body)), repr(self.parse(JSONParser, body)))
+    
+    def test_results_match_drf(self):
+        for body in (
+            b'{"ids": [1, 2, 3], "title": "Disk \\u00e9 full", "rate": 0.5, "none": null}',
+            b'{"big": 18446744073709551616, "small": -9223372036854775809, "max": 9223372036854775807}',
+            b'{"id": 123456789012345678901234567890}',
+            b'{"text": "\\ud800"}',
+            b'{"text": "\\udc00 trailing"}',
+            b'{"huge": 1e400}',
+        ):
+            with self.subTest(body=body):
+                self.assertParsesLikeDRF(body)
+        self.assertEqual(self.parse(FastJSONParser, b'{"id": 18446744073709551616}'), {'id': 2 ** 64})
+    
+    def test_errors_match_drf(self):
+        for body in (b'{"a": NaN}', b'{"a": Infinity}', b'{"a": ', b'\xff'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError) as expected:
+                    self.parse(JSONParser, body)
+                with self.assertRaises(ParseError) as raised:
+                    self.parse(FastJSONParser, body)
+                self.assertEqual(str(raised.exception), str(expected.exception))
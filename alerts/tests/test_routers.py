@@ -0,0 +1,90 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from alerts.models import Alert, Organization, User
+from alerts.routers import ReplicaRouter, pin_to_primary, replica_reads
+
+
+class ReplicaRouterTests(TransactionTestCase):
+    # Not TestCase: the replica is a second connection to the same SQLite
+    # database and only sees committed rows
+    databases = {'default', 'replica1'}
+    
+    def setUp(self):
+        organization = Organization.objects.create(name='acme')
+        self.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=organization)
+        self.user = User.objects.create_user('user', 'user@acme.test', 'password', organization=organization)
+        self.alert = Alert.objects.create(
+            title='Disk full', message='Clean up', visibility_type='Organization',
+            target_organization=organization, created_by=self.admin,
+            expiry_time=timezone.now() + timedelta(days=1)
+        )
+        cache.clear()
+        
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def queries_by_database(self, action):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica1']) as replica:
+            action()
+        return len(primary), len(replica)
+    
+    def test_reads_go_to_primary_by_default(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Alert))
+        self.assertEqual(Alert.objects.all().db, 'default')
+    
+    def test_replica_reads_routes_reads_but_not_writes(self):
+        router = ReplicaRouter()
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Alert), 'replica1')
+            self.assertIsNone(router.db_for_write(Alert))
+            self.assertEqual(Alert.objects.all().db, 'replica1')
+        self.assertIsNone(router.db_for_read(Alert))
+    
+    def test_replica_reads_run_on_the_replica_connection(self):
+        def read():
+            with replica_reads():
+                self.assertEqual(list(Alert.objects.values_list('id', flat=True)), [self.alert.id])
+        
+        primary, replica = self.queries_by_database(read)
+        self.assertEqual((primary, replica), (0, 1))
+    
+    def test_inbox_is_read_from_the_replica(self):
+        primary, replica = self.queries_by_database(lambda: self.client.get('/api/user/alerts/'))
+        self.assertGreater(replica, 0)
+        # Only authentication may touch the primary
+        self.assertLessEqual(primary, 1)
+    
+    def test_pin_to_primary_keeps_the_writer_on_the_primary(self):
+        pin_to_primary(self.user)
+        with replica_reads(self.user):
+            self.assertEqual(Alert.objects.all().db, 'default')
+        # Other users still read from the replica
+        with replica_reads(self.admin):
+            self.assertEqual(Alert.objects.all().db, 'replica1')
+    
+    def test_pin_expires_after_the_window(self):
+        with self.settings(REPLICA_PIN_SECONDS=5):
+            pin_to_primary(self.user)
+        
+        expired = timezone.now().timestamp() + 6
+        with mock.patch('django.core.cache.backends.locmem.time') as clock:
+            clock.time.return_value = expired
+            with replica_reads(self.user):
+                self.assertEqual(Alert.objects.all().db, 'replica1')
+    
+    def test_marking_read_pins_the_next_inbox_read(self):
+        self.client.put(f'/api/user/alerts/{self.alert.id}/mark_read/')
+        
+        primary, replica = self.queries_by_database(lambda: self.client.get('/api/user/alerts/'))
+        self.assertEqual(replica, 0)
+        self.assertGreater(primary, 0)
@@ -0,0 +1,164 @@
+import importlib
+from datetime import timedelta
+
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from alerts.models import Alert, Organization, Team, User
+from alerts.search import FTS_TABLE, FTS_TRIGGERS, repair_search_index, search_alerts
+
+search_index_migration = importlib.import_module('alerts.migrations.0010_alert_search_index')
+
+
+def titles(queryset):
+    return [alert.title for alert in queryset]
+
+
+# The user inbox reads from the replica, which cannot see rows inside a test transaction
+@override_settings(REPLICA_DATABASES=[])
+class AlertSearchTests(TestCase):
+    """?search= over titles and messages on the SQLite FTS5 index"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='acme')
+        cls.team = Team.objects.create(name='ops', organization=cls.organization)
+        cls.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=cls.organization)
+        cls.user = User.objects.create_user('user', 'user@acme.test', 'password', organization=cls.organization)
+        cls.other_organization = Organization.objects.create(name='globex')
+    
+    def create(self, title, message='Details', **fields):
+        fields.setdefault('visibility_type', 'Organization')
+        if fields['visibility_type'] == 'Organization':
+            fields.setdefault('target_organization', self.organization)
+        return Alert.objects.create(
+            title=title, message=message, created_by=self.admin,
+            expiry_time=timezone.now() + timedelta(days=1), **fields
+        )
+    
+    def search(self, query):
+        return titles(search_alerts(Alert.objects.all(), query))
+    
+    def test_results_are_ordered_by_relevance(self):
+        self.create('Replica lag', 'The disk on the replica is slow')
+        self.create('Disk full', 'Disk usage on db-1 is at 99%, clean up the disk')
+        self.create('CPU high', 'Load average above 10')
+        
+        self.assertEqual(self.search('disk'), ['Disk full', 'Replica lag'])
+        # Any word matches; alerts matching more of them rank first
+        self.assertEqual(self.search('replica cpu slow'), ['Replica lag', 'CPU high'])
+    
+    def test_index_follows_every_write_path(self):
+        alert = self.create('Disk full')
+        self.assertEqual(self.search('disk'), ['Disk full'])
+        
+        alert.title = 'Memory pressure'
+        alert.save()
+        self.assertEqual(self.search('disk'), [])
+        self.assertEqual(self.search('memory'), ['Memory pressure'])
+        
+        Alert.objects.filter(id=alert.id).update(message='Swap is thrashing')
+        self.assertEqual(self.search('swap'), ['Memory pressure'])
+        self.assertEqual(self.search('details'), [])
+        
+        Alert.objects.bulk_create([
+            Alert(title=f'Certificate expiring {i}', message='Renew it', visibility_type='Organization',
+                  target_organization=self.organization, created_by=self.admin,
+                  expiry_time=timezone.now() + timedelta(days=1))
+            for i in range(2)
+        ])
+        self.assertEqual(len(self.search('certificate')), 2)
+        
+        alert.delete()
+        self.assertEqual(self.search('swap'), [])
+        self.assertEqual(len(self.search('renew')), 2)
+    
+    def test_queries_without_words_match_nothing(self):
+        self.create('Disk full')
+        for query in ('"', '""', '*', '-', '" OR "'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), [])
+        
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        self.assertEqual(client.get('/api/admin/alerts/', {'search': '"'}).json()['count'], 0)
+        # An empty parameter does not filter
+        self.assertEqual(client.get('/api/admin/alerts/', {'search': ' '}).json()['count'], 1)
+    
+    def test_search_combines_with_filters(self):
+        self.create('Disk full', severity='Critical')
+        self.create('Disk almost full', severity='Warning')
+        self.create('CPU high', severity='Critical')
+        self.create('Disk archived', severity='Critical', is_archived=True)
+        
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/admin/alerts/', {'search': 'disk', 'severity': 'Critical'})
+        self.assertEqual([row['title'] for row in response.json()['results']], ['Disk full'])
+    
+    def test_user_search_only_sees_visible_alerts(self):
+        self.create('Disk full on web')
+        self.create('Disk full on globex', target_organization=self.other_organization)
+        self.create('Disk full for ops', visibility_type='Team').target_teams.add(self.team)
+        self.create('Disk full for you', visibility_type='User').target_users.add(self.user)
+        self.create('Disk full for someone else', visibility_type='User').target_users.add(self.admin)
+        self.create('CPU high')
+        
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/user/alerts/', {'search': 'disk'})
+        self.assertEqual(
+            sorted(row['title'] for row in response.json()['results']), ['Disk full for you', 'Disk full on web']
+        )
+
+
+class SearchIndexMaintenanceTests(TransactionTestCase):
+    """Migration 0010's DDL and the post_migrate repair of dropped triggers"""
+    
+    def setUp(self):
+        organization = Organization.objects.create(name='acme')
+        self.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=organization)
+        self.organization = organization
+    
+    def create(self, title):
+        return Alert.objects.create(
+            title=title, message='Details', visibility_type='Organization', target_organization=self.organization,
+            created_by=self.admin, expiry_time=timezone.now() + timedelta(days=1)
+        )
+    
+    def search(self, query):
+        return titles(search_alerts(Alert.objects.all(), query))
+    
+    def schema_objects(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE name = %s OR type = 'trigger'", [FTS_TABLE])
+            return {name for name, in cursor.fetchall()}
+    
+    def test_migration_builds_the_index_from_existing_alerts(self):
+        self.create('Disk full')
+        with connection.schema_editor() as editor:
+            search_index_migration.remove(None, editor)
+        self.addCleanup(repair_search_index, connection)
+        self.assertTrue(self.schema_objects().isdisjoint({FTS_TABLE, *FTS_TRIGGERS}))
+        
+        with connection.schema_editor() as editor:
+            search_index_migration.install(None, editor)
+        self.assertEqual(self.schema_objects() & {FTS_TABLE, *FTS_TRIGGERS}, {FTS_TABLE, *FTS_TRIGGERS})
+        self.assertEqual(self.search('disk'), ['Disk full'])
+    
+    def test_dropped_triggers_are_restored_and_the_index_rebuilt(self):
+        with connection.cursor() as cursor:
+            # What SQLite does to the triggers when a migration rebuilds the alerts table
+            for name in FTS_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER {name}')
+        self.create('Disk full')
+        self.assertEqual(self.search('disk'), [])
+        
+        emit_post_migrate_signal(verbosity=0, interactive=False, db='default')
+        self.assertTrue(set(FTS_TRIGGERS) <= self.schema_objects())
+        self.assertEqual(self.search('disk'), ['Disk full'])
+        self.create('Disk almost full')
+        self.assertEqual(len(self.search('disk')), 2)
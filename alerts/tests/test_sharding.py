@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from alerting_platform.celery import app
+from alerts.authentication import tokens_for_user
+from alerts.models import Alert, NotificationDelivery, Organization, OrganizationShard, User
+from alerts.sharding import (
+    assign_organization, directory_entry, find_organization, set_organization_moving
+)
+from alerts.tasks import send_alerts_task
+
+
+@override_settings(SHARDING_ENABLED=True, SHARD_DATABASES=['default'])
+class ShardDirectoryTests(TestCase):
+    """A single shard stands in for several; the directory logic is the same"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='acme')
+        cls.user = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=cls.organization)
+    
+    def setUp(self):
+        cache.clear()
+        assign_organization(self.organization, 'default')
+    
+    def test_directory_is_keyed_by_id_and_follows_renames(self):
+        self.organization.name = 'Acme Inc'
+        self.organization.save()
+        
+        self.assertEqual(OrganizationShard.objects.get(organization=self.organization).name, 'Acme Inc')
+        self.assertEqual(find_organization('Acme Inc'), (self.organization.id, 'default', False))
+        self.assertEqual(find_organization('acme')[0], None)
+        self.assertEqual(directory_entry(self.organization.id), ('default', False))
+    
+    def test_tokens_route_by_organization_id(self):
+        token = tokens_for_user(self.user).access_token
+        self.assertEqual(token['org'], self.organization.id)
+        
+        set_organization_moving(self.organization.id, True)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(client.get('/api/auth/me/').status_code, 200)
+        
+        # Writes are refused while the organization is moved
+        response = client.post('/api/admin/alerts/', {
+            'title': 'Disk full', 'message': 'Clean up', 'visibility_type': 'Organization',
+            'target_organization': self.organization.id,
+            'expiry_time': (timezone.now() + timedelta(hours=1)).isoformat()
+        }, format='json')
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(Alert.objects.exists())
+    
+    def test_tokens_with_an_organization_name_still_route(self):
+        refresh = tokens_for_user(self.user)
+        refresh['org'] = 'acme'
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        self.assertEqual(client.get('/api/auth/me/').status_code, 200)
+    
+    def test_registration_records_new_organizations(self):
+        response = APIClient().post('/api/auth/register/', {
+            'username': 'new', 'email': 'new@globex.test', 'password': 'Sup3r-secret!', 'organization': 'globex'
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        
+        organization = Organization.objects.get(name='globex')
+        self.assertEqual(find_organization('globex'), (organization.id, 'default', False))
+
+
+@override_settings(SHARDING_ENABLED=True, SHARD_DATABASES=['default'], CELERY_TASK_ALWAYS_EAGER=False)
+class MovingOrganizationTaskTests(TestCase):
+    """Fan-out for an organization being moved is requeued instead of writing to the source"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='acme')
+        cls.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=cls.organization)
+        cls.alert = Alert.objects.create(
+            title='Disk full', message='Clean up', severity='Warning',
+            visibility_type='Organization', target_organization=cls.organization, created_by=cls.admin,
+            expiry_time=timezone.now() + timedelta(days=1)
+        )
+    
+    def setUp(self):
+        cache.clear()
+        assign_organization(self.organization, 'default')
+        self.connection = app.connection_for_write()
+        self.addCleanup(self.connection.release)
+        self.addCleanup(self.connection.default_channel.queue_purge, 'alerts')
+        self.connection.default_channel.queue_purge('alerts')
+    
+    def test_fan_out_is_requeued_while_moving(self):
+        set_organization_moving(self.organization.id, True)
+        
+        result = send_alerts_task.apply(
+            args=[[self.alert.id]], kwargs={'database': 'default', 'organization': self.organization.id}
+        ).get()
+        
+        self.assertEqual(result['success'], False)
+        self.assertFalse(NotificationDelivery.objects.exists())
+        message = self.connection.default_channel.basic_get('alerts', no_ack=True)
+        self.assertIsNotNone(message)
+        args, kwargs, _ = message.decode()
+        self.assertEqual((args, kwargs['organization']), ([[self.alert.id]], self.organization.id))
+        self.assertIsNotNone(message.headers['eta'])
+    
+    def test_fan_out_runs_once_the_move_is_over(self):
+        set_organization_moving(self.organization.id, True)
+        set_organization_moving(self.organization.id, False)
+        
+        result = send_alerts_task.apply(
+            args=[[self.alert.id]], kwargs={'database': 'default', 'organization': self.organization.id}
+        ).get()
+        
+        self.assertEqual(result['success'], True)
+        self.assertTrue(NotificationDelivery.objects.filter(alert=self.alert).exists())
@@ -0,0 +1,141 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from alerts.authentication import tokens_for_user
+from alerts.models import Alert, Organization, Team, User, UserAlertPreference
+
+
+class TeamListQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='acme')
+        cls.user = User.objects.create_user('user', 'user@acme.test', 'password', organization=cls.organization)
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def count_queries(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+    
+    def test_team_list_queries_do_not_grow_with_teams(self):
+        Team.objects.create(name='team-0', organization=self.organization)
+        few, _ = self.count_queries('/api/teams/')
+        
+        Team.objects.bulk_create([Team(name=f'team-{i}', organization=self.organization) for i in range(1, 10)])
+        many, response = self.count_queries('/api/teams/')
+        
+        self.assertEqual(few, many)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(response.data['results'][0]['organization'], 'acme')
+    
+    def test_current_user_loads_relations_in_one_query(self):
+        team = Team.objects.create(name='ops', organization=self.organization)
+        self.user.team = team
+        self.user.save()
+        
+        # Real token authentication, which resolves the user from the cache
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_for_user(self.user).access_token}')
+        client.get('/api/auth/me/')
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/auth/me/')
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data['team_name'], 'ops')
+        self.assertEqual(response.data['organization'], 'acme')
+
+
+class TeamMembershipTests(TestCase):
+    """POST/DELETE /api/teams/<id>/members/ moves users with set-based updates"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='acme')
+        other = Organization.objects.create(name='globex')
+        cls.ops = Team.objects.create(name='ops', organization=cls.organization)
+        cls.web = Team.objects.create(name='web', organization=cls.organization)
+        cls.foreign_team = Team.objects.create(name='ops', organization=other)
+        
+        cls.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=cls.organization)
+        cls.mover = User.objects.create_user('mover', 'mover@acme.test', 'password', organization=cls.organization, team=cls.web)
+        cls.newcomer = User.objects.create_user('newcomer', 'newcomer@acme.test', 'password', organization=cls.organization)
+        cls.outsider = User.objects.create_user('outsider', 'outsider@globex.test', 'password', organization=other)
+        
+        def team_alert(team):
+            alert = Alert.objects.create(
+                title=f'{team.name} alert', message='Details', visibility_type='Team', created_by=cls.admin,
+                expiry_time=timezone.now() + timedelta(days=1)
+            )
+            alert.target_teams.add(team)
+            return alert
+        
+        cls.ops_alert = team_alert(cls.ops)
+        cls.web_alert = team_alert(cls.web)
+        
+        due = timezone.now() + timedelta(hours=1)
+        UserAlertPreference.objects.create(user=cls.mover, alert=cls.web_alert, next_reminder_at=due)
+        # Read before, e.g. as a former member; the read state survives rejoining
+        UserAlertPreference.objects.create(user=cls.newcomer, alert=cls.ops_alert, is_read=True)
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def members(self, method, team, user_ids):
+        url = f'/api/teams/{team.id}/members/'
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, {'user_ids': user_ids}, format='json')
+    
+    def next_reminder(self, user, alert):
+        return UserAlertPreference.objects.get(user=user, alert=alert).next_reminder_at
+    
+    def test_adding_members_moves_their_reminders(self):
+        response = self.members('post', self.ops, [self.mover.id, self.newcomer.id, self.outsider.id])
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], {
+            'requested': 3, 'updated': 2, 'reminders_cleared': 1, 'reminders_scheduled': 2
+        })
+        self.assertEqual(set(self.ops.members.values_list('id', flat=True)), {self.mover.id, self.newcomer.id})
+        
+        # Reminders of the old team's alert stop; the new team's alert is due now
+        self.assertIsNone(self.next_reminder(self.mover, self.web_alert))
+        self.assertLessEqual(self.next_reminder(self.mover, self.ops_alert), timezone.now())
+        self.assertLessEqual(self.next_reminder(self.newcomer, self.ops_alert), timezone.now())
+        self.assertTrue(UserAlertPreference.objects.get(user=self.newcomer, alert=self.ops_alert).is_read)
+    
+    def test_users_of_other_organizations_are_left_alone(self):
+        self.members('post', self.ops, [self.outsider.id])
+        self.outsider.refresh_from_db()
+        self.assertIsNone(self.outsider.team)
+        
+        # Nor can another organization's team be managed
+        response = self.members('post', self.foreign_team, [self.outsider.id])
+        self.assertEqual(response.status_code, 404)
+    
+    def test_removing_members_clears_team_reminders(self):
+        self.members('post', self.ops, [self.newcomer.id])
+        
+        response = self.members('delete', self.ops, [self.newcomer.id, self.mover.id])
+        self.assertEqual(response.json()['data'], {
+            'requested': 2, 'updated': 1, 'reminders_cleared': 1, 'reminders_scheduled': 0
+        })
+        self.newcomer.refresh_from_db()
+        self.assertIsNone(self.newcomer.team)
+        self.assertIsNone(self.next_reminder(self.newcomer, self.ops_alert))
+        # Not a member, so untouched
+        self.assertIsNotNone(self.next_reminder(self.mover, self.web_alert))
+    
+    def test_members_require_an_admin(self):
+        self.client.force_authenticate(self.mover)
+        response = self.members('post', self.ops, [self.mover.id])
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,157 @@
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from alerts import webhooks
+from alerts.models import (
+    Alert, DigestItem, NotificationDelivery, NotificationDigest, NotificationFailure, Organization, User, WebhookEndpoint
+)
+from alerts.services import NotificationService
+from alerts.webhooks import ID_HEADER, SIGNATURE_HEADER, TIMESTAMP_HEADER, verify_signature
+
+SECRET = 'test-webhook-secret-0123456789'
+
+
+class Receiver:
+    """Local keep-alive HTTP server recording every POST; answers from `statuses`, then 204"""
+    
+    def __init__(self, statuses=()):
+        self.statuses = list(statuses)
+        self.requests = []
+        receiver = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                receiver.requests.append({
+                    'port': self.client_address[1],
+                    'id': self.headers.get(ID_HEADER),
+                    'verified': verify_signature(
+                        SECRET, self.headers.get(TIMESTAMP_HEADER), body, self.headers.get(SIGNATURE_HEADER)
+                    ),
+                    'payload': json.loads(body),
+                })
+                self.send_response(receiver.statuses.pop(0) if receiver.statuses else 204)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+    
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f'http://{host}:{port}/hook'
+    
+    def __enter__(self):
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        # Idle pooled connections would keep server threads waiting
+        for pool in webhooks._pools.values():
+            for connection in pool._idle:
+                connection.close()
+        webhooks._pools.clear()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(WEBHOOK_RETRY_BACKOFF_SECONDS=0, WEBHOOK_MAX_RETRIES=2)
+class WebhookDeliveryTests(TestCase):
+    """Fan-out to a real HTTP endpoint through the eager deliver_webhook task"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='acme')
+        cls.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=cls.organization)
+        cls.alert = Alert.objects.create(
+            title='Disk full', message='Clean up', delivery_type='Webhook',
+            visibility_type='Organization', target_organization=cls.organization, created_by=cls.admin,
+            expiry_time=timezone.now() + timedelta(days=1)
+        )
+    
+    def send(self, receiver, recipients, batch_size):
+        for i in range(recipients - 1):
+            User.objects.create_user(f'user-{i}', f'user-{i}@acme.test', 'password', organization=self.organization)
+        WebhookEndpoint.objects.create(
+            organization=self.organization, name='ops', url=receiver.url, secret=SECRET, batch_size=batch_size
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService().send_alert(self.alert.id)
+    
+    def test_deliveries_are_batched_over_one_connection(self):
+        with Receiver() as receiver:
+            self.send(receiver, recipients=5, batch_size=2)
+        
+        self.assertEqual([len(request['payload']['deliveries']) for request in receiver.requests], [2, 2, 1])
+        self.assertEqual(len({request['port'] for request in receiver.requests}), 1)
+        self.assertTrue(all(request['verified'] for request in receiver.requests))
+        self.assertEqual(len({request['id'] for request in receiver.requests}), 3)
+    
+    def test_server_errors_are_retried_with_the_same_id(self):
+        with Receiver(statuses=[503]) as receiver, self.assertLogs('alerts.tasks', 'WARNING'):
+            self.send(receiver, recipients=1, batch_size=10)
+        
+        first, retry = receiver.requests
+        self.assertEqual(first['id'], retry['id'])
+        self.assertEqual((first['payload']['attempt'], retry['payload']['attempt']), (1, 2))
+        self.assertTrue(retry['verified'])
+        self.assertFalse(NotificationDelivery.objects.filter(status=NotificationDelivery.STATUS_FAILED).exists())
+    
+    def test_client_errors_mark_the_batch_failed(self):
+        with Receiver(statuses=[400]) as receiver, self.assertLogs('alerts.tasks', 'ERROR'):
+            self.send(receiver, recipients=3, batch_size=10)
+        
+        self.assertEqual(len(receiver.requests), 1)
+        deliveries = NotificationDelivery.objects.filter(alert=self.alert)
+        self.assertEqual(deliveries.count(), 3)
+        self.assertEqual(deliveries.filter(status=NotificationDelivery.STATUS_FAILED).count(), 3)
+        self.assertEqual(NotificationFailure.objects.filter(reason='Webhook ops: HTTP 400').count(), 3)
+    
+    @override_settings(DIGEST_RULES={'Webhook': ['Info']})
+    def test_client_errors_mark_a_digest_failed(self):
+        Alert.objects.filter(id=self.alert.id).update(severity='Info')
+        with Receiver(statuses=[400]) as receiver, self.assertLogs('alerts.tasks', 'ERROR'):
+            self.send(receiver, recipients=2, batch_size=10)
+            DigestItem.objects.update(due_at=timezone.now() - timedelta(seconds=1))
+            with self.captureOnCommitCallbacks(execute=True):
+                NotificationService().flush_digests()
+        
+        self.assertEqual(len(receiver.requests), 1)
+        self.assertEqual(len(receiver.requests[0]['payload']['deliveries']), 2)
+        self.assertFalse(NotificationDelivery.objects.exists())
+        self.assertEqual(
+            list(NotificationDigest.objects.values_list('status', flat=True)), [NotificationDelivery.STATUS_FAILED] * 2
+        )
+
+
+class WebhookEndpointAPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name='acme')
+        cls.admin = User.objects.create_user('admin', 'admin@acme.test', 'password', role='admin', organization=organization)
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+    
+    def test_secret_is_only_returned_on_create(self):
+        response = self.client.post('/api/webhooks/', {'name': 'ops', 'url': 'https://hooks.acme.test/in'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        secret = response.json()['secret']
+        self.assertEqual(WebhookEndpoint.objects.get().secret, secret)
+        
+        endpoint_id = response.json()['id']
+        self.assertNotIn('secret', self.client.get(f'/api/webhooks/{endpoint_id}/').json())
+        self.assertNotIn('secret', self.client.get('/api/webhooks/').json()['results'][0])
@@ -2,20 +2,48 @@ from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
+from django.http import HttpResponse
 from django.utils import timezone
-from django.db.models import Q, Count
+from django.db import router, transaction
+from django.db.models import Q, Count, Sum
 from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import User, Team, Alert, NotificationDelivery, UserAlertPreference
+from .models import (
+    User, Team, Alert, NotificationDelivery, NotificationDigest, UserAlertPreference, WebhookEndpoint,
+    DEFAULT_ORGANIZATION
+)
 from .serializers import (
     UserSerializer, UserCreateSerializer, LoginSerializer,
     TeamSerializer, AlertSerializer, AlertListSerializer,
     UserAlertSerializer, NotificationDeliverySerializer,
-    UserAlertPreferenceSerializer
+    UserAlertPreferenceSerializer, SnoozeSerializer, TeamMembershipSerializer,
+    AlertBulkCreateSerializer, EventIngestSerializer, WebhookEndpointSerializer,
+    ALERT_LIST_VALUES, USER_ALERT_VALUES, alert_list_rows, user_alert_rows
 )
-from .services import NotificationService
+from .services import TeamMembershipService, AlertIngestionService
+from .tasks import dispatch_alerts, plan_dispatch
+from .profiling import get_profile, list_profiles
+from .search import AlertSearchFilter
+from .metrics import queue_depths, task_overlaps, last_task_runs, render_prometheus, PROMETHEUS_CONTENT_TYPE
 from .permissions import IsAdminUser
+from .routers import replica_reads, pin_to_primary, use_shard, current_shard
+from .sharding import assign_organization, find_organization, for_each_shard
+from .authentication import tokens_for_user
+
+
+def dispatch_on_commit(alerts):
+    """
+    Fan the alerts out on their severity queues once the request's writes commit.
+    Returns the planned tasks (task id, queue, alert ids).
+    """
+    database = current_shard()
+    plan = plan_dispatch(alerts)
+    transaction.on_commit(
+        lambda: dispatch_alerts(alerts, database=database, plan=plan),
+        using=router.db_for_write(Alert)
+    )
+    return plan
 
 
 # ==================== Authentication Views ====================
@@ -27,12 +55,18 @@ class RegisterView(generics.CreateAPIView):
     permission_classes = [AllowAny]
     
     def create(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        user = serializer.save()
+        # New users (and new organizations) live on their organization's shard
+        organization = request.data.get('organization') or DEFAULT_ORGANIZATION
+        organization_id, alias, moving = find_organization(str(organization).strip())
+        with use_shard(alias, frozen=moving):
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            user = serializer.save()
+            if settings.SHARDING_ENABLED and organization_id is None:
+                assign_organization(user.organization, alias)
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         
         return Response({
             'success': True,
@@ -56,7 +90,7 @@ class LoginView(generics.GenericAPIView):
         user = serializer.validated_data['user']
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_for_user(user)
         
         return Response({
             'success': True,
@@ -75,7 +109,9 @@ class CurrentUserView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     
     def get_object(self):
-        return self.request.user
+        # The authenticated user may come from the cache without relations;
+        # one join loads the team and organization names the serializer shows
+        return User.objects.select_related('team', 'organization').get(pk=self.request.user.pk)
 
 
 # ==================== Admin Alert Views ====================
@@ -85,7 +121,7 @@ class AdminAlertViewSet(viewsets.ModelViewSet):
     queryset = Alert.objects.all()
     serializer_class = AlertSerializer
     permission_classes = [IsAuthenticated, IsAdminUser]
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [DjangoFilterBackend, AlertSearchFilter]
     filterset_fields = ['severity', 'visibility_type', 'is_active', 'is_archived']
     
     def get_serializer_class(self):
@@ -106,18 +142,67 @@ class AdminAlertViewSet(viewsets.ModelViewSet):
         elif status_param == 'expired':
             queryset = queryset.filter(expiry_time__lte=timezone.now())
         
-        return queryset.select_related('created_by').prefetch_related('target_teams', 'target_users')
+        # Only AlertSerializer reads the creator; targets are never prefetched since
+        # the detail summarizes them and the targets/ actions page through them
+        if self.action in ('retrieve', 'update', 'partial_update'):
+            queryset = queryset.select_related('created_by')
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        """Built from .values() rows; same output as AlertListSerializer"""
+        queryset = self.filter_queryset(self.get_queryset()).values(*ALERT_LIST_VALUES)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(alert_list_rows(page))
+        return Response(alert_list_rows(queryset))
     
     def perform_create(self, serializer):
         alert = serializer.save(created_by=self.request.user)
         
-        # Send alert immediately
-        notification_service = NotificationService()
-        notification_service.send_alert(alert.id, is_reminder=False)
+        # Sent in the background on the alert's severity queue
+        dispatch_on_commit([alert])
     
     def perform_update(self, serializer):
         serializer.save()
     
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Create many alerts at once and fan them out in one background task per severity"""
+        serializer = AlertBulkCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        alerts = serializer.save(created_by=request.user)
+        dispatch_on_commit(alerts)
+        
+        return Response({
+            'success': True,
+            'message': f'{len(alerts)} alerts created',
+            'data': {'ids': [alert.id for alert in alerts]}
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['get'], url_path='targets/teams')
+    def target_teams(self, request, pk=None):
+        """Paginated teams the alert targets"""
+        alert = self.get_object()
+        teams = alert.target_teams.select_related('organization').annotate(
+            member_count=Count('members')
+        ).order_by('id')
+        
+        page = self.paginate_queryset(teams)
+        if page is not None:
+            return self.get_paginated_response(TeamSerializer(page, many=True).data)
+        return Response(TeamSerializer(teams, many=True).data)
+    
+    @action(detail=True, methods=['get'], url_path='targets/users')
+    def target_users(self, request, pk=None):
+        """Paginated users the alert targets directly"""
+        alert = self.get_object()
+        users = alert.target_users.select_related('team', 'organization').order_by('id')
+        
+        page = self.paginate_queryset(users)
+        if page is not None:
+            return self.get_paginated_response(UserSerializer(page, many=True).data)
+        return Response(UserSerializer(users, many=True).data)
+    
     @action(detail=True, methods=['delete'])
     def archive(self, request, pk=None):
         """Archive an alert"""
@@ -133,25 +218,59 @@ class AdminAlertViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def trigger(self, request, pk=None):
-        """Manually trigger an alert"""
+        """Manually trigger an alert; the fan-out runs in the background"""
         alert = self.get_object()
-        
-        notification_service = NotificationService()
-        result = notification_service.send_alert(alert.id, is_reminder=False)
+        task, = dispatch_on_commit([alert])
         
         return Response({
             'success': True,
             'message': 'Alert triggered successfully',
-            'data': result
+            'data': {
+                'alert_id': alert.id,
+                'status': 'queued',
+                'task_id': task['task_id'],
+                'queue': task['queue']
+            }
         })
 
 
+# ==================== Event Ingestion Views ====================
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def ingest_events(request):
+    """
+    Ingest monitoring events (one event or {"events": [...]}).
+    Repeats of a dedup_key within the dedup window fold into the open alert;
+    only newly opened alerts are fanned out.
+    """
+    data = request.data
+    if isinstance(data, dict) and 'events' not in data:
+        data = {'events': [data]}
+    
+    serializer = EventIngestSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    
+    ingestion_service = AlertIngestionService()
+    result = ingestion_service.ingest(serializer.validated_data['events'], request.user)
+    
+    created_alerts = result.pop('created_alerts')
+    if created_alerts:
+        dispatch_on_commit(created_alerts)
+    
+    return Response({
+        'success': True,
+        'data': result
+    }, status=status.HTTP_202_ACCEPTED)
+
+
 # ==================== User Alert Views ====================
 
 class UserAlertViewSet(viewsets.ReadOnlyModelViewSet):
     """User Alert ViewSet"""
     serializer_class = UserAlertSerializer
     permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, AlertSearchFilter]
     
     def get_queryset(self):
         user = self.request.user
@@ -168,14 +287,14 @@ class UserAlertViewSet(viewsets.ReadOnlyModelViewSet):
         # Organization-wide alerts
         org_query = Q(
             visibility_type='Organization',
-            target_organization=user.organization
+            target_organization_id=user.organization_id
         )
         
         # Team-specific alerts
         team_query = Q(
             visibility_type='Team',
-            target_teams=user.team
-        ) if user.team else Q(pk=None)
+            target_teams=user.team_id
+        ) if user.team_id else Q(pk=None)
         
         # User-specific alerts
         user_query = Q(
@@ -194,6 +313,19 @@ class UserAlertViewSet(viewsets.ReadOnlyModelViewSet):
         context['user'] = self.request.user
         return context
     
+    def list(self, request, *args, **kwargs):
+        """Built from .values() rows; same output as UserAlertSerializer"""
+        with replica_reads(request.user):
+            queryset = self.filter_queryset(self.get_queryset()).values(*USER_ALERT_VALUES)
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(user_alert_rows(page, request.user))
+            return Response(user_alert_rows(queryset, request.user))
+    
+    def retrieve(self, request, *args, **kwargs):
+        with replica_reads(request.user):
+            return super().retrieve(request, *args, **kwargs)
+    
     @action(detail=True, methods=['put'])
     def mark_read(self, request, pk=None):
         """Mark alert as read"""
@@ -207,13 +339,26 @@ class UserAlertViewSet(viewsets.ReadOnlyModelViewSet):
         )
         
         preference.mark_as_read()
+        pin_to_primary(user)
         
         # Update delivery status
         NotificationDelivery.objects.filter(
             user=user,
             alert=alert,
-            status='sent'
-        ).update(status='read', read_at=timezone.now())
+            status=NotificationDelivery.STATUS_SENT
+        ).update(status=NotificationDelivery.STATUS_READ, read_at=timezone.now())
+        
+        # Digested alerts are read on the digest that carried them
+        with transaction.atomic(using=router.db_for_write(NotificationDigest)):
+            digests = NotificationDigest.objects.filter(
+                user=user,
+                status=NotificationDelivery.STATUS_SENT
+            ).containing(alert.id).select_for_update()
+            for digest in digests:
+                if alert.id not in digest.read_alert_ids:
+                    digest.read_alert_ids.append(alert.id)
+                    digest.read_count += 1
+                    digest.save(update_fields=['read_alert_ids', 'read_count'])
         
         return Response({
             'success': True,
@@ -231,6 +376,7 @@ class UserAlertViewSet(viewsets.ReadOnlyModelViewSet):
             preference.is_read = False
             preference.read_at = None
             preference.save()
+            pin_to_primary(user)
             
             return Response({
                 'success': True,
@@ -244,21 +390,26 @@ class UserAlertViewSet(viewsets.ReadOnlyModelViewSet):
     
     @action(detail=True, methods=['post'])
     def snooze(self, request, pk=None):
-        """Snooze alert for the day"""
+        """Snooze alert for a duration, until a given time, or for the day"""
         alert = self.get_object()
         user = request.user
         
+        serializer = SnoozeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        snooze_until = serializer.validated_data['snooze_until']
+        
         # Get or create preference
         preference, created = UserAlertPreference.objects.get_or_create(
             user=user,
             alert=alert
         )
         
-        preference.snooze_for_day()
+        preference.snooze(snooze_until)
+        pin_to_primary(user)
         
         return Response({
             'success': True,
-            'message': 'Alert snoozed until end of day',
+            'message': f'Alert snoozed until {snooze_until.isoformat()}',
             'data': UserAlertPreferenceSerializer(preference).data
         })
     
@@ -268,17 +419,17 @@ class UserAlertViewSet(viewsets.ReadOnlyModelViewSet):
         user = request.user
         now = timezone.now()
         
-        snoozed_prefs = UserAlertPreference.objects.filter(
-            user=user,
-            is_snoozed=True,
-            snooze_until__gt=now
-        ).select_related('alert', 'alert__created_by')
-        
-        data = []
-        for pref in snoozed_prefs:
-            alert_data = UserAlertSerializer(pref.alert, context={'user': user}).data
-            alert_data['snoozed_at'] = pref.snoozed_at
-            data.append(alert_data)
+        with replica_reads(user):
+            snoozed_prefs = UserAlertPreference.objects.filter(
+                user=user,
+                snooze_until__gt=now
+            ).select_related('alert', 'alert__created_by')
+            
+            data = []
+            for pref in snoozed_prefs:
+                alert_data = UserAlertSerializer(pref.alert, context={'user': user}).data
+                alert_data['snoozed_at'] = pref.snoozed_at
+                data.append(alert_data)
         
         return Response({
             'success': True,
@@ -288,81 +439,115 @@ class UserAlertViewSet(viewsets.ReadOnlyModelViewSet):
 
 # ==================== Analytics Views ====================
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated, IsAdminUser])
-def system_analytics(request):
-    """Get system-wide analytics"""
-    from django.db.models import Count
-    
-    # Overview metrics
-    total_alerts = Alert.objects.filter(is_archived=False).count()
-    active_alerts = Alert.objects.filter(
-        is_active=True,
-        is_archived=False,
-        expiry_time__gt=timezone.now()
-    ).count()
-    expired_alerts = Alert.objects.filter(
-        is_archived=False,
-        expiry_time__lte=timezone.now()
-    ).count()
-    
-    total_delivered = NotificationDelivery.objects.count()
-    total_read = NotificationDelivery.objects.filter(status='read').count()
-    total_snoozed = UserAlertPreference.objects.filter(
-        is_snoozed=True,
-        snooze_until__gt=timezone.now()
-    ).count()
+def _collect_system_analytics():
+    """Aggregate system analytics on the database active in this context"""
+    from datetime import timedelta
     
-    read_rate = (total_read / total_delivered * 100) if total_delivered > 0 else 0
+    now = timezone.now()
     
-    # Severity breakdown
-    severity_breakdown = Alert.objects.filter(
-        is_archived=False
-    ).values('severity').annotate(count=Count('id'))
+    # Overview metrics
+    overview = {
+        'totalAlerts': Alert.objects.filter(is_archived=False).count(),
+        'activeAlerts': Alert.objects.filter(
+            is_active=True,
+            is_archived=False,
+            expiry_time__gt=now
+        ).count(),
+        'expiredAlerts': Alert.objects.filter(
+            is_archived=False,
+            expiry_time__lte=now
+        ).count(),
+        'totalDelivered': NotificationDelivery.objects.filter(
+            status__in=NotificationDelivery.DELIVERED_STATUSES
+        ).count(),
+        'totalRead': NotificationDelivery.objects.filter(status=NotificationDelivery.STATUS_READ).count(),
+        'totalSnoozed': UserAlertPreference.objects.filter(
+            snooze_until__gt=now
+        ).count(),
+    }
     
-    # Delivery type breakdown
-    delivery_breakdown = Alert.objects.filter(
-        is_archived=False
-    ).values('delivery_type').annotate(count=Count('id'))
+    # Each digest stands for the alerts it lists
+    digested = NotificationDigest.objects.filter(
+        status=NotificationDelivery.STATUS_SENT
+    ).aggregate(delivered=Sum('alert_count'), read=Sum('read_count'))
+    overview['totalDelivered'] += digested['delivered'] or 0
+    overview['totalRead'] += digested['read'] or 0
     
-    # Visibility breakdown
-    visibility_breakdown = Alert.objects.filter(
-        is_archived=False
-    ).values('visibility_type').annotate(count=Count('id'))
+    # Severity, delivery type and visibility breakdowns
+    breakdowns = {
+        name: list(
+            Alert.objects.filter(is_archived=False).values(field).annotate(count=Count('id'))
+        )
+        for name, field in (
+            ('severity', 'severity'),
+            ('deliveryType', 'delivery_type'),
+            ('visibility', 'visibility_type'),
+        )
+    }
     
     # Recent activity (last 7 days)
-    from datetime import timedelta
-    seven_days_ago = timezone.now() - timedelta(days=7)
+    seven_days_ago = now - timedelta(days=7)
     
     recent_alerts = Alert.objects.filter(
         created_at__gte=seven_days_ago,
         is_archived=False
     ).extra(select={'date': 'DATE(created_at)'}).values('date').annotate(count=Count('id')).order_by('date')
     
+    return {
+        'overview': overview,
+        'breakdowns': breakdowns,
+        'recentActivity': list(recent_alerts)
+    }
+
+
+def _merge_counts(rows_per_shard, field):
+    """Merge [{field: value, 'count': n}] lists from several shards"""
+    totals = {}
+    for rows in rows_per_shard:
+        for row in rows:
+            totals[row[field]] = totals.get(row[field], 0) + row['count']
+    return [{field: value, 'count': count} for value, count in totals.items()]
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+@replica_reads()
+def system_analytics(request):
+    """Get system-wide analytics (aggregated per shard in parallel)"""
+    shard_results = list(for_each_shard(_collect_system_analytics).values())
+    
+    overview = {
+        key: sum(result['overview'][key] for result in shard_results)
+        for key in shard_results[0]['overview']
+    }
+    total_delivered = overview['totalDelivered']
+    read_rate = (overview['totalRead'] / total_delivered * 100) if total_delivered > 0 else 0
+    overview['readRate'] = round(read_rate, 2)
+    
+    breakdowns = {
+        'severity': _merge_counts([r['breakdowns']['severity'] for r in shard_results], 'severity'),
+        'deliveryType': _merge_counts([r['breakdowns']['deliveryType'] for r in shard_results], 'delivery_type'),
+        'visibility': _merge_counts([r['breakdowns']['visibility'] for r in shard_results], 'visibility_type'),
+    }
+    
+    recent_activity = sorted(
+        _merge_counts([r['recentActivity'] for r in shard_results], 'date'),
+        key=lambda row: str(row['date'])
+    )
+    
     return Response({
         'success': True,
         'data': {
-            'overview': {
-                'totalAlerts': total_alerts,
-                'activeAlerts': active_alerts,
-                'expiredAlerts': expired_alerts,
-                'totalDelivered': total_delivered,
-                'totalRead': total_read,
-                'totalSnoozed': total_snoozed,
-                'readRate': round(read_rate, 2)
-            },
-            'breakdowns': {
-                'severity': list(severity_breakdown),
-                'deliveryType': list(delivery_breakdown),
-                'visibility': list(visibility_breakdown)
-            },
-            'recentActivity': list(recent_alerts)
+            'overview': overview,
+            'breakdowns': breakdowns,
+            'recentActivity': recent_activity
         }
     })
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdminUser])
+@replica_reads()
 def alert_analytics(request, alert_id):
     """Get analytics for specific alert"""
     try:
@@ -373,22 +558,39 @@ def alert_analytics(request, alert_id):
             'message': 'Alert not found'
         }, status=status.HTTP_404_NOT_FOUND)
     
-    # Delivery metrics
-    total_deliveries = NotificationDelivery.objects.filter(alert=alert).count()
-    read_count = NotificationDelivery.objects.filter(alert=alert, status='read').count()
+    # Delivery metrics; failed sends only show up in the status breakdown
+    delivered = NotificationDelivery.objects.filter(
+        alert=alert,
+        status__in=NotificationDelivery.DELIVERED_STATUSES
+    )
+    total_deliveries = delivered.count()
+    read_count = NotificationDelivery.objects.filter(alert=alert, status=NotificationDelivery.STATUS_READ).count()
     snoozed_count = UserAlertPreference.objects.filter(
         alert=alert,
-        is_snoozed=True,
         snooze_until__gt=timezone.now()
     ).count()
-    reminder_count = NotificationDelivery.objects.filter(alert=alert, is_reminder=True).count()
-    
-    read_rate = (read_count / total_deliveries * 100) if total_deliveries > 0 else 0
+    reminder_count = delivered.filter(is_reminder=True).count()
     
     # Status breakdown
-    status_breakdown = NotificationDelivery.objects.filter(
-        alert=alert
-    ).values('status').annotate(count=Count('id'))
+    status_counts = {
+        row['status']: row['count']
+        for row in NotificationDelivery.objects.filter(alert=alert).values('status').annotate(count=Count('id'))
+    }
+    
+    # Digests listing the alert count as one delivery each
+    digests = NotificationDigest.objects.containing(alert.id).values_list(
+        'status', 'read_alert_ids', 'reminder_alert_ids'
+    )
+    for digest_status, read_alert_ids, reminder_alert_ids in digests:
+        if digest_status == NotificationDelivery.STATUS_SENT:
+            total_deliveries += 1
+            reminder_count += alert.id in reminder_alert_ids
+            if alert.id in read_alert_ids:
+                read_count += 1
+                digest_status = NotificationDelivery.STATUS_READ
+        status_counts[digest_status] = status_counts.get(digest_status, 0) + 1
+    
+    read_rate = (read_count / total_deliveries * 100) if total_deliveries > 0 else 0
     
     return Response({
         'success': True,
@@ -406,11 +608,91 @@ def alert_analytics(request, alert_id):
                 'reminderCount': reminder_count,
                 'readRate': round(read_rate, 2)
             },
-            'statusBreakdown': list(status_breakdown)
+            'statusBreakdown': [
+                {'status': NotificationDelivery.status_name(code), 'count': count}
+                for code, count in status_counts.items()
+            ]
         }
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def queue_analytics(request):
+    """Depth of each Celery queue, periodic task overlaps and the last run of each task"""
+    return Response({
+        'success': True,
+        'data': {
+            'queues': queue_depths(),
+            'taskOverlaps': task_overlaps(),
+            'lastRuns': last_task_runs()
+        }
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def prometheus_metrics(request):
+    """Per-endpoint request metrics, queue depths and task overlaps for Prometheus"""
+    return HttpResponse(render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def request_profiles(request):
+    """Most recent on-demand request profiles, newest first"""
+    return Response({
+        'success': True,
+        'data': list_profiles()
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def request_profile(request, profile_id):
+    """One request profile; ?download=1 returns the raw pstats file"""
+    profile = get_profile(profile_id)
+    if profile is None:
+        return Response({
+            'success': False,
+            'message': 'Profile not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    if request.query_params.get('download'):
+        response = HttpResponse(profile['pstats'], content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.prof"'
+        return response
+    
+    return Response({
+        'success': True,
+        'data': {key: value for key, value in profile.items() if key != 'pstats'}
+    })
+
+
+# ==================== Webhook Views ====================
+
+class WebhookEndpointViewSet(viewsets.ModelViewSet):
+    """Webhook endpoints of the admin's organization"""
+    serializer_class = WebhookEndpointSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    def get_queryset(self):
+        return WebhookEndpoint.objects.filter(
+            organization_id=self.request.user.organization_id
+        ).order_by('id')
+    
+    def create(self, request, *args, **kwargs):
+        """The only response that carries the secret, so a generated one can be stored"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        data = dict(serializer.data, secret=serializer.instance.secret)
+        return Response(data, status=status.HTTP_201_CREATED, headers=self.get_success_headers(data))
+    
+    def perform_create(self, serializer):
+        serializer.save(organization_id=self.request.user.organization_id)
+
+
 # ==================== Team Views ====================
 
 class TeamViewSet(viewsets.ModelViewSet):
@@ -421,5 +703,26 @@ class TeamViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
-        return Team.objects.filter(organization=user.organization)
-    
\ No newline at end of file
+        return Team.objects.filter(
+            organization_id=user.organization_id
+        ).select_related('organization').annotate(member_count=Count('members')).order_by('id')
+    
+    @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated, IsAdminUser])
+    def members(self, request, pk=None):
+        """Add (POST) or remove (DELETE) many users in one set-based update"""
+        team = self.get_object()
+        
+        serializer = TeamMembershipSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = serializer.validated_data['user_ids']
+        
+        membership_service = TeamMembershipService()
+        if request.method == 'POST':
+            result = membership_service.add_members(team, user_ids)
+        else:
+            result = membership_service.remove_members(team, user_ids)
+        
+        return Response({
+            'success': True,
+            'data': result
+        })
@@ -0,0 +1,293 @@
+import hashlib
+import hmac
+import http.client
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import NotificationDelivery, NotificationDigest, NotificationFailure, WebhookEndpoint
+from .routers import current_shard
+
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = 'X-Webhook-Signature'
+TIMESTAMP_HEADER = 'X-Webhook-Timestamp'
+ID_HEADER = 'X-Webhook-Id'
+
+
+class WebhookError(Exception):
+    """A failed POST; `retryable` is False for answers retrying cannot change (4xx)"""
+    
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+# ==================== Connection Pools ====================
+
+class HostPool:
+    """
+    Keep-alive connections to one scheme://host:port. Idle connections are
+    reused, so a burst of deliveries to one host pays for one TCP/TLS handshake.
+    """
+    
+    def __init__(self, scheme, netloc, size):
+        self.connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        self.netloc = netloc
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+    
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self.connection_class(self.netloc, timeout=settings.WEBHOOK_TIMEOUT_SECONDS), False
+    
+    def _release(self, connection):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(connection)
+                return
+        connection.close()
+    
+    def post(self, path, body, headers):
+        """POST and return (status, response body)"""
+        while True:
+            connection, reused = self._acquire()
+            try:
+                connection.request('POST', path, body=body, headers=headers)
+                response = connection.getresponse()
+                content = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                connection.close()
+                # The server dropped an idle keep-alive connection; try a fresh one
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+            return response.status, content
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_for(url):
+    """The process-wide HostPool of the URL's scheme, host and port"""
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(key, HostPool(parts.scheme, parts.netloc, settings.WEBHOOK_POOL_SIZE))
+    return pool
+
+
+# ==================== Signing ====================
+
+def sign(secret, timestamp, body):
+    """Hex HMAC-SHA256 of "<timestamp>.<body>" under the endpoint's secret"""
+    message = f'{timestamp}.'.encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret, timestamp, body, signature, tolerance=300):
+    """Check a received request, rejecting timestamps more than `tolerance` seconds off"""
+    try:
+        if abs(time.time() - int(timestamp)) > tolerance:
+            return False
+    except (TypeError, ValueError):
+        return False
+    expected = f'sha256={sign(secret, timestamp, body)}'
+    return hmac.compare_digest(expected, signature or '')
+
+
+def post_webhook(endpoint, payload_id, deliveries, attempt=1):
+    """
+    Sign and POST one batch of deliveries to the endpoint. Returns the HTTP
+    status; raises WebhookError on timeouts, connection errors and non-2xx.
+    """
+    body = json.dumps({
+        'id': payload_id,
+        'attempt': attempt,
+        'deliveries': deliveries,
+    }, cls=DjangoJSONEncoder).encode()
+    timestamp = str(int(time.time()))
+    headers = {
+        'Content-Type': 'application/json',
+        'User-Agent': 'alerting-platform-webhooks',
+        ID_HEADER: payload_id,
+        TIMESTAMP_HEADER: timestamp,
+        SIGNATURE_HEADER: f'sha256={sign(endpoint.secret, timestamp, body)}',
+    }
+    
+    parts = urlsplit(endpoint.url)
+    path = parts.path or '/'
+    if parts.query:
+        path = f'{path}?{parts.query}'
+    
+    try:
+        status, _content = pool_for(endpoint.url).post(path, body, headers)
+    except (OSError, http.client.HTTPException) as exc:
+        raise WebhookError(f'{type(exc).__name__}: {exc}') from exc
+    
+    if status >= 300:
+        # Rate limits and server errors may pass; other client errors will not
+        raise WebhookError(f'HTTP {status}', retryable=status == 429 or status >= 500)
+    return status
+
+
+def mark_failed(deliveries, reason):
+    """Flip the delivery rows (and digests) of a batch that could not be posted to failed"""
+    pairs = {(item['alert']['id'], item['user']['id']) for item in deliveries}
+    user_ids = {user_id for _alert_id, user_id in pairs}
+    queued_at = min(parse_datetime(item['queued_at']) for item in deliveries)
+    rows = NotificationDelivery.objects.filter(
+        alert_id__in={alert_id for alert_id, _user_id in pairs},
+        user_id__in=user_ids,
+        delivery_type=NotificationDelivery.CHANNEL_CODES['Webhook'],
+        status=NotificationDelivery.STATUS_SENT,
+        sent_at__gte=queued_at
+    ).values_list('id', 'alert_id', 'user_id')
+    ids = [delivery_id for delivery_id, alert_id, user_id in rows if (alert_id, user_id) in pairs]
+    
+    NotificationDelivery.objects.filter(id__in=ids).update(status=NotificationDelivery.STATUS_FAILED)
+    NotificationFailure.objects.bulk_create(
+        [NotificationFailure(delivery_id=delivery_id, reason=reason) for delivery_id in ids],
+        ignore_conflicts=True
+    )
+    
+    # Digested alerts have no delivery row; their digest fails as a whole
+    digests = NotificationDigest.objects.filter(
+        user_id__in=user_ids,
+        delivery_type=NotificationDelivery.CHANNEL_CODES['Webhook'],
+        status=NotificationDelivery.STATUS_SENT,
+        sent_at__gte=queued_at
+    ).values_list('id', 'user_id', 'alert_ids')
+    digest_ids = [
+        digest_id for digest_id, user_id, alert_ids in digests
+        if any((alert_id, user_id) in pairs for alert_id in alert_ids)
+    ]
+    NotificationDigest.objects.filter(id__in=digest_ids).update(status=NotificationDelivery.STATUS_FAILED)
+    return len(ids) + len(digest_ids)
+
+
+# ==================== Batching ====================
+
+class WebhookBatch:
+    """Deliveries buffered per endpoint during a fan-out, posted by background tasks"""
+    
+    def __init__(self):
+        self.endpoints = {}
+        self.pending = defaultdict(list)
+    
+    def endpoints_for(self, organization_id):
+        if organization_id not in self.endpoints:
+            self.endpoints[organization_id] = active_endpoints(organization_id)
+        return self.endpoints[organization_id]
+    
+    def add(self, endpoint, delivery):
+        # A full batch goes out before the next delivery is added, by which time
+        # the previous recipient's delivery row has been written
+        pending = self.pending[endpoint]
+        if len(pending) >= endpoint.batch_size:
+            self.flush(endpoint)
+            pending = self.pending[endpoint]
+        pending.append(delivery)
+    
+    def flush(self, endpoint=None):
+        endpoints = [endpoint] if endpoint is not None else list(self.pending)
+        for endpoint in endpoints:
+            deliveries = self.pending.pop(endpoint, [])
+            if deliveries:
+                enqueue(endpoint, deliveries)
+
+
+_current_batch = ContextVar('webhook_batch', default=None)
+
+
+@contextmanager
+def webhook_batching():
+    """Collect webhook deliveries made inside the block and post them in batches"""
+    if _current_batch.get() is not None:
+        yield _current_batch.get()
+        return
+    
+    batch = WebhookBatch()
+    token = _current_batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _current_batch.reset(token)
+        batch.flush()
+
+
+def active_endpoints(organization_id):
+    return list(WebhookEndpoint.objects.filter(organization_id=organization_id, is_active=True))
+
+
+def enqueue(endpoint, deliveries):
+    """Hand a batch to deliver_webhook once the delivery rows are committed"""
+    from .tasks import deliver_webhook
+    
+    payload_id = uuid.uuid4().hex
+    database = current_shard()
+    endpoint_id, organization = endpoint.id, endpoint.organization_id
+    transaction.on_commit(
+        lambda: deliver_webhook.delay(
+            endpoint_id, payload_id, deliveries, database=database, organization=organization
+        ),
+        using=router.db_for_write(NotificationDelivery)
+    )
+
+
+def queue_delivery(user, alert, content):
+    """
+    Queue one recipient's alert for each of their organization's endpoints.
+    Inside webhook_batching() it joins the current batch; otherwise it is posted on its own.
+    Returns the number of endpoints it was queued for.
+    """
+    batch = _current_batch.get()
+    endpoints = batch.endpoints_for(user.organization_id) if batch else active_endpoints(user.organization_id)
+    
+    delivery = {
+        'alert': {
+            'id': alert.id,
+            'title': content.title,
+            'message': content.message,
+            'severity': alert.severity,
+        },
+        'user': {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+        },
+        'queued_at': timezone.now().isoformat(),
+    }
+    for endpoint in endpoints:
+        if batch:
+            batch.add(endpoint, delivery)
+        else:
+            enqueue(endpoint, [delivery])
+    return len(endpoints)